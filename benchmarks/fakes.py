@@ -0,0 +1,153 @@
+"""
+Deterministic local stand-ins for the pipeline's external services, with configurable
+latency and error rates, for benchmarks that drive run_pipeline end to end:
+
+- FakeMarketData replaces the yfinance module used by src.extract_stocks (yf.download).
+- FlakyStubModel is the LLM_BACKEND=stub model with an error rate.
+- FakeWriter is the BQ_WRITER=local BigQuery writer with latency and an error rate.
+
+The same seed, symbols and settings always produce the same bars and the same failures.
+"""
+
+import threading
+import time
+import zlib
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from src.summarize import StubModel
+from src.upload import LocalWriter
+
+# Trading days per yfinance period, for the number of bars a fake download returns.
+PERIOD_BARS = {"1mo": 21, "3mo": 63, "6mo": 126, "1y": 252, "2y": 504, "5y": 1260, "10y": 2520}
+FIELDS = ("Open", "High", "Low", "Close", "Adj Close", "Volume")
+
+
+class FakeProviderError(ConnectionError):
+    """Raised by the fakes for a simulated failed request."""
+
+
+class _Failures:
+    """Seeded per-key failure draws, so the n-th call for a key fails (or not) on every run."""
+
+    def __init__(self, error_rate: float, seed: int):
+        self.error_rate = error_rate
+        self.seed = seed
+        self.calls: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def check(self, key: str) -> None:
+        with self._lock:
+            call = self.calls.get(key, 0)
+            self.calls[key] = call + 1
+        if self.error_rate and _rng(self.seed, key, call).random() < self.error_rate:
+            raise FakeProviderError(f"simulated failure for {key} (call {call + 1})")
+
+
+class FakeMarketData:
+    """
+    Drop-in for the yfinance module: `download` returns frames shaped like yf.download
+    (a Date index, a (field, symbol) or (symbol, field) column MultiIndex) after `latency`
+    seconds per call. Bars are a seeded random walk per symbol with consistent OHLC.
+    """
+
+    def __init__(self, bars: int | None = None, latency: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.bars = bars
+        self.latency = latency
+        self.seed = seed
+        self.failures = _Failures(error_rate, seed)
+        self.rows_served = 0
+        self._lock = threading.Lock()
+
+    def download(self, tickers, period="6mo", start=None, group_by="column", **kwargs) -> pd.DataFrame:
+        symbols = list(tickers) if isinstance(tickers, (list, tuple)) else [tickers]
+        if self.latency:
+            time.sleep(self.latency)
+        self.failures.check(",".join(symbols))
+        bars = self.bars or PERIOD_BARS.get(period, 126)
+        dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=bars, name="Date")
+        if start is not None:
+            dates = dates[dates >= pd.Timestamp(start)]
+        frames = {symbol: self.history(symbol, dates) for symbol in symbols}
+        with self._lock:
+            self.rows_served += len(dates) * len(symbols)
+        if group_by == "ticker":
+            return pd.concat(frames, axis=1)
+        return pd.concat(frames, axis=1).swaplevel(axis=1)
+
+    def history(self, symbol: str, dates: pd.DatetimeIndex) -> pd.DataFrame:
+        rng = _rng(self.seed, symbol)
+        bars = len(dates)
+        close = (20 + 480 * rng.random()) * np.exp(np.cumsum(rng.normal(0, 0.02, bars)))
+        open_ = close * (1 + rng.normal(0, 0.005, bars))
+        spread = close * rng.uniform(0, 0.01, bars)
+        return pd.DataFrame(
+            {
+                "Open": open_,
+                "High": np.maximum(open_, close) + spread,
+                "Low": np.minimum(open_, close) - spread,
+                "Close": close,
+                "Adj Close": close,
+                "Volume": rng.integers(100_000, 50_000_000, bars).astype("float64"),
+            },
+            index=dates,
+        )
+
+    def as_module(self) -> SimpleNamespace:
+        return SimpleNamespace(download=self.download)
+
+
+class FlakyStubModel(StubModel):
+    """StubModel whose requests fail at `error_rate` (drawn per prompt and attempt)."""
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        super().__init__(latency=latency)
+        self.failures = _Failures(error_rate, seed)
+
+    def generate_content(self, prompt, request_options=None):
+        self.failures.check(str(zlib.crc32(prompt.encode())))
+        return super().generate_content(prompt, request_options)
+
+
+class FakeWriter(LocalWriter):
+    """LocalWriter with per-chunk latency and failures, standing in for the BigQuery load jobs."""
+
+    latency = 0.0
+    error_rate = 0.0
+    seed = 0
+
+    def __init__(self, directory: str):
+        super().__init__(directory)
+        self.failures = _Failures(self.error_rate, self.seed)
+
+    def append(self, df, table):
+        self._call(table)
+        return super().append(df, table)
+
+    def merge(self, df, table, keys):
+        self._call(table)
+        return super().merge(df, table, keys)
+
+    def _call(self, table: str) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+        self.failures.check(table)
+
+
+def install(market: FakeMarketData, llm: FlakyStubModel, writer_latency: float = 0.0, writer_error_rate: float = 0.0, seed: int = 0):
+    """Point the pipeline at the fakes (run with LLM_BACKEND=stub and BQ_WRITER=local)."""
+    import src.extract_stocks
+    import src.summarize
+    import src.upload
+
+    src.extract_stocks.yf = market.as_module()
+    src.summarize.model = llm
+    src.upload.LocalWriter = type(
+        "ConfiguredFakeWriter", (FakeWriter,), {"latency": writer_latency, "error_rate": writer_error_rate, "seed": seed}
+    )
+
+
+def _rng(seed: int, key: str, call: int = 0) -> np.random.Generator:
+    return np.random.default_rng([seed, zlib.crc32(key.encode()), call])
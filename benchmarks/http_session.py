@@ -0,0 +1,127 @@
+"""
+Latency of small market-data requests with a fresh HTTP session per call (what each
+yf.download did on its own) against the shared MarketDataSession.
+
+    python -m benchmarks.http_session --threads 8 --requests 50
+
+Serves a chart-sized JSON body over HTTPS on localhost (self-signed certificate made
+with the openssl CLI) and counts the TLS connections the server accepts. Loopback has
+no network round trip, so the handshake savings on a real link are larger than here.
+"""
+
+import argparse
+import json
+import os
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from src.http_session import MarketDataSession, build_session
+
+# About the size of a 6mo daily chart response from Yahoo.
+BODY = json.dumps({"chart": {"result": [{"close": list(np.linspace(100, 120, 126).round(4))}]}}).encode()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True  # headers and body are separate writes
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _CountingServer(ThreadingHTTPServer):
+    daemon_threads = True
+    connections = 0
+
+    def verify_request(self, request, client_address):
+        self.connections += 1
+        return True
+
+
+def serve(workdir: str) -> _CountingServer:
+    cert, key = os.path.join(workdir, "cert.pem"), os.path.join(workdir, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-subj", "/CN=localhost",
+         "-keyout", key, "-out", cert],
+        check=True,
+        capture_output=True,
+    )
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    server = _CountingServer(("127.0.0.1", 0), _Handler)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def measure(server: _CountingServer, mode: str, threads: int, requests: int, pool_size: int) -> dict:
+    url = f"https://127.0.0.1:{server.server_address[1]}/v8/finance/chart/AAPL"
+    shared = MarketDataSession(pool_size=pool_size)
+
+    def call(_):
+        started = time.perf_counter()
+        if mode == "fresh":
+            session = build_session(pool_size)
+            try:
+                body = session.get(url, verify=False, timeout=10).content
+            finally:
+                session.close()
+        else:
+            body = shared.session.get(url, verify=False, timeout=10).content
+        assert len(body) == len(BODY)
+        return time.perf_counter() - started
+
+    server.connections = 0
+    with ThreadPoolExecutor(threads) as executor:
+        latencies = np.array(list(executor.map(call, range(threads * requests))))
+    shared.close()
+    return {
+        "mode": mode,
+        "requests": len(latencies),
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 2),
+        "p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 2),
+        "connections": server.connections,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fresh vs shared HTTP session for small HTTPS requests.")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=50, help="Requests per thread.")
+    parser.add_argument("--pool-size", type=int, default=8)
+    args = parser.parse_args()
+
+    import warnings
+
+    warnings.filterwarnings("ignore")  # unverified localhost certificate
+    with tempfile.TemporaryDirectory(prefix="trendnest-http-") as workdir:
+        server = serve(workdir)
+        backend = type(build_session(1)).__module__.split(".")[0]
+        results = [measure(server, mode, args.threads, args.requests, args.pool_size) for mode in ("fresh", "shared")]
+        server.shutdown()
+    for result in results:
+        print(
+            f"{result['mode']:>6} ({backend}): p50 {result['p50_ms']:7.2f} ms, p99 {result['p99_ms']:7.2f} ms, "
+            f"{result['connections']} connections for {result['requests']} requests",
+            file=sys.stderr,
+        )
+    print(json.dumps({"backend": backend, "threads": args.threads, "results": results}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Memory footprint of the combined cleaned frame, with and without compact dtypes.
+
+    python -m benchmarks.memory --tickers 1000 --bars 1260
+
+Builds a synthetic universe shaped like the extractor's output (datetime64 dates, float64
+prices, int64 Volume), runs every ticker through prepare_ticker and assembles the combined
+frame, once the old way (object Ticker, pd.concat) and once with compact dtypes and
+combine_frames. Reports bytes per row of the result, the peak allocation while building it (raw frames
+are generated one at a time and dropped after cleaning, as in the pipeline) and wall time.
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+from collections.abc import Iterator
+
+import numpy as np
+import pandas as pd
+
+from src.pipeline import prepare_ticker
+from src.schema import bytes_per_row, combine_frames
+
+
+def synthetic_universe(tickers: int, bars: int, seed: int = 0) -> Iterator[tuple[str, pd.DataFrame]]:
+    """Yields (symbol, raw frame) one at a time, so raw bars are dropped after cleaning as in the pipeline."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end="2025-06-30", periods=bars, name="date")
+    for i in range(tickers):
+        close = 20 + 500 * rng.random() * np.exp(np.cumsum(rng.normal(0, 0.02, bars)))
+        spread = close * rng.uniform(0, 0.02, bars)
+        yield f"T{i:05d}", pd.DataFrame(
+            {
+                "date": dates,
+                "Open": close + rng.uniform(-1, 1, bars) * spread,
+                "High": close + spread,
+                "Low": close - spread,
+                "Close": close,
+                "adjusted_close": close * 0.99,
+                "Volume": rng.integers(100_000, 200_000_000, bars, dtype="int64"),
+            }
+        )
+
+
+def assemble(tickers: int, bars: int, compact: bool) -> pd.DataFrame:
+    cleaned = [prepare_ticker(symbol, df, compact=compact) for symbol, df in synthetic_universe(tickers, bars)]
+    return combine_frames(cleaned) if compact else pd.concat(cleaned, ignore_index=True)
+
+
+def measure(tickers: int, bars: int, compact: bool) -> dict:
+    started = time.perf_counter()
+    combined = assemble(tickers, bars, compact)
+    seconds = time.perf_counter() - started
+    del combined
+    # Separate run for the peak: tracemalloc slows allocation-heavy code down too much to time it.
+    tracemalloc.start()
+    combined = assemble(tickers, bars, compact)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "rows": len(combined),
+        "bytes_per_row": round(bytes_per_row(combined), 1),
+        "total_mb": round(combined.memory_usage(deep=True).sum() / 2**20, 1),
+        "peak_mb": round(peak / 2**20, 1),
+        "seconds": round(seconds, 2),
+        "dtypes": {name: str(dtype) for name, dtype in combined.dtypes.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes per row of the combined frame, before and after compact dtypes.")
+    parser.add_argument("--tickers", type=int, default=1000)
+    parser.add_argument("--bars", type=int, default=1260)
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+    args = parser.parse_args()
+
+    results = {
+        "baseline": measure(args.tickers, args.bars, compact=False),
+        "compact": measure(args.tickers, args.bars, compact=True),
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{args.tickers} tickers x {args.bars} bars")
+    for name, result in results.items():
+        print(
+            f"{name:>9}: {result['bytes_per_row']:6.1f} bytes/row, {result['total_mb']:8.1f} MB, "
+            f"peak {result['peak_mb']:8.1f} MB, {result['seconds']:.2f}s"
+        )
+    saved = 1 - results["compact"]["bytes_per_row"] / results["baseline"]["bytes_per_row"]
+    print(f"compact dtypes use {saved:.0%} less memory per row")
+
+
+if __name__ == "__main__":
+    main()
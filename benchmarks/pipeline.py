@@ -0,0 +1,264 @@
+"""
+End-to-end pipeline benchmark against local fakes of yfinance, Gemini and BigQuery.
+
+    python -m benchmarks.pipeline --tickers 10 100 1000 5000 --output report.json
+    python -m benchmarks.pipeline --tickers 100 1000 --baseline benchmarks/baseline.json
+
+Each universe size runs `run_pipeline.main` in its own subprocess (so peak RSS is per run)
+with every stage on: fetch, clean/validate, export, analyze, summarize and upload. The fakes
+in benchmarks/fakes.py answer after a configurable latency and fail at a configurable rate,
+deterministically for a given seed. Spans are collected in memory instead of printed.
+The report holds throughput, peak RSS and p50/p99 latency per span name (per stage). With
+--baseline, the run fails (exit status 1) when throughput, peak RSS or a stage's p99 is
+worse than the baseline by more than --tolerance.
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import UTC, datetime
+
+import numpy as np
+from opentelemetry.sdk.trace import SpanProcessor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Stages faster than this at p99 in the baseline are too noisy to compare.
+MIN_STAGE_MS = 5.0
+
+
+def benchmark_env(workdir: str, options: dict) -> dict[str, str]:
+    """Settings for a benchmark run: outputs under workdir, fakes selected, limiters out of the way."""
+    env = {
+        "EXPORT_PATH": os.path.join(workdir, "cleaned_data.csv"),
+        "ANALYTICS_PATH": os.path.join(workdir, "analytics.csv"),
+        "DEAD_LETTER_PATH": os.path.join(workdir, "failed_rows.csv"),
+        "CHECKPOINT_DIR": os.path.join(workdir, "runs"),
+        "INDICATOR_STATE_DIR": os.path.join(workdir, "indicators"),
+        "PRICE_CACHE_ENABLED": "false",
+        "SUMMARIES_ENABLED": "true",
+        "SUMMARY_CACHE_PATH": os.path.join(workdir, "summaries.sqlite"),
+        "LLM_BACKEND": "stub",
+        "UPLOAD_ENABLED": "true",
+        "BQ_WRITER": "local",
+        "BQ_LOCAL_DIR": os.path.join(workdir, "bigquery"),
+        "GCP_PROJECT_ID": "benchmark",
+        "LOCAL_STORE_PATH": os.path.join(workdir, "trendnest.sqlite"),
+        "METRICS_TEXT_PATH": os.path.join(workdir, "metrics.prom"),
+        # The fakes model the provider latency; the token buckets would only add fixed sleeps.
+        "FETCH_RATE_PER_SECOND": "1000000",
+        "FETCH_BURST": "1000000",
+        "LLM_RATE_PER_SECOND": "1000000",
+        "LLM_BURST": "1000000",
+        # Settings read FETCH_BACKOFF (the field name), not the FETCH_BACKOFF_SECONDS of .env.example.
+        "FETCH_BACKOFF": "0",
+        "SUMMARY_BACKOFF": "0",
+        "LOG_LEVEL": "WARNING",
+        "PIPELINE_ENGINE": options["engine"],
+    }
+    env.update(options["settings"])
+    return env
+
+
+class StageTimes(SpanProcessor):
+    """SpanProcessor that keeps the duration of every finished span, by span name."""
+
+    def __init__(self):
+        self.durations: dict[str, list[float]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def on_end(self, span):
+        with self._lock:
+            self.durations[span.name].append((span.end_time - span.start_time) / 1e9)
+
+    def summary(self) -> dict[str, dict]:
+        with self._lock:
+            durations = {name: np.array(values) for name, values in self.durations.items()}
+        return {
+            name: {
+                "count": len(values),
+                "p50_ms": round(float(np.percentile(values, 50)) * 1000, 3),
+                "p99_ms": round(float(np.percentile(values, 99)) * 1000, 3),
+                "total_s": round(float(values.sum()), 3),
+            }
+            for name, values in sorted(durations.items())
+        }
+
+
+def run_one(tickers: int, options: dict) -> dict:
+    """Run the pipeline once in this process; called in the per-size subprocess."""
+    from opentelemetry import trace
+    from opentelemetry.sdk.trace import TracerProvider
+
+    from benchmarks.fakes import FakeMarketData, FlakyStubModel, install
+
+    with tempfile.TemporaryDirectory(prefix="trendnest-bench-") as workdir:
+        os.environ.update(benchmark_env(workdir, options))
+        import pandas as pd
+
+        import run_pipeline
+
+        market = FakeMarketData(
+            bars=options["bars"], latency=options["fetch_latency"], error_rate=options["fetch_error_rate"], seed=options["seed"]
+        )
+        llm = FlakyStubModel(latency=options["llm_latency"], error_rate=options["llm_error_rate"], seed=options["seed"])
+        install(market, llm, writer_latency=options["upload_latency"], writer_error_rate=options["upload_error_rate"], seed=options["seed"])
+
+        stages = StageTimes()
+        provider = TracerProvider()
+        provider.add_span_processor(stages)
+        trace.set_tracer_provider(provider)
+        run_pipeline.setup_tracing = lambda service_name="trendnest", **options: trace.get_tracer(service_name)
+
+        symbols = [f"T{i:05d}" for i in range(tickers)]
+        sys.argv = ["run_pipeline.py", "--tickers", ",".join(symbols)]
+        started = time.perf_counter()
+        run_pipeline.main()
+        seconds = time.perf_counter() - started
+
+        dead_letter_path = os.environ["DEAD_LETTER_PATH"]
+        failed = 0
+        if os.path.isfile(dead_letter_path):
+            dead = pd.read_csv(dead_letter_path)
+            failed = int(dead["rule_ids"].isna().sum()) if "rule_ids" in dead else len(dead)
+
+    return {
+        "tickers": tickers,
+        "failed_tickers": failed,
+        "rows_fetched": market.rows_served,
+        "seconds": round(seconds, 3),
+        "tickers_per_second": round(tickers / seconds, 2),
+        "rows_per_second": round(market.rows_served / seconds, 1),
+        # ru_maxrss is in KiB on Linux (bytes on macOS).
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2**20 if sys.platform == "darwin" else 2**10), 1),
+        "stages": stages.summary(),
+    }
+
+
+def run_suite(sizes: list[int], options: dict) -> dict:
+    results = []
+    for tickers in sizes:
+        command = [sys.executable, "-m", "benchmarks.pipeline", "--child", str(tickers), "--options", json.dumps(options)]
+        completed = subprocess.run(command, cwd=ROOT, capture_output=True, text=True, check=False)
+        if completed.returncode != 0:
+            sys.stderr.write(completed.stderr)
+            raise RuntimeError(f"Benchmark run with {tickers} tickers failed (exit {completed.returncode})")
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+        print(_format(results[-1]), file=sys.stderr)
+    return {
+        "created": datetime.now(UTC).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "options": options,
+        "results": results,
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float = 0.2, min_stage_ms: float = MIN_STAGE_MS) -> list[str]:
+    """Regressions of report against baseline, matched by universe size; empty if none."""
+    regressions = []
+    previous = {result["tickers"]: result for result in baseline.get("results", [])}
+    for result in report["results"]:
+        base = previous.get(result["tickers"])
+        if base is None:
+            continue
+        label = f"{result['tickers']} tickers"
+        if result["tickers_per_second"] < base["tickers_per_second"] * (1 - tolerance):
+            regressions.append(
+                f"{label}: throughput {result['tickers_per_second']}/s vs {base['tickers_per_second']}/s in the baseline"
+            )
+        if result["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{label}: peak RSS {result['peak_rss_mb']} MB vs {base['peak_rss_mb']} MB in the baseline")
+        for stage, timing in result["stages"].items():
+            base_timing = base["stages"].get(stage)
+            if base_timing is None or base_timing["p99_ms"] < min_stage_ms:
+                continue
+            if timing["p99_ms"] > base_timing["p99_ms"] * (1 + tolerance):
+                regressions.append(f"{label}: {stage} p99 {timing['p99_ms']} ms vs {base_timing['p99_ms']} ms in the baseline")
+    return regressions
+
+
+def _format(result: dict) -> str:
+    slowest = sorted(result["stages"].items(), key=lambda item: item[1]["total_s"], reverse=True)[:5]
+    stages = ", ".join(f"{name} p50 {t['p50_ms']:.1f} / p99 {t['p99_ms']:.1f} ms" for name, t in slowest)
+    return (
+        f"{result['tickers']:>6} tickers: {result['seconds']:8.2f}s, {result['tickers_per_second']:8.1f} tickers/s, "
+        f"peak RSS {result['peak_rss_mb']:7.1f} MB, {result['failed_tickers']} failed; slowest: {stages}"
+    )
+
+
+def _setting(value: str):
+    key, sep, setting = value.partition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"expected KEY=VALUE, got {value!r}")
+    return key.strip(), setting.strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end pipeline benchmark with fake providers.")
+    parser.add_argument("--tickers", type=int, nargs="+", default=[10, 100, 1000, 5000], help="Universe sizes to run.")
+    parser.add_argument("--bars", type=int, default=None, help="Bars per ticker (default: from FETCH_PERIOD).")
+    parser.add_argument("--engine", choices=("threads", "async", "staged"), default="threads")
+    parser.add_argument("--fetch-latency", type=float, default=0.05, help="Seconds per fake yf.download call.")
+    parser.add_argument("--fetch-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Seconds per fake LLM request.")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--upload-latency", type=float, default=0.1, help="Seconds per fake BigQuery load job.")
+    parser.add_argument("--upload-error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--set", dest="settings", type=_setting, action="append", default=[], metavar="KEY=VALUE",
+        help="Extra setting for the runs, e.g. --set MAX_WORKERS=16 (repeatable).",
+    )
+    parser.add_argument("--output", help="Write the JSON report here (default: stdout).")
+    parser.add_argument("--baseline", help="Fail if the report regresses against this earlier report.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression (default 0.2).")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--options", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        print(json.dumps(run_one(args.child, json.loads(args.options))))
+        return
+
+    options = {
+        "engine": args.engine,
+        "bars": args.bars,
+        "fetch_latency": args.fetch_latency,
+        "fetch_error_rate": args.fetch_error_rate,
+        "llm_latency": args.llm_latency,
+        "llm_error_rate": args.llm_error_rate,
+        "upload_latency": args.upload_latency,
+        "upload_error_rate": args.upload_error_rate,
+        "seed": args.seed,
+        "settings": dict(args.settings),
+    }
+    report = run_suite(args.tickers, options)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if not {r["tickers"] for r in baseline.get("results", [])} & set(args.tickers):
+            sys.exit(f"{args.baseline} has none of the universe sizes {args.tickers}")
+        regressions = compare(report, baseline, tolerance=args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
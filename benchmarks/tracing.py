@@ -0,0 +1,163 @@
+"""
+Instrumentation overhead per ticker for each tracing setup, against tracing switched off.
+
+    python -m benchmarks.tracing --tickers 5000 --threads 8 --budget-us 400
+
+Each setup runs in its own process (the tracer provider can only be set once) and pushes
+`--tickers` tickers through the spans, stage timers and per-ticker metrics a ticker gets
+in the pipeline, with no actual work, on a thread pool. "console-sync" is the previous
+default (a SimpleSpanProcessor printing on the worker thread); console output goes to
+/dev/null. The batch queue holds every span of the run, so none are dropped. `worker_us`
+is the wall time until every ticker is done; `flush_s` is what the background exporter
+still needed afterwards. With --budget-us, the run exits non-zero when the default setup
+("console") costs more than that per ticker over "off".
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Setup name -> setup_tracing options (None: no SDK provider, the API's no-op tracer).
+SETUPS = {
+    "off": None,
+    "console-sync": {"exporter": "console", "sync": True},
+    "console": {"exporter": "console"},
+    "file": {"exporter": "file"},
+    "none": {"exporter": "none"},
+    "console-10pct": {"exporter": "console", "sample_ratio": 0.1},
+}
+# Spans under process_ticker, with the stage metric each one records.
+STEPS = (
+    ("fetch_stock_data", "fetch"),
+    ("clean_data", "clean"),
+    ("validate_rows", "validate"),
+    ("compact_frame", None),
+    ("extract_features", "features"),
+)
+
+
+def run_one(setup: str, tickers: int, threads: int, attribute_limit: int, workdir: str) -> dict:
+    """Time one setup in this process; called in the per-setup subprocess."""
+    from opentelemetry import trace
+
+    from src.observability import (
+        metrics_text,
+        setup_metrics,
+        setup_tracing,
+        timed_stage,
+    )
+    from src.pipeline import PipelineMetrics
+
+    options = SETUPS[setup]
+    if options is None:
+        tracer = trace.get_tracer("benchmark")
+    elif options.get("sync"):
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import (
+            ConsoleSpanExporter,
+            SimpleSpanProcessor,
+        )
+
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(ConsoleSpanExporter()))
+        trace.set_tracer_provider(provider)
+        tracer = trace.get_tracer("benchmark")
+    else:
+        tracer = setup_tracing(
+            sample_ratio=options.get("sample_ratio", 1.0),
+            exporter=options["exporter"],
+            file_path=os.path.join(workdir, "traces.jsonl"),
+            instrument_requests=False,
+            # Room for every span of the run, so the export cost is measured rather than dropped.
+            queue_size=tickers * (len(STEPS) + 1),
+        )
+    metrics = PipelineMetrics.create(setup_metrics(), max_attribute_values=attribute_limit)
+
+    def process(symbol):
+        attributes = {"ticker": symbol, "environment": "benchmark"}
+        with tracer.start_as_current_span("process_ticker", attributes=attributes):
+            for name, stage in STEPS:
+                if stage is None:
+                    with tracer.start_as_current_span(name, attributes={"rows": 126}):
+                        pass
+                    continue
+                with timed_stage(stage), tracer.start_as_current_span(name, attributes={"rows": 126}):
+                    pass
+            metrics.fetch_latency_hist.record(0.05, attributes=attributes)
+            metrics.ticker_counter.add(1, attributes=attributes)
+
+    symbols = [f"T{i:05d}" for i in range(tickers)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        list(executor.map(process, symbols))
+    worker_seconds = time.perf_counter() - started
+    provider = trace.get_tracer_provider()
+    if hasattr(provider, "force_flush"):
+        provider.force_flush()
+    flush_seconds = time.perf_counter() - started - worker_seconds
+
+    series = sum(1 for line in metrics_text().splitlines() if line.startswith("trendnest_pipeline_tickers_processed"))
+    return {
+        "setup": setup,
+        "worker_us": round(worker_seconds / tickers * 1e6, 2),
+        "flush_s": round(flush_seconds, 3),
+        "ticker_series": series,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tracing and metrics overhead per ticker.")
+    parser.add_argument("--tickers", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--setups", nargs="+", choices=list(SETUPS), default=list(SETUPS))
+    parser.add_argument("--attribute-limit", type=int, default=100, help="METRIC_ATTRIBUTE_LIMIT for the run.")
+    parser.add_argument("--budget-us", type=float, help="Fail if 'console' costs more than this per ticker over 'off'.")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        # Console spans go nowhere; the result line goes to the real stdout.
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            result = run_one(args.child, args.tickers, args.threads, args.attribute_limit, args.workdir)
+        print(json.dumps(result))
+        return
+
+    import tempfile
+
+    setups = list(dict.fromkeys(["off", *args.setups, *(["console"] if args.budget_us is not None else [])]))
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="trendnest-tracing-") as workdir:
+        for setup in setups:
+            command = [
+                sys.executable, "-m", "benchmarks.tracing", "--child", setup, "--workdir", workdir,
+                "--tickers", str(args.tickers), "--threads", str(args.threads),
+                "--attribute-limit", str(args.attribute_limit),
+            ]
+            completed = subprocess.run(command, cwd=ROOT, capture_output=True, text=True, check=True)
+            results[setup] = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    off = results["off"]["worker_us"]
+    for setup, result in results.items():
+        result["overhead_us"] = round(result["worker_us"] - off, 2)
+        print(
+            f"{setup:>14}: {result['worker_us']:8.1f} us/ticker ({result['overhead_us']:+8.1f} over off), "
+            f"flush {result['flush_s']:6.3f}s, {result['ticker_series']} ticker series"
+        )
+    print(json.dumps({"tickers": args.tickers, "threads": args.threads, "results": list(results.values())}))
+
+    if args.budget_us is not None:
+        overhead = results["console"]["overhead_us"]
+        if overhead > args.budget_us:
+            sys.exit(f"console tracing costs {overhead:.1f} us/ticker, over the {args.budget_us:.1f} us budget")
+        print(f"console tracing: {overhead:.1f} us/ticker, within the {args.budget_us:.1f} us budget", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Time and allocations of clean_data per million rows, against the previous chained version.
+
+    python -m benchmarks.transform --tickers 1000 --bars 1260
+
+Runs both over the extractor-shaped synthetic universe (about 0.5% of bars missing a
+value), one ticker at a time as prepare_ticker does and once over the combined
+multi-ticker frame. Allocations are the peak traced by tracemalloc during one call,
+per input row (the worst call, for the per-ticker runs).
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.memory import synthetic_universe
+from src.transform import clean_data
+
+
+def chained_clean(df: pd.DataFrame) -> pd.DataFrame:
+    """The previous implementation: each step materializes a full copy."""
+    df_clean = df.dropna()
+    df_clean = df_clean.loc[:, ~df_clean.columns.duplicated()]
+    if "date" in df_clean.columns:
+        df_clean = df_clean.sort_values(by="date")
+    return df_clean
+
+
+def raw_frames(tickers: int, bars: int) -> list:
+    rng = np.random.default_rng(2)
+    frames = []
+    for symbol, df in synthetic_universe(tickers, bars):
+        df = df.assign(Ticker=symbol)
+        df.loc[rng.random(bars) < 0.005, "Close"] = np.nan
+        frames.append(df)
+    return frames
+
+
+def _run(clean, inputs) -> tuple:
+    started = time.perf_counter()
+    rows = sum(len(clean(df)) for df in inputs)
+    seconds = time.perf_counter() - started
+    peak_per_row = 0.0
+    tracemalloc.start()
+    for df in inputs:
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        clean(df)
+        _, peak = tracemalloc.get_traced_memory()
+        peak_per_row = max(peak_per_row, (peak - baseline) / len(df))
+    tracemalloc.stop()
+    return rows, seconds, peak_per_row
+
+
+def measure(tickers: int, bars: int) -> dict:
+    frames = raw_frames(tickers, bars)
+    combined = pd.concat(frames, ignore_index=True)
+    rows = len(combined)
+    results = {}
+    for layout, inputs in (("per_ticker", frames), ("combined", [combined])):
+        for name, clean in (("chained", chained_clean), ("fused", clean_data)):
+            kept, seconds, peak_per_row = _run(clean, inputs)
+            results[f"{layout}.{name}"] = {
+                "rows_kept": kept,
+                "seconds_per_million_rows": round(seconds / rows * 1e6, 3),
+                "peak_bytes_per_row": round(peak_per_row, 1),
+            }
+    return {"rows": rows, "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="clean_data time and allocations per million rows.")
+    parser.add_argument("--tickers", type=int, default=1000)
+    parser.add_argument("--bars", type=int, default=1260)
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+    args = parser.parse_args()
+
+    report = measure(args.tickers, args.bars)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{report['rows']:,} rows ({args.tickers} tickers x {args.bars} bars)")
+    for name, result in report["results"].items():
+        print(
+            f"{name:>20}: {result['seconds_per_million_rows']:6.3f}s per million rows, "
+            f"{result['peak_bytes_per_row']:7.1f} peak bytes/row"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Cost of the row validation rules on the combined frame at growing universe sizes.
+
+    python -m benchmarks.validation --tickers 250 1000 4000 --bars 1260
+
+Every rule is a vectorized mask, so time per row should stay flat as the frame grows.
+About 0.1% of rows are corrupted so the quarantine path is exercised too. The pipeline
+validates one ticker at a time (see prepare_ticker); `per_ticker_ms` is that cost, for
+comparison with the combined pass spread over the same tickers.
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from benchmarks.memory import synthetic_universe
+from src.pipeline import prepare_ticker
+from src.schema import combine_frames
+from src.validation import validate_rows
+
+
+def measure(tickers: int, bars: int, repeat: int = 3) -> dict:
+    frames = [prepare_ticker(symbol, raw) for symbol, raw in synthetic_universe(tickers, bars)]
+    df = combine_frames(frames)
+    rng = np.random.default_rng(1)
+    bad = rng.choice(len(df), size=max(1, len(df) // 1000), replace=False)
+    df.loc[bad, "Low"] = df.loc[bad, "High"] + 1
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = validate_rows(df)
+        best = min(best, time.perf_counter() - started)
+    started = time.perf_counter()
+    for frame in frames:
+        validate_rows(frame)
+    per_ticker = (time.perf_counter() - started) / tickers
+    return {
+        "rows": len(df),
+        "seconds": round(best, 3),
+        "ns_per_row": round(best / len(df) * 1e9, 1),
+        "quarantined": len(result.quarantined),
+        "combined_ms_per_ticker": round(best / tickers * 1e3, 3),
+        "per_ticker_ms": round(per_ticker * 1e3, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validation time per row of the combined frame.")
+    parser.add_argument("--tickers", type=int, nargs="+", default=[250, 1000, 4000])
+    parser.add_argument("--bars", type=int, default=1260)
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+    args = parser.parse_args()
+
+    results = [measure(tickers, args.bars) for tickers in args.tickers]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for result in results:
+        print(
+            f"{result['rows']:>10,} rows: {result['seconds']:6.3f}s, {result['ns_per_row']:6.1f} ns/row, "
+            f"{result['quarantined']:,} quarantined; per ticker {result['per_ticker_ms']:.2f} ms alone vs "
+            f"{result['combined_ms_per_ticker']:.2f} ms in the combined pass"
+        )
+
+
+if __name__ == "__main__":
+    main()
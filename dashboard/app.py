@@ -1,24 +1,42 @@
 import streamlit as st
-import pandas as pd
 import os
+import sys
 import altair as alt
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.dashboard_data import DashboardData
+from src.local_store import LocalStore
+from src.queries import latest_prices, volume_spikes
+
 st.set_page_config(page_title="TrendNest Dashboard", layout="wide")
 
 st.title("📊 TrendNest")
 st.caption("Explore live stock trends and volumes with AI-powered summaries")
 
 DATA_PATH = os.getenv("EXPORT_PATH", "data/cleaned_data.csv")
+STORE_PATH = os.getenv("LOCAL_STORE_PATH", "data/trendnest.sqlite")
+INTERVAL = os.getenv("FETCH_INTERVAL", "1d")
+
+
+@st.cache_resource
+def get_data(path, fmt):
+    # One instance per server process: its query cache survives reruns and is keyed on the export's version.
+    return DashboardData(path, fmt=fmt)
+
+
+@st.cache_resource
+def get_store(path):
+    # Read-only: the dashboard must never create or alter the pipeline's database.
+    return LocalStore(path, read_only=True)
+
 
-# Load data
-try:
-    df = pd.read_csv(DATA_PATH, parse_dates=["date"])
-    st.success("✅ Data loaded successfully.")
-except FileNotFoundError:
+# Load data (CSV, compressed CSV, Parquet/Feather file or partitioned directory)
+if not os.path.exists(DATA_PATH):
     st.error("❌ Data file not found. Please run the pipeline first.")
     st.stop()
-
-tickers = df["Ticker"].dropna().unique().tolist()
+data = get_data(DATA_PATH, os.getenv("EXPORT_FORMAT") or None)
+tickers = data.tickers()
+st.success("✅ Data loaded successfully.")
 
 selected_tickers = st.multiselect("Select Tickers", options=tickers, default=tickers[:5])
 
@@ -26,16 +44,14 @@ if not selected_tickers:
     st.warning("⚠️ Please select at least one ticker.")
     st.stop()
 
-# Filtered data
-filtered_df = df[df["Ticker"].isin(selected_tickers)]
-
 # Date range filter
-if filtered_df.empty or filtered_df["date"].isna().all():
+first_date, last_date = data.date_range(selected_tickers)
+if first_date is None:
     st.warning("⚠️ No valid dates available for the selected tickers.")
     st.stop()
 
-min_date = filtered_df["date"].min().date()
-max_date = filtered_df["date"].max().date()
+min_date = first_date.date()
+max_date = last_date.date()
 
 date_range = st.slider(
     "Select Date Range",
@@ -44,17 +60,17 @@ date_range = st.slider(
     value=(min_date, max_date)
 )
 
-filtered_df = filtered_df[
-    (filtered_df["date"].dt.date >= date_range[0]) &
-    (filtered_df["date"].dt.date <= date_range[1])
-]
-
-row_limit = st.select_slider("Chart Data Points", options=[50, 100, 150, 200, 300], value=300)
+point_limit = st.select_slider("Chart Points per Ticker", options=[100, 200, 300, 500, 1000, 2000], value=300)
 smooth = st.checkbox("Apply 7-day rolling average to price", value=False)
 
-chart_df = filtered_df.sort_values("date").tail(row_limit)
-if smooth:
-    chart_df["Close"] = chart_df.groupby("Ticker")["Close"].transform(lambda x: x.rolling(window=7, min_periods=1).mean())
+# Only the selected tickers, dates and columns are read; each series is downsampled (LTTB) before charting.
+chart_df = data.chart_frame(
+    selected_tickers,
+    start=date_range[0],
+    end=date_range[1],
+    points=point_limit,
+    smooth_window=7 if smooth else None,
+)
 
 col1, col2 = st.columns(2)
 
@@ -79,17 +95,34 @@ with col2:
     st.altair_chart(bar_chart, use_container_width=True)
 
 st.subheader("🧠 AI Summaries")
+summaries = {}
+if "summary" in data.columns():
+    summary_df = data.frame(selected_tickers, date_range[0], date_range[1], columns=["date", "Ticker", "summary"])
+    summaries = summary_df.dropna(subset=["summary"]).sort_values("date").groupby("Ticker")["summary"].last().to_dict()
 for ticker in selected_tickers:
-    ticker_df = filtered_df[filtered_df["Ticker"] == ticker]
-    if "summary" in ticker_df.columns and not ticker_df["summary"].isna().all():
-        summary_text = ticker_df["summary"].dropna().iloc[-1]
-        st.markdown(f"**{ticker}**")
-        st.success(summary_text)
+    st.markdown(f"**{ticker}**")
+    if ticker in summaries:
+        st.success(summaries[ticker])
     else:
-        st.markdown(f"**{ticker}**")
         st.info("No AI summary available.")
 
+# Reports from the local store (LOCAL_STORE_ENABLED), answered without a BigQuery round trip
+if os.path.exists(STORE_PATH):
+    store = get_store(STORE_PATH)
+    st.subheader("🗄️ Reports")
+    report_col1, report_col2 = st.columns(2)
+    with report_col1:
+        st.markdown("**Latest Close**")
+        st.dataframe(latest_prices(store, selected_tickers, interval=INTERVAL), hide_index=True)
+    with report_col2:
+        st.markdown("**Volume Spikes**")
+        spikes = volume_spikes(
+            store, tickers=selected_tickers, start=date_range[0], end=date_range[1], limit=20, interval=INTERVAL
+        )
+        st.dataframe(spikes, hide_index=True)
+
 # Download button
 st.subheader("📥 Download Data")
+filtered_df = data.frame(selected_tickers, date_range[0], date_range[1])
 csv = filtered_df.to_csv(index=False).encode("utf-8")
 st.download_button("Download Filtered CSV", data=csv, file_name="filtered_stock_data.csv", mime="text/csv")
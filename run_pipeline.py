@@ -1,23 +1,48 @@
 import argparse
+import atexit
 import logging
+import os
 import time
 import uuid
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 import pandas as pd
-import yaml
-from opentelemetry import trace
 
-from src.config import Settings, get_settings, get_top_performing_stocks
+from src.checkpoint import STAGES, RunCheckpoint, parse_stages
+from src.config import get_settings, get_top_performing_stocks
 from src.config_loader import load_settings_from_file
-from src.export import export_to_csv
-from src.extract_stocks import fetch_stock_data_yf
-from src.model import analyze_trends
-from src.observability import setup_logging, setup_metrics, setup_tracing
-from src.summarize import generate_summary
-from src.transform import clean_data
-from src.upload import upload_to_bigquery
-from src.validation import validate_schema
+from src.cpu_pool import configure_cpu_pool
+from src.export import (
+    EXPORT_FORMATS,
+    export_frame,
+    export_to_csv,
+    parse_partition_by,
+    read_export,
+)
+from src.extract_stocks import FetchError, fetch_stock_data_batch
+from src.features import extract_features
+from src.http_session import configure_market_data_session
+from src.model import INPUT_COLUMNS, IndicatorStore, analyze_trends
+from src.observability import (
+    record_wait,
+    serve_metrics,
+    setup_logging,
+    setup_metrics,
+    setup_tracing,
+    write_metrics_text,
+)
+from src.pipeline import (
+    PipelineMetrics,
+    collect_summaries,
+    fetch_ticker,
+    prepare_and_extract,
+    record_failure,
+)
+from src.price_cache import PriceCache
+from src.ranking import RANKING_METRICS
+from src.rate_limit import RetryScheduler, backoff_delay, configure_limiters
+from src.schema import combine_frames
+from src.validation import Quarantine
 
 logger = logging.getLogger(__name__)
 
@@ -26,11 +51,86 @@ def parse_args():
     parser = argparse.ArgumentParser(description="Run TrendNest pipeline.")
     parser.add_argument("--tickers", help="Comma-separated tickers to process (override selection).")
     parser.add_argument("--limit", type=int, help="Limit top performers selection.")
+    parser.add_argument(
+        "--rank-by",
+        choices=RANKING_METRICS,
+        help="Metric used to select top performers (default: RANKING_METRIC setting).",
+    )
     parser.add_argument("--export-path", help="Override export path for cleaned data.")
+    parser.add_argument(
+        "--export-format",
+        choices=EXPORT_FORMATS,
+        default=None,
+        help="Export file format (default: EXPORT_FORMAT setting).",
+    )
+    parser.add_argument(
+        "--partition-by",
+        default=None,
+        help="Comma-separated partition keys for the export: Ticker, year, month.",
+    )
     parser.add_argument("--dead-letter-path", help="Override path for failed rows CSV.")
     parser.add_argument("--period", default=None, help="yfinance period (e.g., 1mo, 6mo, 1y).")
     parser.add_argument("--interval", default=None, help="yfinance interval (e.g., 1d, 1h).")
     parser.add_argument("--config", help="Path to YAML config file to override settings.")
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=None,
+        help="Symbols per batched yfinance download (0/1 fetches one ticker at a time).",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the local price cache for this run.")
+    parser.add_argument(
+        "--recompute-indicators",
+        action="store_true",
+        help="Rebuild indicator state from the fetched bars instead of extending the stored state.",
+    )
+    parser.add_argument(
+        "--stages",
+        help=f"Comma-separated stages to run (default: all): {', '.join(STAGES)}.",
+    )
+    parser.add_argument(
+        "--resume",
+        metavar="RUN_ID",
+        help=(
+            "Resume a failed run from its checkpoint: finished tickers are skipped, dead-lettered ones "
+            "are retried and only the stages that did not complete are run."
+        ),
+    )
+    parser.add_argument(
+        "--no-upload",
+        action="store_true",
+        help="Skip the BigQuery upload stage (the export is still written).",
+    )
+    parser.add_argument(
+        "--no-summaries",
+        action="store_true",
+        help="Skip feature extraction and AI summaries.",
+    )
+    parser.add_argument(
+        "--refresh-summaries",
+        action="store_true",
+        help="Ignore cached AI summaries and regenerate them (the cache is updated with the new ones).",
+    )
+    parser.add_argument(
+        "--refresh-cache-from",
+        metavar="DATE",
+        help="Drop cached bars from DATE onwards for the selected tickers so they are re-downloaded.",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=("threads", "async", "staged"),
+        default=None,
+        help=(
+            "Execution engine: thread pool (default), asyncio with per-stage concurrency limits, "
+            "or staged workers connected by bounded queues."
+        ),
+    )
+    parser.add_argument(
+        "--cpu-workers",
+        type=int,
+        default=None,
+        help="Processes for the per-ticker cleaning, validation and features (0 runs them on the I/O threads).",
+    )
     return parser.parse_args()
 
 
@@ -39,130 +139,521 @@ def main():
 
     settings = load_settings_from_file(args.config) if args.config else get_settings()
     setup_logging(settings.log_level)
-    tracer = setup_tracing()
+    configure_limiters(settings)
+    configure_market_data_session(settings)
+    cpu_pool = configure_cpu_pool(
+        args.cpu_workers if args.cpu_workers is not None else settings.cpu_workers, log_level=settings.log_level
+    )
+    tracer = setup_tracing(
+        sample_ratio=settings.trace_sample_ratio,
+        exporter=settings.trace_exporter,
+        file_path=settings.trace_file_path,
+        instrument_requests=settings.trace_http_requests,
+        queue_size=settings.trace_queue_size,
+    )
     meter = setup_metrics()
+    # Without an OTLP collector, metrics are written as Prometheus text when the process exits.
+    if settings.metrics_text_path:
+        atexit.register(write_metrics_text, settings.metrics_text_path)
+    if settings.metrics_port:
+        serve_metrics(settings.metrics_port)
 
-    run_id = str(uuid.uuid4())
-    run_counter = meter.create_counter("trendnest.pipeline.runs", description="Number of pipeline runs")
-    ticker_counter = meter.create_counter("trendnest.pipeline.tickers_processed", description="Tickers processed")
-    row_counter = meter.create_counter("trendnest.pipeline.rows_processed", description="Rows processed")
-    retry_counter = meter.create_counter("trendnest.pipeline.fetch_retries", description="Fetch retries")
-    failure_counter = meter.create_counter("trendnest.pipeline.failures", description="Per-ticker failures")
-    fetch_latency_hist = meter.create_histogram(
-        "trendnest.pipeline.fetch_latency_seconds",
-        description="Latency of yfinance fetch per ticker",
-        unit="s",
-    )
+    stages = parse_stages(args.stages)
+    if not settings.upload_enabled or args.no_upload:
+        stages = [s for s in stages if s != "upload"]
+    if not settings.local_store_enabled:
+        stages = [s for s in stages if s != "store"]
+    if not settings.summaries_enabled or args.no_summaries:
+        stages = [s for s in stages if s != "summarize"]
 
-    logger.info("Starting TrendNest pipeline", extra={"run_id": run_id})
+    metrics = PipelineMetrics.create(meter, max_attribute_values=settings.metric_attribute_limit)
 
-    if args.tickers:
-        tickers = [t.strip().upper() for t in args.tickers.split(",") if t.strip()]
+    if args.resume:
+        # Same tickers and outputs as the original run; its CLI overrides are stored in the checkpoint.
+        checkpoint = RunCheckpoint.load(settings.checkpoint_dir, args.resume)
+        run_id = checkpoint.run_id
+        tickers = checkpoint.tickers
+        params = checkpoint.params
     else:
-        tickers = get_top_performing_stocks(limit=args.limit)
+        run_id = str(uuid.uuid4())
+        if args.tickers:
+            tickers = [t.strip().upper() for t in args.tickers.split(",") if t.strip()]
+        else:
+            tickers = get_top_performing_stocks(limit=args.limit, metric=args.rank_by)
+        params = {
+            "export_path": args.export_path or settings.export_path,
+            "export_format": args.export_format or settings.export_format,
+            "partition_by": parse_partition_by(
+                args.partition_by if args.partition_by is not None else settings.export_partition_by
+            ),
+            "period": args.period or settings.fetch_period,
+            "interval": args.interval or settings.fetch_interval,
+        }
+        checkpoint = (
+            RunCheckpoint.create(settings.checkpoint_dir, run_id, tickers, params)
+            if settings.checkpoint_enabled
+            else None
+        )
 
-    export_path = args.export_path or settings.export_path
+    logger.info("Starting TrendNest pipeline run %s (stages: %s)", run_id, ", ".join(stages), extra={"run_id": run_id})
+
+    export_path = params["export_path"]
+    export_format = params["export_format"]
+    partition_by = params["partition_by"]
+    period = params["period"]
+    interval = params["interval"]
     dead_letter_path = args.dead_letter_path or settings.dead_letter_path
-    period = args.period or settings.fetch_period
-    interval = args.interval or settings.fetch_interval
+    batch_size = args.batch_size if args.batch_size is not None else settings.fetch_batch_size
+    engine = args.engine or settings.pipeline_engine
+    if engine == "staged" and "export" not in stages:
+        # The staged engine streams every frame into the export; without it there is nothing to stream into.
+        logger.warning(
+            "PIPELINE_ENGINE=staged needs the export stage; running the threads engine instead",
+            extra={"run_id": run_id},
+        )
+        engine = "threads"
+    cache = PriceCache(settings.price_cache_dir) if settings.price_cache_enabled and not args.no_cache else None
+    if cache is not None and args.refresh_cache_from:
+        for symbol in tickers:
+            cache.invalidate(symbol, interval, start=args.refresh_cache_from)
 
-    logger.info("Tickers to process: %s", ", ".join(tickers), extra={"run_id": run_id})
+    # Stages that are switched off are never imported, so their SDKs and clients cost nothing.
+    upload = None
+    if "upload" in stages:
+        from src.upload import upload_to_bigquery
+
+        def upload(df):
+            upload_to_bigquery(df, settings=settings, interval=interval)
+
+    local_store = None
+    if "store" in stages:
+        from src.local_store import LocalStore
+
+        local_store = LocalStore(settings.local_store_path)
+
+    def store(df):
+        local_store.write(df, interval=interval)
+
+    summarizer = None
+    if "summarize" in stages:
+        from src.summarize import build_summary_service
+        from src.summary_cache import configure_summary_cache
+
+        summarizer = build_summary_service(
+            settings, cache=configure_summary_cache(settings, force_refresh=args.refresh_summaries)
+        )
+
+    # Tickers finished by an earlier attempt of this run are not fetched again; the rest are
+    # the run's dead-letter set (plus any ticker an interrupted attempt never reached).
+    finished = checkpoint.completed() if checkpoint is not None else []
+    pending = [t for t in tickers if t not in finished] if "fetch" in stages else []
+    if args.resume:
+        logger.info(
+            "Resuming run %s: %s tickers already done, %s to process",
+            run_id,
+            len(finished),
+            len(pending),
+            extra={"run_id": run_id},
+        )
+    if pending:
+        logger.info("Tickers to process: %s", ", ".join(pending), extra={"run_id": run_id})
 
-    combined_df = []
     failed_rows = []
+    # Rows rejected by the validation rules; their tickers continue with the remaining rows.
+    quarantine = Quarantine()
+
+    def run_stage(stage, func, *func_args):
+        if stage not in stages:
+            return None
+        if checkpoint is None:
+            return func(*func_args)
+        if checkpoint.is_done(stage):
+            logger.info("Stage %s already done for run %s; skipping", stage, run_id, extra={"run_id": run_id})
+            return None
+        checkpoint.mark(stage, "running")
+        try:
+            result = func(*func_args)
+        except Exception as e:
+            checkpoint.mark(stage, "failed", error=str(e))
+            logger.error("Stage %s failed; rerun with --resume %s", stage, run_id, extra={"run_id": run_id})
+            raise
+        checkpoint.mark(stage, "done")
+        return result
+
+    def with_finished(frames):
+        # Frames checkpointed by an earlier attempt join this attempt's frames in the outputs.
+        return (checkpoint.load_frames(finished) if finished else []) + list(frames)
+
+    def write_analytics(full_df):
+        # One vectorized pass over every ticker's bars: indicators, correlation and trend labels.
+        store = IndicatorStore(settings.indicator_state_dir) if settings.indicator_state_enabled else None
+        analytics = analyze_trends(full_df, store=store, interval=interval, full_recompute=args.recompute_indicators)
+        export_to_csv(analytics.reset_index(), settings.analytics_path)
+        logger.info("Trend labels: %s", analytics["trend"].value_counts().to_dict(), extra={"run_id": run_id})
+
+    def write_outputs(new_df):
+        # Without checkpointed frames from an earlier attempt this is new_df itself, not a copy.
+        full_df = combine_frames(with_finished([new_df] if new_df is not None else []))
+        metrics.row_counter.add(len(full_df), attributes={"environment": settings.environment})
+        run_stage("export", export_frame, full_df, export_path, export_format, partition_by)
+        run_stage("analyze", write_analytics, full_df)
+        # Upserts, so rewriting the rows of an earlier attempt is harmless.
+        run_stage("store", store, full_df)
+        run_stage("upload", upload, new_df if uploaded_before else full_df)
 
     with tracer.start_as_current_span("pipeline", attributes={"run.id": run_id, "tickers.count": len(tickers)}):
-        run_counter.add(1, attributes={"environment": settings.environment})
-
-        with ThreadPoolExecutor(max_workers=settings.max_workers) as executor:
-            future_map = {
-                executor.submit(
-                    process_ticker,
-                    tracer,
-                    ticker,
-                    run_id,
-                    ticker_counter,
-                    retry_counter,
+        metrics.run_counter.add(1, attributes={"environment": settings.environment})
+
+        # Rows an earlier attempt already uploaded are not sent again (BQ_WRITE_MODE=append would duplicate them).
+        uploaded_before = checkpoint is not None and checkpoint.is_done("upload")
+        if checkpoint is not None and pending:
+            # New frames make earlier outputs of this run stale.
+            checkpoint.reset(["fetch", "export", "analyze", "store", "upload"])
+
+        prefetched = None
+        # The staged engine feeds batch downloads to its extract stage one batch at a time instead.
+        if pending and batch_size > 1 and engine != "staged":
+            start = time.perf_counter()
+            frames, attempts = fetch_stock_data_batch(
+                pending,
+                period=period,
+                interval=interval,
+                batch_size=batch_size,
+                max_retries=settings.fetch_retries,
+                backoff=settings.fetch_backoff,
+                timeout=settings.fetch_timeout,
+                return_attempts=True,
+                cache=cache,
+            )
+            metrics.fetch_latency_hist.record(
+                time.perf_counter() - start,
+                attributes={"mode": "batch", "environment": settings.environment},
+            )
+            prefetched = {symbol: (frames[symbol], attempts[symbol]) for symbol in frames}
+            for symbol in pending:
+                if symbol not in frames:
+                    error = FetchError(f"Failed to fetch data for {symbol} after {settings.fetch_retries} attempts.")
+                    record_failure(symbol, error, run_id, failed_rows, metrics, settings)
+            pending = list(frames)
+
+        if not pending:
+            # Nothing to fetch: rebuild the outputs that are still missing from checkpointed frames.
+            if finished:
+                write_outputs(None)
+        elif engine == "async":
+            from src.async_engine import run_async_engine
+
+            # The async engine runs export/upload itself, once on the combined frame after the last ticker.
+            combined_df, engine_failures = run_async_engine(
+                pending,
+                settings,
+                period,
+                interval,
+                run_id,
+                metrics,
+                prefetched=prefetched,
+                cache=cache,
+                sink=write_outputs,
+                summarizer=summarizer,
+                checkpoint=checkpoint,
+                quarantine=quarantine,
+            )
+            failed_rows.extend(engine_failures)
+            if not combined_df and finished:
+                write_outputs(None)
+        elif engine == "staged":
+            from src.staged_engine import StreamingSink, run_staged_engine
+
+            def publish(chunk):
+                if local_store is not None:
+                    store(chunk)
+                if upload is not None:
+                    upload(chunk)
+
+            # Frames stream into the export/upload sink as they finish instead of being held until the end.
+            sink = StreamingSink(
+                export_path,
+                upload=publish if local_store is not None or upload is not None else None,
+                chunk_rows=settings.sink_chunk_rows,
+                fmt=export_format,
+                partition_by=partition_by,
+            )
+            # The sink exports (and stores/uploads) as it goes, so those stages succeed or fail with the engine.
+            streamed = ["export"] + [s for s in ("store", "upload") if s in stages]
+            try:
+                for frame in with_finished([]):
+                    sink.write(frame, upload=upload is not None and not uploaded_before)
+                    if local_store is not None and (upload is None or uploaded_before):
+                        store(frame)
+                engine_failures, _ = run_staged_engine(
+                    pending,
                     settings,
                     period,
                     interval,
-                ): ticker
-                for ticker in tickers
-            }
-            for future in as_completed(future_map):
-                symbol = future_map[future]
-                try:
-                    result = future.result()
-                    if result is None:
-                        continue
-                    df_clean, summary, fetch_duration = result
-                    fetch_latency_hist.record(
-                        fetch_duration,
-                        attributes={"ticker": symbol, "environment": settings.environment},
-                    )
-                    combined_df.append(df_clean)
-                    logger.info("AI Summary (%s): %s", symbol, summary, extra={"run_id": run_id})
-                except Exception as e:
-                    logger.exception("Failed processing %s: %s", symbol, e, extra={"run_id": run_id})
-                    failed_rows.append({"Ticker": symbol, "error": str(e), "run_id": run_id})
-                    failure_counter.add(1, attributes={"ticker": symbol, "environment": settings.environment})
-
-        if combined_df:
-            full_df = pd.concat(combined_df, ignore_index=True)
-            row_counter.add(len(full_df), attributes={"environment": settings.environment})
-            export_to_csv(full_df, export_path)
-            upload_to_bigquery(full_df)
-
-        if failed_rows:
-            pd.DataFrame(failed_rows).to_csv(dead_letter_path, index=False)
-            logger.warning("Failed rows written to %s", dead_letter_path, extra={"run_id": run_id})
+                    run_id,
+                    metrics,
+                    sink,
+                    batch_size=batch_size,
+                    cache=cache,
+                    summarizer=summarizer,
+                    checkpoint=checkpoint,
+                    quarantine=quarantine,
+                )
+            except Exception as e:
+                sink.abort()
+                mark_stages(checkpoint, streamed, "failed", error=str(e))
+                logger.error("Streaming sink failed; rerun with --resume %s", run_id, extra={"run_id": run_id})
+                raise
+            mark_stages(checkpoint, streamed, "done")
+            failed_rows.extend(engine_failures)
+            if sink.rows_written:
+                # The sink keeps nothing in memory; read back just the columns the analytics need.
+                run_stage(
+                    "analyze",
+                    write_analytics,
+                    read_export(export_path, export_format, columns=list(INPUT_COLUMNS)),
+                )
+        else:
+            combined_df, engine_failures = run_threaded(
+                tracer,
+                pending,
+                settings,
+                period,
+                interval,
+                run_id,
+                metrics,
+                prefetched=prefetched,
+                cache=cache,
+                summarizer=summarizer,
+                checkpoint=checkpoint,
+                quarantine=quarantine,
+            )
+            failed_rows.extend(engine_failures)
+            if combined_df or finished:
+                write_outputs(combine_frames(combined_df) if combined_df else None)
 
+        if summarizer is not None and checkpoint is not None:
+            summarize_checkpointed(summarizer, checkpoint, run_id)
+            checkpoint.mark("summarize", "done")
+
+        if checkpoint is not None and "fetch" in stages:
+            if failed_rows:
+                checkpoint.mark("fetch", "failed", error=f"{len(failed_rows)} tickers dead-lettered")
+            else:
+                checkpoint.mark("fetch", "done")
+
+        if failed_rows or len(quarantine):
+            # Failed tickers and quarantined rows share the dead-letter file; rule_ids marks the latter.
+            write_dead_letters(dead_letter_path, failed_rows, quarantine.to_frame(run_id))
+            if failed_rows:
+                logger.warning(
+                    "Failed rows written to %s; retry them with --resume %s",
+                    dead_letter_path,
+                    run_id,
+                    extra={"run_id": run_id},
+                )
+            if len(quarantine):
+                logger.warning(
+                    "%s rows failed validation and were written to %s",
+                    len(quarantine),
+                    dead_letter_path,
+                    extra={"run_id": run_id},
+                )
+        elif args.resume:
+            clear_dead_letters(dead_letter_path, run_id)
+
+    if cpu_pool is not None:
+        cpu_pool.close()
     logger.info("Pipeline complete", extra={"run_id": run_id})
 
 
-def process_ticker(tracer, symbol, run_id, ticker_counter, retry_counter, settings, period, interval):
+def mark_stages(checkpoint, stages, status, error=None):
+    if checkpoint is None:
+        return
+    for stage in stages:
+        checkpoint.mark(stage, status, error=error)
+
+
+def summarize_checkpointed(summarizer, checkpoint, run_id):
+    """Summarize checkpointed tickers that have no summary yet (e.g. a resumed run that skipped summarize)."""
+    done = checkpoint.summaries()
+    missing = [s for s in checkpoint.completed() if s not in done]
+    if not missing:
+        return
+    futures = {
+        symbol: summarizer.submit(symbol, extract_features(frame, symbol))
+        for symbol, frame in zip(missing, checkpoint.load_frames(missing))
+    }
+    collect_summaries(summarizer, futures, run_id, checkpoint)
+
+
+def write_dead_letters(path, failed_rows, quarantined):
+    frames = [frame for frame in (pd.DataFrame(failed_rows), quarantined) if not frame.empty]
+    pd.concat(frames, ignore_index=True).to_csv(path, index=False)
+
+
+def clear_dead_letters(path, run_id):
+    """Drop a resumed run's rows from the dead-letter file once every ticker has succeeded."""
+    if not os.path.isfile(path):
+        return
+    rows = pd.read_csv(path)
+    if "run_id" not in rows.columns:
+        return
+    kept = rows[rows["run_id"] != run_id]
+    if kept.empty:
+        os.remove(path)
+    elif len(kept) < len(rows):
+        kept.to_csv(path, index=False)
+
+
+def run_threaded(
+    tracer,
+    tickers,
+    settings,
+    period,
+    interval,
+    run_id,
+    metrics,
+    prefetched=None,
+    cache=None,
+    summarizer=None,
+    checkpoint=None,
+    quarantine=None,
+):
+    """
+    Process tickers on a ThreadPoolExecutor; returns (cleaned frames, dead-letter rows).
+    Features are handed to the summarizer (if any) as tickers finish, so batched LLM
+    requests overlap with the remaining fetches.
+    """
+    combined_df = []
+    failed_rows = []
+    summaries = {}
+
+    with ThreadPoolExecutor(max_workers=settings.max_workers) as executor:
+        # Each submission makes a single fetch attempt. Failed fetches are rescheduled on a
+        # timer thread, so backoff waits don't hold a worker slot.
+        scheduler = RetryScheduler(executor)
+
+        def submit(symbol, attempt, delay=0.0):
+            args = (
+                tracer,
+                symbol,
+                run_id,
+                metrics.ticker_counter,
+                metrics.retry_counter,
+                settings,
+                period,
+                interval,
+                prefetched.get(symbol) if prefetched is not None else None,
+                cache,
+                1,
+                summarizer is not None,
+                quarantine,
+            )
+            if delay:
+                future = scheduler.schedule(delay, process_ticker, *args)
+            else:
+                future = executor.submit(process_ticker, *args)
+            pending[future] = (symbol, attempt)
+
+        pending = {}
+        for ticker in tickers:
+            submit(ticker, 1)
+        try:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    symbol, attempt = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except FetchError as e:
+                        if attempt < settings.fetch_retries:
+                            delay = backoff_delay(settings.fetch_backoff, attempt)
+                            logger.warning(
+                                "Fetch attempt %s for %s failed; retrying in %.1f seconds",
+                                attempt,
+                                symbol,
+                                delay,
+                                extra={"run_id": run_id},
+                            )
+                            metrics.retry_counter.add(
+                                1, attributes={"ticker": symbol, "environment": settings.environment}
+                            )
+                            # The wait happens on the scheduler's timer; record the planned delay.
+                            record_wait("retry", delay, "fetch")
+                            submit(symbol, attempt + 1, delay)
+                            continue
+                        record_failure(symbol, e, run_id, failed_rows, metrics, settings)
+                    except Exception as e:  # noqa: BLE001
+                        record_failure(symbol, e, run_id, failed_rows, metrics, settings)
+                    else:
+                        if result is None:
+                            continue
+                        df_clean, features, fetch_duration = result
+                        if fetch_duration is not None:
+                            metrics.fetch_latency_hist.record(
+                                fetch_duration,
+                                attributes={"ticker": symbol, "environment": settings.environment},
+                            )
+                        combined_df.append(df_clean)
+                        if checkpoint is not None:
+                            checkpoint.save_frame(symbol, df_clean)
+                        if summarizer is not None:
+                            summaries[symbol] = summarizer.submit(symbol, features)
+        finally:
+            scheduler.shutdown()
+            if summarizer is not None:
+                collect_summaries(summarizer, summaries, run_id, checkpoint)
+
+    return combined_df, failed_rows
+
+
+def process_ticker(
+    tracer,
+    symbol,
+    run_id,
+    ticker_counter,
+    retry_counter,
+    settings,
+    period,
+    interval,
+    prefetched=None,
+    cache=None,
+    max_retries=None,
+    with_features=True,
+    quarantine=None,
+):
     with tracer.start_as_current_span(
         "process_ticker",
         attributes={"ticker": symbol, "run.id": run_id},
     ):
-        logger.info("Fetching live stock data for %s", symbol, extra={"run_id": run_id})
-        start = time.perf_counter()
-        result = fetch_stock_data_yf(
+        df_raw, attempts, fetch_duration = fetch_ticker(
             symbol,
-            period=period,
-            interval=interval,
-            max_retries=settings.fetch_retries,
-            backoff=settings.fetch_backoff,
-            timeout=settings.fetch_timeout,
-            return_attempts=True,
+            settings,
+            period,
+            interval,
+            prefetched=prefetched,
+            cache=cache,
+            max_retries=max_retries,
+            run_id=run_id,
         )
-        df_raw, attempts = result
-        fetch_duration = time.perf_counter() - start
         if df_raw is None or df_raw.empty:
             logger.warning("No data for %s. Skipping.", symbol, extra={"run_id": run_id})
             return None
 
         logger.info("Fetched %s rows for %s", len(df_raw), symbol, extra={"run_id": run_id})
 
-        # Transform
-        df_clean = clean_data(df_raw)
-        df_clean["Ticker"] = symbol
-
-        errors = validate_schema(df_clean)
-        if errors:
-            raise ValueError(f"Schema validation failed for {symbol}: {errors}")
-
-        # Analyze
-        trend_output = analyze_trends(df_clean)
-
-        # Summarize
-        summary = generate_summary(trend_output)
+        # Transform + validate, then reduce the history to a fixed-size feature set (summarized
+        # in batches by the caller); on the CPU process pool when CPU_WORKERS is set.
+        df_clean, features = prepare_and_extract(
+            symbol, df_raw, settings, interval, quarantine=quarantine, run_id=run_id, with_features=with_features
+        )
 
         logger.debug("Columns for %s: %s", symbol, df_clean.columns.tolist(), extra={"run_id": run_id})
         ticker_counter.add(1, attributes={"ticker": symbol, "environment": settings.environment})
         if attempts > 1:
             retry_counter.add(attempts - 1, attributes={"ticker": symbol, "environment": settings.environment})
-        return df_clean, summary, fetch_duration
+        return df_clean, features, fetch_duration
 
 
 if __name__ == "__main__":
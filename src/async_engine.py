@@ -0,0 +1,172 @@
+import asyncio
+import logging
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from opentelemetry import trace
+
+from src.extract_stocks import FetchError
+from src.observability import record_wait
+from src.pipeline import (
+    PipelineMetrics,
+    collect_summaries,
+    fetch_ticker,
+    prepare_and_extract,
+    record_failure,
+)
+from src.rate_limit import backoff_delay
+from src.schema import combine_frames
+
+logger = logging.getLogger(__name__)
+tracer = trace.get_tracer(__name__)
+
+
+def run_async_engine(
+    tickers: list[str],
+    settings,
+    period: str,
+    interval: str,
+    run_id: str,
+    metrics: PipelineMetrics,
+    prefetched: dict[str, tuple[pd.DataFrame, int]] | None = None,
+    cache=None,
+    sink: Callable[[pd.DataFrame], None] | None = None,
+    summarizer=None,
+    checkpoint=None,
+    quarantine=None,
+) -> tuple[list[pd.DataFrame], list[dict]]:
+    """
+    asyncio alternative to the ThreadPoolExecutor driver. Every ticker is a coroutine;
+    fetches run under a semaphore, and blocking calls are pushed onto one bounded
+    thread pool. Features go to the summarizer (if any) as tickers finish,
+    which batches them into LLM requests under its own concurrency cap. Cleaned frames are
+    collected as tickers finish; if given, `sink` is called once with the combined frame
+    after the last ticker. With a checkpoint, each cleaned frame is saved as its ticker finishes.
+    Rows failing validation go to `quarantine`.
+    Returns (cleaned frames, dead-letter rows).
+    """
+    return asyncio.run(
+        _run(
+            tickers,
+            settings,
+            period,
+            interval,
+            run_id,
+            metrics,
+            prefetched or {},
+            cache,
+            sink,
+            summarizer,
+            checkpoint,
+            quarantine,
+        )
+    )
+
+
+async def _run(
+    tickers, settings, period, interval, run_id, metrics, prefetched, cache, sink, summarizer, checkpoint, quarantine
+):
+    fetch_slots = asyncio.Semaphore(settings.async_fetch_concurrency)
+
+    # Threads are only needed for calls actually in flight, not for every pending ticker;
+    # one more runs the sink.
+    pool_size = settings.async_fetch_concurrency + 1 + settings.max_workers
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="trendnest-async")
+    loop.set_default_executor(executor)
+
+    combined: list[pd.DataFrame] = []
+    failed_rows: list[dict] = []
+    summaries = {}
+
+    with tracer.start_as_current_span("async_engine", attributes={"tickers.count": len(tickers)}):
+        tasks = [
+            asyncio.create_task(
+                _process(
+                    symbol,
+                    settings,
+                    period,
+                    interval,
+                    run_id,
+                    metrics,
+                    prefetched.get(symbol),
+                    cache,
+                    fetch_slots,
+                    summarizer is not None,
+                    quarantine,
+                )
+            )
+            for symbol in tickers
+        ]
+        for next_done in asyncio.as_completed(tasks):
+            symbol, result, error = await next_done
+            if error is not None:
+                record_failure(symbol, error, run_id, failed_rows, metrics, settings)
+                continue
+            if result is None:
+                continue
+            df_clean, features = result
+            combined.append(df_clean)
+            if checkpoint is not None:
+                await asyncio.to_thread(checkpoint.save_frame, symbol, df_clean)
+            if summarizer is not None:
+                summaries[symbol] = summarizer.submit(symbol, features)
+        if summarizer is not None:
+            # Sends the last partial batch; waits on the LLM pool, not the event loop's threads.
+            await asyncio.to_thread(collect_summaries, summarizer, summaries, run_id, checkpoint)
+
+        if sink is not None and combined:
+            full_df = combine_frames(combined)
+            await asyncio.to_thread(sink, full_df)
+
+    executor.shutdown(wait=False)
+    return combined, failed_rows
+
+
+async def _process(
+    symbol,
+    settings,
+    period,
+    interval,
+    run_id,
+    metrics,
+    prefetched,
+    cache,
+    fetch_slots,
+    with_features=True,
+    quarantine=None,
+):
+    """Run one ticker through fetch/transform/features; returns (symbol, (df_clean, features) or None, error)."""
+    attributes = {"ticker": symbol, "environment": settings.environment}
+    try:
+        for attempt in range(1, settings.fetch_retries + 1):
+            try:
+                async with fetch_slots:
+                    df_raw, _, fetch_duration = await asyncio.to_thread(
+                        fetch_ticker, symbol, settings, period, interval, prefetched, cache, 1, run_id
+                    )
+                break
+            except FetchError:
+                if attempt >= settings.fetch_retries:
+                    raise
+                metrics.retry_counter.add(1, attributes=attributes)
+                # Back off without holding a fetch slot or a thread.
+                delay = backoff_delay(settings.fetch_backoff, attempt)
+                await asyncio.sleep(delay)
+                record_wait("retry", delay, "fetch")
+
+        if fetch_duration is not None:
+            metrics.fetch_latency_hist.record(fetch_duration, attributes=attributes)
+        if df_raw is None or df_raw.empty:
+            logger.warning("No data for %s. Skipping.", symbol, extra={"run_id": run_id})
+            return symbol, None, None
+
+        df_clean, features = await asyncio.to_thread(
+            prepare_and_extract, symbol, df_raw, settings, interval, quarantine, run_id, with_features
+        )
+    except Exception as e:  # noqa: BLE001
+        return symbol, None, e
+
+    metrics.ticker_counter.add(1, attributes=attributes)
+    return symbol, (df_clean, features), None
@@ -0,0 +1,130 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Iterable
+
+import pandas as pd
+from opentelemetry import trace
+
+from src.atomic import atomic_write
+
+logger = logging.getLogger(__name__)
+tracer = trace.get_tracer(__name__)
+
+# Stages that can be selected with --stages, in run order. "fetch" covers fetch, clean and
+# validation of each ticker; "select" is implicit (the tickers are stored in the checkpoint).
+STAGES = ("fetch", "summarize", "export", "analyze", "store", "upload")
+
+
+def parse_stages(raw: str | None) -> list[str]:
+    """Comma-separated stage names (any order) -> list in run order; empty means every stage."""
+    if not raw:
+        return list(STAGES)
+    requested = {s.strip().lower() for s in raw.split(",") if s.strip()}
+    unknown = requested - set(STAGES)
+    if unknown:
+        raise ValueError(f"Unknown stages: {', '.join(sorted(unknown))} (expected any of {', '.join(STAGES)})")
+    return [s for s in STAGES if s in requested]
+
+
+class RunCheckpoint:
+    """
+    Outputs of one pipeline run, so a failed run can be resumed instead of starting over:
+    <root>/<run_id>/manifest.json          tickers, run parameters and per-stage status
+    <root>/<run_id>/frames/ticker=X.parquet cleaned bars, written as each ticker finishes
+    <root>/<run_id>/summaries.json         AI summaries collected so far
+    """
+
+    def __init__(self, root: str, run_id: str):
+        self.root = root
+        self.run_id = run_id
+        self.path = os.path.join(root, run_id)
+        self._lock = threading.Lock()
+        self.manifest: dict = {"run_id": run_id, "tickers": [], "params": {}, "stages": {}}
+
+    @classmethod
+    def create(cls, root: str, run_id: str, tickers: list[str], params: dict) -> "RunCheckpoint":
+        checkpoint = cls(root, run_id)
+        checkpoint.manifest.update(tickers=list(tickers), params=dict(params), created_at=time.time())
+        checkpoint._save_manifest()
+        return checkpoint
+
+    @classmethod
+    def load(cls, root: str, run_id: str) -> "RunCheckpoint":
+        checkpoint = cls(root, run_id)
+        manifest_path = os.path.join(checkpoint.path, "manifest.json")
+        if not os.path.isfile(manifest_path):
+            raise FileNotFoundError(f"No checkpoint for run {run_id} under {root}")
+        with open(manifest_path, encoding="utf-8") as f:
+            checkpoint.manifest = json.load(f)
+        return checkpoint
+
+    @property
+    def tickers(self) -> list[str]:
+        return list(self.manifest["tickers"])
+
+    @property
+    def params(self) -> dict:
+        return dict(self.manifest["params"])
+
+    def status(self, stage: str) -> str | None:
+        return self.manifest["stages"].get(stage, {}).get("status")
+
+    def is_done(self, stage: str) -> bool:
+        return self.status(stage) == "done"
+
+    def mark(self, stage: str, status: str, error: str | None = None) -> None:
+        entry = {"status": status, "updated_at": time.time()}
+        if error:
+            entry["error"] = error
+        with self._lock:
+            self.manifest["stages"][stage] = entry
+            self._save_manifest()
+        logger.info("Stage %s %s", stage, status, extra={"run_id": self.run_id})
+
+    def reset(self, stages: Iterable[str]) -> None:
+        """Forget stage results that new data has made stale (e.g. export after more tickers arrived)."""
+        with self._lock:
+            for stage in stages:
+                self.manifest["stages"].pop(stage, None)
+            self._save_manifest()
+
+    def frame_path(self, symbol: str) -> str:
+        return os.path.join(self.path, "frames", f"ticker={symbol}.parquet")
+
+    def save_frame(self, symbol: str, df: pd.DataFrame) -> None:
+        atomic_write(self.frame_path(symbol), lambda tmp: df.to_parquet(tmp, index=False))
+
+    def completed(self) -> list[str]:
+        """Tickers whose cleaned frame is checkpointed, in selection order."""
+        return [s for s in self.tickers if os.path.isfile(self.frame_path(s))]
+
+    def load_frames(self, symbols: Iterable[str] | None = None) -> list[pd.DataFrame]:
+        symbols = self.completed() if symbols is None else symbols
+        with tracer.start_as_current_span("checkpoint_load_frames", attributes={"run.id": self.run_id}):
+            return [pd.read_parquet(self.frame_path(s)) for s in symbols]
+
+    def summaries(self) -> dict[str, str]:
+        path = os.path.join(self.path, "summaries.json")
+        if not os.path.isfile(path):
+            return {}
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def save_summaries(self, summaries: dict[str, str]) -> None:
+        with self._lock:
+            merged = {**self.summaries(), **summaries}
+            atomic_write(
+                os.path.join(self.path, "summaries.json"),
+                lambda tmp: _dump_json(merged, tmp),
+            )
+
+    def _save_manifest(self) -> None:
+        atomic_write(os.path.join(self.path, "manifest.json"), lambda tmp: _dump_json(self.manifest, tmp))
+
+
+def _dump_json(data, path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
@@ -1,7 +1,6 @@
 # src/config.py
 import logging
 from functools import lru_cache
-from typing import List
 
 from dotenv import load_dotenv
 from opentelemetry import trace
@@ -26,42 +25,178 @@ class Settings(BaseSettings):
     data_source: str = Field("data/sample.csv", env="DATA_SOURCE")
     export_path: str = Field("data/cleaned_data.csv", env="EXPORT_PATH")
     dead_letter_path: str = Field("data/failed_rows.csv", env="DEAD_LETTER_PATH")
+    analytics_path: str = Field("data/analytics.csv", env="ANALYTICS_PATH")
+    # Per-run checkpoints (<checkpoint_dir>/<run_id>/) that --resume restarts from.
+    checkpoint_enabled: bool = Field(True, env="CHECKPOINT_ENABLED")
+    checkpoint_dir: str = Field("data/runs", env="CHECKPOINT_DIR")
+    # Per-ticker indicator state; runs only process bars newer than the stored state.
+    indicator_state_enabled: bool = Field(True, env="INDICATOR_STATE_ENABLED")
+    indicator_state_dir: str = Field("data/cache/indicators", env="INDICATOR_STATE_DIR")
+    # csv, csv.gz, parquet or feather; partition keys (Ticker, year, month) make export_path a directory.
+    export_format: str = Field("csv", env="EXPORT_FORMAT")
+    export_partition_by: str = Field("", env="EXPORT_PARTITION_BY")
 
     # Gemini / AI
+    # AI summaries (feature extraction + LLM); off skips the stage without importing the Gemini SDK.
+    summaries_enabled: bool = Field(True, env="SUMMARIES_ENABLED")
     gemini_api_key: str = Field("", env="GEMINI_API_KEY")
+    # "gemini", or "stub" for a local canned-answer model (tests/benchmarks).
+    llm_backend: str = Field("gemini", env="LLM_BACKEND")
+    llm_stub_latency: float = Field(0.0, env="LLM_STUB_LATENCY")
+    # Tickers packed into one summarization request, concurrent requests, per-request timeout (s), attempts.
+    summary_batch_size: int = Field(8, env="SUMMARY_BATCH_SIZE")
+    summary_max_concurrency: int = Field(4, env="SUMMARY_MAX_CONCURRENCY")
+    summary_timeout: float = Field(60.0, env="SUMMARY_TIMEOUT")
+    summary_retries: int = Field(3, env="SUMMARY_RETRIES")
+    summary_backoff: float = Field(1.0, env="SUMMARY_BACKOFF")
 
     # GCP / BigQuery
+    # Off skips the upload stage (and the Google client libraries) entirely.
+    upload_enabled: bool = Field(True, env="UPLOAD_ENABLED")
     gcp_project_id: str = Field("", env="GCP_PROJECT_ID")
     bq_dataset: str = Field("trendnest", env="BQ_DATASET")
     bq_table: str = Field("cleaned_stock_data", env="BQ_TABLE")
     google_credentials_path: str = Field("", env="GOOGLE_APPLICATION_CREDENTIALS")
+    # "append" or "merge" (idempotent upsert on Ticker, date, interval); chunks are Parquet load jobs.
+    bq_write_mode: str = Field("append", env="BQ_WRITE_MODE")
+    bq_chunk_rows: int = Field(50_000, env="BQ_CHUNK_ROWS")
+    # "bigquery", or "local" to write Parquet tables under bq_local_dir instead (dev/tests).
+    bq_writer: str = Field("bigquery", env="BQ_WRITER")
+    bq_local_dir: str = Field("data/warehouse", env="BQ_LOCAL_DIR")
+
+    # Embedded SQLite copy of the cleaned bars for local reports (src/queries.py); written
+    # alongside the upload, or instead of it with UPLOAD_ENABLED=false.
+    local_store_enabled: bool = Field(False, env="LOCAL_STORE_ENABLED")
+    local_store_path: str = Field("data/trendnest.sqlite", env="LOCAL_STORE_PATH")
 
     # Observability
     log_level: str = Field("INFO", env="LOG_LEVEL")
     environment: str = Field("dev", env="ENVIRONMENT")
     otel_exporter_otlp_endpoint: str = Field("", env="OTEL_EXPORTER_OTLP_ENDPOINT")
     otel_exporter_otlp_headers: str = Field("", env="OTEL_EXPORTER_OTLP_HEADERS")
+    # Without an OTLP endpoint: Prometheus text file written at exit ("" to skip) and an
+    # optional /metrics HTTP port (0 = off).
+    metrics_text_path: str = Field("data/metrics.prom", env="METRICS_TEXT_PATH")
+    metrics_port: int = Field(0, env="METRICS_PORT")
+    # Distinct values (e.g. tickers) an attribute keeps per pipeline metric before the rest
+    # are reported as "other"; 0 = no cap.
+    metric_attribute_limit: int = Field(100, env="METRIC_ATTRIBUTE_LIMIT")
+    # Tracing: fraction of trace roots sampled (children follow their parent); local span sink
+    # without an OTLP endpoint (console, file or none); a span per outbound HTTP request.
+    trace_sample_ratio: float = Field(1.0, env="TRACE_SAMPLE_RATIO")
+    trace_exporter: str = Field("console", env="TRACE_EXPORTER")
+    trace_file_path: str = Field("data/traces.jsonl", env="TRACE_FILE_PATH")
+    trace_http_requests: bool = Field(True, env="TRACE_HTTP_REQUESTS")
+    # Finished spans waiting for the background exporter; past this, new spans are dropped.
+    trace_queue_size: int = Field(8192, env="TRACE_QUEUE_SIZE")
 
     # Tickers
     top_performers_limit: int = Field(10, env="TOP_PERFORMERS_LIMIT")
-    tickers_universe: List[str] = Field(
+    tickers_universe: list[str] = Field(
         default_factory=lambda: [
             "AAPL", "MSFT", "GOOGL", "NVDA", "AMZN", "TSLA", "META", "NFLX", "INTC", "CSCO",
             "IBM", "ADBE", "PYPL", "CRM", "ORCL",
         ]
     )
     max_workers: int = Field(4, env="MAX_WORKERS")
+    # Processes for the per-ticker CPU work (clean, validate, features); 0 keeps it on the I/O threads.
+    cpu_workers: int = Field(0, env="CPU_WORKERS")
     fetch_timeout: int = Field(15, env="FETCH_TIMEOUT_SECONDS")
     fetch_retries: int = Field(5, env="FETCH_MAX_RETRIES")
     fetch_backoff: int = Field(3, env="FETCH_BACKOFF_SECONDS")
     fetch_period: str = Field("6mo", env="FETCH_PERIOD")
     fetch_interval: str = Field("1d", env="FETCH_INTERVAL")
+    # Connect timeout per request (FETCH_TIMEOUT_SECONDS is the read timeout).
+    fetch_connect_timeout_seconds: float = Field(5.0, env="FETCH_CONNECT_TIMEOUT_SECONDS")
+    # Keep-alive connections in the shared yfinance session (0 = as many as fetches run at once),
+    # and how long an identical market-data request is answered from memory (0 = never).
+    http_pool_size: int = Field(0, env="HTTP_POOL_SIZE")
+    http_cache_ttl_seconds: float = Field(0, env="HTTP_CACHE_TTL_SECONDS")
+    # Symbols per yf.download call; 0 or 1 keeps the per-ticker fetch path.
+    fetch_batch_size: int = Field(0, env="FETCH_BATCH_SIZE")
+
+    # Normalize cleaned frames to compact dtypes (float32 prices, narrow int Volume, categorical Ticker).
+    compact_dtypes: bool = Field(True, env="COMPACT_DTYPES")
+
+    # Execution engine: "threads" (ThreadPoolExecutor), "async" (asyncio with per-stage limits)
+    # or "staged" (worker pools per stage connected by bounded queues).
+    pipeline_engine: str = Field("threads", env="PIPELINE_ENGINE")
+    async_fetch_concurrency: int = Field(32, env="ASYNC_FETCH_CONCURRENCY")
+    staged_extract_workers: int = Field(4, env="STAGED_EXTRACT_WORKERS")
+    staged_transform_workers: int = Field(2, env="STAGED_TRANSFORM_WORKERS")
+    staged_analyze_workers: int = Field(2, env="STAGED_ANALYZE_WORKERS")
+    staged_summarize_workers: int = Field(4, env="STAGED_SUMMARIZE_WORKERS")
+    staged_queue_size: int = Field(8, env="STAGED_QUEUE_SIZE")
+    sink_chunk_rows: int = Field(50_000, env="SINK_CHUNK_ROWS")
+
+    # Rate limits (token bucket per provider); max_concurrency 0 means no per-host cap.
+    fetch_rate_per_second: float = Field(2.0, env="FETCH_RATE_PER_SECOND")
+    fetch_burst: int = Field(5, env="FETCH_BURST")
+    fetch_max_concurrency: int = Field(8, env="FETCH_MAX_CONCURRENCY")
+    llm_rate_per_second: float = Field(1.0, env="LLM_RATE_PER_SECOND")
+    llm_burst: int = Field(2, env="LLM_BURST")
+    llm_max_concurrency: int = Field(4, env="LLM_MAX_CONCURRENCY")
+
+    # Top-performer selection: pct_change, n_day_return, volume_surge or vol_adjusted_return.
+    ranking_metric: str = Field("pct_change", env="RANKING_METRIC")
+    ranking_lookback: int = Field(5, env="RANKING_LOOKBACK")
+
+    # Local OHLCV cache (Parquet per ticker/interval); runs only download bars newer than the cache.
+    price_cache_enabled: bool = Field(True, env="PRICE_CACHE_ENABLED")
+    price_cache_dir: str = Field("data/cache/prices", env="PRICE_CACHE_DIR")
+
+    # LLM summary cache (SQLite), keyed on a hash of prompt + model; TTL/max entries of 0 disable the limit.
+    summary_cache_enabled: bool = Field(True, env="SUMMARY_CACHE_ENABLED")
+    summary_cache_path: str = Field("data/cache/summaries.sqlite", env="SUMMARY_CACHE_PATH")
+    summary_cache_ttl_seconds: int = Field(7 * 24 * 3600, env="SUMMARY_CACHE_TTL_SECONDS")
+    summary_cache_max_entries: int = Field(5000, env="SUMMARY_CACHE_MAX_ENTRIES")
 
     @field_validator("log_level")
     @classmethod
     def normalize_log_level(cls, v: str) -> str:
         return v.upper()
 
+    @field_validator("trace_exporter")
+    @classmethod
+    def validate_trace_exporter(cls, v: str) -> str:
+        from src.observability import TRACE_EXPORTERS
+
+        v = v.lower()
+        if v not in TRACE_EXPORTERS:
+            raise ValueError(f"trace_exporter must be one of {TRACE_EXPORTERS}")
+        return v
+
+    @field_validator("trace_sample_ratio")
+    @classmethod
+    def validate_trace_sample_ratio(cls, v: float) -> float:
+        if not 0.0 <= v <= 1.0:
+            raise ValueError("trace_sample_ratio must be between 0 and 1")
+        return v
+
+    @field_validator("ranking_metric")
+    @classmethod
+    def validate_ranking_metric(cls, v: str) -> str:
+        from src.ranking import RANKING_METRICS
+
+        v = v.lower()
+        if v not in RANKING_METRICS:
+            raise ValueError(f"ranking_metric must be one of {RANKING_METRICS}")
+        return v
+
+    @field_validator("export_format")
+    @classmethod
+    def validate_export_format(cls, v: str) -> str:
+        from src.export import check_format
+
+        return check_format(v)
+
+    @field_validator("export_partition_by")
+    @classmethod
+    def validate_export_partition_by(cls, v: str) -> str:
+        from src.export import parse_partition_by
+
+        return ",".join(parse_partition_by(v))
+
     @field_validator("tickers_universe", mode="before")
     @classmethod
     def split_tickers(cls, v):
@@ -70,32 +205,43 @@ class Settings(BaseSettings):
         return v
 
 
-@lru_cache()
+@lru_cache
 def get_settings() -> Settings:
     return Settings()
 
 
-# Fetch top performing stocks (e.g. based on % daily change)
-def get_top_performing_stocks(limit: int | None = None) -> List[str]:
-    import yfinance as yf
+# Fetch top performing stocks (by default % daily change; see src/ranking.py for other metrics)
+def get_top_performing_stocks(
+    limit: int | None = None,
+    metric: str | None = None,
+    lookback: int | None = None,
+) -> list[str]:
+    from src.extract_stocks import fetch_stock_data_batch
+    from src.price_cache import PriceCache
+    from src.ranking import lookback_period, rank_frames
+    from src.rate_limit import get_limiter
 
     settings = get_settings()
     selected_limit = limit or settings.top_performers_limit
+    selected_metric = metric or settings.ranking_metric
+    selected_lookback = lookback or settings.ranking_lookback
 
     symbols = settings.tickers_universe
 
-    changes = []
     with tracer.start_as_current_span("select_top_performers", attributes={"universe_size": len(symbols)}):
-        for symbol in symbols:
-            ticker = yf.Ticker(symbol)
-            hist = ticker.history(period="2d")  # fetch previous and current close
-            if len(hist) >= 2:
-                prev_close = hist['Close'].iloc[-2]
-                today_close = hist['Close'].iloc[-1]
-                pct_change = ((today_close - prev_close) / prev_close) * 100
-                changes.append((symbol, pct_change))
-
-        sorted_changes = sorted(changes, key=lambda x: x[1], reverse=True)
-        top_symbols = [sym for sym, _ in sorted_changes[:selected_limit]]
-        logger.info("Top %s performing stocks: %s", selected_limit, top_symbols)
+        # One bulk download (or cache read) for the whole universe instead of a history() call per symbol.
+        frames = fetch_stock_data_batch(
+            symbols,
+            period=lookback_period(selected_metric, selected_lookback),
+            interval="1d",
+            batch_size=settings.fetch_batch_size if settings.fetch_batch_size > 1 else len(symbols),
+            max_retries=settings.fetch_retries,
+            backoff=settings.fetch_backoff,
+            timeout=settings.fetch_timeout,
+            cache=PriceCache(settings.price_cache_dir) if settings.price_cache_enabled else None,
+            # Shares the extractor's yfinance budget; pass a different limiter name to separate them.
+            limiter=get_limiter("yfinance"),
+        )
+        top_symbols = rank_frames(frames, selected_limit, metric=selected_metric, lookback=selected_lookback)
+        logger.info("Top %s performing stocks by %s: %s", selected_limit, selected_metric, top_symbols)
         return top_symbols
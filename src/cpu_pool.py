@@ -0,0 +1,111 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from opentelemetry import trace
+
+logger = logging.getLogger(__name__)
+tracer = trace.get_tracer(__name__)
+
+
+def to_ipc(df: pd.DataFrame):
+    """Serialize a frame as an Arrow IPC stream (one contiguous buffer; dtypes and index are preserved)."""
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def from_ipc(buffer) -> pd.DataFrame:
+    import pyarrow as pa
+
+    return pa.ipc.open_stream(buffer).read_all().to_pandas()
+
+
+class CpuPool:
+    """
+    Process pool for the per-ticker CPU work (cleaning, validation and feature extraction),
+    so it runs outside the GIL that the I/O threads share. Frames cross the process
+    boundary as Arrow IPC buffers rather than pickled DataFrames. Workers are spawned
+    (not forked) since the parent already runs threads, and started on first use.
+    """
+
+    def __init__(self, workers: int, log_level: str | None = None):
+        self.workers = workers
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(log_level,),
+        )
+
+    def prepare(
+        self,
+        symbol: str,
+        df_raw: pd.DataFrame,
+        compact: bool = True,
+        interval: str = "1d",
+        quarantine=None,
+        run_id: str | None = None,
+        with_features: bool = True,
+    ) -> tuple[pd.DataFrame, dict | None]:
+        """
+        pipeline.prepare_ticker (plus extract_features if with_features) in a worker; blocks
+        the calling thread until it is done. Returns (cleaned frame, features or None).
+        Quarantined rows are handed to `quarantine` here, in the parent.
+        """
+        with tracer.start_as_current_span("cpu_pool.prepare", attributes={"ticker": symbol, "rows": len(df_raw)}):
+            future = self._executor.submit(
+                _prepare_in_worker, symbol, to_ipc(df_raw), compact, interval, run_id, with_features
+            )
+            clean, rejected, features = future.result()
+            if quarantine is not None and rejected is not None:
+                quarantine.add(from_ipc(rejected))
+            return from_ipc(clean), features
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+_pool: CpuPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_cpu_pool() -> CpuPool | None:
+    """The configured process pool, or None when the CPU work runs on the calling thread."""
+    return _pool
+
+
+def configure_cpu_pool(workers: int, log_level: str | None = None) -> CpuPool | None:
+    """(Re)create the shared pool with `workers` processes; 0 switches it off."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        _pool = CpuPool(workers, log_level=log_level) if workers > 0 else None
+        if _pool is not None:
+            logger.info("CPU stages run on a pool of %s processes", workers)
+        return _pool
+
+
+def _init_worker(log_level: str | None) -> None:
+    from src.observability import setup_logging
+
+    setup_logging(log_level)
+
+
+def _prepare_in_worker(symbol, raw, compact, interval, run_id, with_features):
+    from src.features import extract_features
+    from src.pipeline import prepare_ticker
+    from src.validation import Quarantine
+
+    quarantine = Quarantine()
+    df_clean = prepare_ticker(symbol, from_ipc(raw), compact, interval, quarantine, run_id)
+    features = extract_features(df_clean, symbol) if with_features else None
+    rejected = to_ipc(quarantine.rows()) if len(quarantine) else None
+    return to_ipc(df_clean), rejected, features
@@ -0,0 +1,232 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Sequence
+
+import numpy as np
+import pandas as pd
+from opentelemetry import trace
+
+from src.export import detect_format, export_columns, filter_frame, read_export
+
+logger = logging.getLogger(__name__)
+tracer = trace.get_tracer(__name__)
+
+CHART_COLUMNS = ("date", "Ticker", "Close", "Volume")
+
+
+def export_version(path: str) -> tuple:
+    """
+    Cheap fingerprint of an export: inode, size and mtime of the file, or of every part
+    file of a dataset directory. Exports are swapped into place, so a rewrite changes it.
+    """
+    stat = os.stat(path)
+    if not os.path.isdir(path):
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+    parts = 0
+    latest = stat.st_mtime_ns
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            part = os.stat(os.path.join(root, name))
+            parts += 1
+            total += part.st_size
+            latest = max(latest, part.st_mtime_ns)
+    return (stat.st_ino, parts, total, latest)
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Indices of the points kept by Largest-Triangle-Three-Buckets downsampling: the first
+    and last points plus, per bucket, the point forming the largest triangle with the
+    previously kept point and the next bucket's average. Peaks and troughs survive,
+    unlike with tail() or fixed-stride sampling.
+    """
+    n = len(x)
+    if threshold >= n or threshold <= 0:
+        return np.arange(n)
+    if threshold < 3:
+        return np.array([0, n - 1][:threshold])
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    return _lttb_segments(x, y, np.array([0]), np.array([n]), threshold)[0]
+
+
+def _lttb_segments(x, y, starts, lengths, threshold) -> np.ndarray:
+    """
+    LTTB over many series at once: series k is x/y[starts[k]:starts[k] + lengths[k]], each
+    longer than threshold. Buckets are walked in lockstep across all series, so the Python
+    loop runs `threshold` times rather than threshold times per series.
+    Returns absolute indices, shape (series, threshold).
+    """
+    count = len(starts)
+    # Bucket i of a series covers [edges[i], edges[i + 1]) of its interior points.
+    steps = np.arange(threshold - 1)
+    edges = np.floor(steps[None, :] * (lengths[:, None] - 2) / (threshold - 2)).astype(int) + 1
+    edges[:, -1] = lengths - 1
+    edges += starts[:, None]
+    sizes = np.diff(edges, axis=1)
+    # Edges increase across series too, so one reduceat yields every bucket sum; the sum
+    # after each series' last edge spans into the next series and is dropped.
+    flat = edges.ravel()
+    last = starts + lengths - 1
+    avg_x = np.column_stack([np.add.reduceat(x, flat).reshape(count, -1)[:, :-1] / sizes, x[last]])
+    avg_y = np.column_stack([np.add.reduceat(y, flat).reshape(count, -1)[:, :-1] / sizes, y[last]])
+
+    kept = np.empty((count, threshold), dtype=int)
+    kept[:, 0], kept[:, -1] = starts, last
+    offsets = np.arange(sizes.max())
+    rows = np.arange(count)
+    a = starts.copy()
+    for i in range(threshold - 2):
+        lo, hi = edges[:, i], edges[:, i + 1]
+        idx = lo[:, None] + offsets[None, :]
+        valid = idx < hi[:, None]
+        idx = np.where(valid, idx, lo[:, None])
+        xa, ya = x[a][:, None], y[a][:, None]
+        area = np.abs((xa - avg_x[:, i + 1, None]) * (y[idx] - ya) - (xa - x[idx]) * (avg_y[:, i + 1, None] - ya))
+        area[~valid] = -1.0
+        a = idx[rows, area.argmax(axis=1)]
+        kept[:, i + 1] = a
+    return kept
+
+
+def downsample(df: pd.DataFrame, points: int, value: str = "Close") -> pd.DataFrame:
+    """LTTB per ticker on `value` over `date`, to at most `points` rows each; other columns follow."""
+    if df.empty or points <= 0:
+        return df
+    points = max(points, 3)
+    df = df.sort_values(["Ticker", "date"], kind="stable").reset_index(drop=True)
+    codes, _ = pd.factorize(df["Ticker"])
+    # Rows are grouped by ticker after the sort, so each ticker is one contiguous slice.
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(codes)) + 1])
+    lengths = np.diff(np.append(starts, len(df)))
+    long = lengths > points
+    keep = [np.arange(s, s + n) for s, n in zip(starts[~long], lengths[~long])]
+    if long.any():
+        # Seconds since the first bar keep the triangle areas well-conditioned.
+        dates = df["date"].to_numpy().astype("datetime64[ns]").astype("int64")
+        x = (dates - dates.min()) / 1e9
+        y = df[value].to_numpy(dtype="float64")
+        keep.append(_lttb_segments(x, y, starts[long], lengths[long], points).ravel())
+    return df.iloc[np.sort(np.concatenate(keep))].reset_index(drop=True)
+
+
+class DashboardData:
+    """
+    Read side of the dashboard. Queries go through read_export, so Parquet/Feather
+    exports only read the selected tickers, columns and dates; a CSV export is parsed
+    once and filtered in memory. Results are cached (LRU of `max_entries`) under the
+    export's version; the first call that sees a new export drops every entry of the
+    old one, so a re-export never keeps two parsed copies in memory.
+    """
+
+    def __init__(self, path: str, fmt: str | None = None, max_entries: int = 32):
+        self.path = path
+        self.fmt = fmt
+        self.max_entries = max(1, max_entries)
+        self._cache: OrderedDict[Hashable, object] = OrderedDict()
+        self._version: tuple | None = None
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    @property
+    def format(self) -> str:
+        return self.fmt or detect_format(self.path)
+
+    def version(self) -> tuple:
+        return export_version(self.path)
+
+    def columns(self) -> list[str]:
+        return self._cached(("columns",), lambda: export_columns(self.path, self.format))
+
+    def tickers(self) -> list[str]:
+        return self._cached(
+            ("tickers",),
+            lambda: sorted(self._read(columns=["Ticker"])["Ticker"].dropna().astype(str).unique().tolist()),
+        )
+
+    def date_range(self, tickers: Sequence[str]) -> tuple[pd.Timestamp | None, pd.Timestamp | None]:
+        def load():
+            dates = self._read(tickers=tickers, columns=["date"])["date"].dropna()
+            return (dates.min(), dates.max()) if len(dates) else (None, None)
+
+        return self._cached(("date_range", tuple(tickers)), load)
+
+    def frame(self, tickers: Sequence[str], start=None, end=None, columns: Sequence[str] | None = None) -> pd.DataFrame:
+        """Full-resolution rows for the selection; `end` as a date includes that whole day."""
+        end = _end_of_day(end)
+        key = ("frame", tuple(tickers), start, end, tuple(columns) if columns is not None else None)
+        return self._cached(key, lambda: self._read(tickers=tickers, columns=columns, start=start, end=end))
+
+    def chart_frame(
+        self,
+        tickers: Sequence[str],
+        start=None,
+        end=None,
+        points: int = 300,
+        smooth_window: int | None = None,
+    ) -> pd.DataFrame:
+        """At most `points` rows per ticker, optionally smoothed first with a rolling mean of Close."""
+        end = _end_of_day(end)
+
+        def load():
+            with tracer.start_as_current_span("dashboard_chart_frame", attributes={"tickers.count": len(tickers)}):
+                df = self.frame(tickers, start, end, columns=CHART_COLUMNS)
+                if smooth_window:
+                    df = df.sort_values(["Ticker", "date"], kind="stable")
+                    close = df.groupby("Ticker", sort=False)["Close"].rolling(smooth_window, min_periods=1).mean()
+                    df = df.assign(Close=close.reset_index(level=0, drop=True))
+                return downsample(df, points)
+
+        return self._cached(("chart", tuple(tickers), start, end, points, smooth_window), load)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def _cached(self, key: tuple, load: Callable):
+        version = self.version()
+        full_key = (version, *key)
+        with self._lock:
+            if version != self._version:
+                self._version = version
+                for stale in [k for k in self._cache if k[0] != version]:
+                    del self._cache[stale]
+            if full_key in self._cache:
+                self._cache.move_to_end(full_key)
+                return self._cache[full_key]
+        value = load()
+        with self._lock:
+            if version != self._version:
+                # The export changed while loading; don't cache a result for the old one.
+                return value
+            self._cache[full_key] = value
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return value
+
+    def _read(self, tickers=None, columns=None, start=None, end=None) -> pd.DataFrame:
+        tickers = list(tickers) if tickers is not None else None
+        columns = list(columns) if columns is not None else None
+        if not self.format.startswith("csv"):
+            self.loads += 1
+            return read_export(self.path, self.format, tickers=tickers, columns=columns, start=start, end=end)
+        # CSV has no pushdown: parse the whole file once per version and filter in memory.
+        df = self._cached(("csv",), self._read_csv)
+        return filter_frame(df, tickers, start, end, columns)
+
+    def _read_csv(self) -> pd.DataFrame:
+        self.loads += 1
+        return read_export(self.path, self.format)
+
+
+def _end_of_day(end):
+    """A bare date as the end of a range covers the whole day (intraday bars included)."""
+    if end is None:
+        return None
+    ts = pd.Timestamp(end)
+    if ts == ts.normalize() and not isinstance(end, pd.Timestamp):
+        return ts + pd.Timedelta(days=1) - pd.Timedelta(1, "ns")
+    return ts
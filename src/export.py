@@ -1,11 +1,286 @@
 import logging
+import os
+import shutil
+import uuid
+from collections.abc import Sequence
+
+import pandas as pd
 from opentelemetry import trace
 
+from src.observability import record_output, timed_stage
+
 logger = logging.getLogger(__name__)
 tracer = trace.get_tracer(__name__)
 
+EXPORT_FORMATS = ("csv", "csv.gz", "parquet", "feather")
+# Partition keys: Ticker, or calendar year/month derived from `date`.
+PARTITION_KEYS = ("Ticker", "year", "month")
+_DERIVED_KEYS = ("year", "month")
+_EXTENSIONS = {"csv": ".csv", "csv.gz": ".csv.gz", "parquet": ".parquet", "feather": ".feather"}
+_DATASET_FORMATS = {"parquet": "parquet", "feather": "ipc"}
+
 
 def export_to_csv(df, path):
     with tracer.start_as_current_span("export_to_csv", attributes={"path": path}):
-        df.to_csv(path, index=False)
-        logger.info("Data exported to %s", path)
+        export_frame(df, path, "csv")
+
+
+@timed_stage("export")
+def export_frame(df: pd.DataFrame, path: str, fmt: str = "csv", partition_by: Sequence[str] | None = None) -> str:
+    """
+    Write df to path as csv, csv.gz, parquet or feather. Parquet and Feather keep dtypes,
+    so readers skip parsing. With partition_by, path becomes a hive-partitioned dataset
+    directory (e.g. path/Ticker=AAPL/part-....parquet). The export is built next to path
+    and renamed into place, so readers never see a half-written file.
+    """
+    fmt = check_format(fmt)
+    partition_by = check_partition_by(partition_by)
+    with tracer.start_as_current_span(
+        "export_frame",
+        attributes={"path": path, "format": fmt, "partition_by": ",".join(partition_by), "rows": len(df)},
+    ):
+        staging = staging_path(path)
+        try:
+            if partition_by:
+                append_part(df, staging, fmt, partition_by)
+            else:
+                _write_file(df, staging, fmt)
+            swap_into_place(staging, path)
+        except Exception:
+            remove_path(staging)
+            raise
+        record_output("export", len(df), path_size(path))
+        logger.info("Data exported to %s (%s)", path, fmt)
+        return path
+
+
+def append_part(df: pd.DataFrame, path: str, fmt: str, partition_by: Sequence[str] | None = None) -> None:
+    """
+    Add df to the export at path. Unpartitioned CSV appends to a single file; everything
+    else is a dataset directory that gains a new part file per call (one per partition).
+    """
+    fmt = check_format(fmt)
+    partition_by = check_partition_by(partition_by)
+    if not partition_by and fmt.startswith("csv"):
+        _append_csv(df, path, fmt)
+        return
+    if not partition_by:
+        os.makedirs(path, exist_ok=True)
+        _write_file(df, os.path.join(path, _part_name(fmt)), fmt)
+        return
+
+    df = _with_partition_columns(df, partition_by)
+    for key, group in df.groupby(partition_by, observed=True, sort=False):
+        key = key if isinstance(key, tuple) else (key,)
+        part_dir = os.path.join(path, *(f"{k}={v}" for k, v in zip(partition_by, key)))
+        os.makedirs(part_dir, exist_ok=True)
+        group = group.drop(columns=partition_by)
+        if fmt.startswith("csv"):
+            # One CSV per partition, appended to, so streaming writes don't explode the file count.
+            _append_csv(group, os.path.join(part_dir, f"part-0{_EXTENSIONS[fmt]}"), fmt)
+        else:
+            _write_file(group, os.path.join(part_dir, _part_name(fmt)), fmt)
+
+
+def read_export(
+    path: str,
+    fmt: str | None = None,
+    tickers: Sequence[str] | None = None,
+    columns: Sequence[str] | None = None,
+    start=None,
+    end=None,
+) -> pd.DataFrame:
+    """
+    Load an export, reading only the requested tickers, columns and date range.
+    Parquet/Feather push column selection and filters down to the Arrow reader and
+    skip partitions that cannot match; CSV is filtered after parsing.
+    """
+    fmt = check_format(fmt or detect_format(path))
+    with tracer.start_as_current_span("read_export", attributes={"path": path, "format": fmt}):
+        if fmt.startswith("csv"):
+            return _read_csv_export(path, tickers, columns, start, end)
+        return _read_dataset(path, fmt, tickers, columns, start, end)
+
+
+def export_columns(path: str, fmt: str | None = None) -> list:
+    """Column names of an export, read from the schema or header only."""
+    fmt = check_format(fmt or detect_format(path))
+    if not fmt.startswith("csv"):
+        import pyarrow.dataset as ds
+
+        dataset = ds.dataset(path, format=_DATASET_FORMATS[fmt], partitioning="hive" if os.path.isdir(path) else None)
+        return [name for name in dataset.schema.names if name not in _DERIVED_KEYS]
+    if not os.path.isdir(path):
+        return list(pd.read_csv(path, nrows=0).columns)
+    for root, _, files in os.walk(path):
+        keys = [part.split("=", 1)[0] for part in os.path.relpath(root, path).split(os.sep) if "=" in part]
+        for name in sorted(files):
+            if name.endswith((".csv", ".csv.gz")):
+                header = list(pd.read_csv(os.path.join(root, name), nrows=0).columns)
+                return header + [k for k in keys if k not in _DERIVED_KEYS]
+    return []
+
+
+def detect_format(path: str) -> str:
+    """Infer the export format from a file extension, or from the part files of a dataset directory."""
+    names = [path]
+    if os.path.isdir(path):
+        names = [name for _, _, files in os.walk(path) for name in files]
+    for name in names:
+        for fmt in ("csv.gz", "csv", "parquet", "feather"):
+            if name.endswith(_EXTENSIONS[fmt]):
+                return fmt
+        if name.endswith(".arrow"):
+            return "feather"
+    return "parquet" if os.path.isdir(path) else "csv"
+
+
+def check_format(fmt: str) -> str:
+    fmt = fmt.lower()
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format {fmt!r}; expected one of {EXPORT_FORMATS}")
+    return fmt
+
+
+def check_partition_by(partition_by: Sequence[str] | None) -> list:
+    partition_by = list(partition_by or [])
+    unknown = [key for key in partition_by if key not in PARTITION_KEYS]
+    if unknown:
+        raise ValueError(f"Unsupported partition keys {unknown}; expected a subset of {PARTITION_KEYS}")
+    return partition_by
+
+
+def parse_partition_by(value: str) -> list:
+    """Comma-separated partition keys (as in EXPORT_PARTITION_BY or --partition-by) to a validated list."""
+    return check_partition_by([item.strip() for item in (value or "").split(",") if item.strip()])
+
+
+def staging_path(path: str) -> str:
+    """A sibling path to build an export in before swap_into_place()."""
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    return os.path.join(parent, f".{os.path.basename(path)}.{uuid.uuid4().hex}.tmp")
+
+
+def swap_into_place(staging: str, path: str) -> None:
+    """Rename a finished export over path; a previous export (file or directory) is removed afterwards."""
+    if os.path.isdir(path) or (os.path.isdir(staging) and os.path.exists(path)):
+        # os.replace cannot overwrite a directory, so move the old one aside first.
+        old = f"{staging}.old"
+        os.replace(path, old)
+        os.replace(staging, path)
+        remove_path(old)
+    else:
+        os.replace(staging, path)
+
+
+def path_size(path: str) -> int:
+    """Bytes on disk of a file, or of every file under a dataset directory."""
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def remove_path(path: str) -> None:
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def _part_name(fmt: str) -> str:
+    return f"part-{uuid.uuid4().hex}{_EXTENSIONS[fmt]}"
+
+
+def _write_file(df: pd.DataFrame, path: str, fmt: str) -> None:
+    if fmt == "parquet":
+        df.to_parquet(path, index=False)
+    elif fmt == "feather":
+        df.reset_index(drop=True).to_feather(path)
+    else:
+        df.to_csv(path, index=False, compression="gzip" if fmt == "csv.gz" else None)
+
+
+def _append_csv(df: pd.DataFrame, path: str, fmt: str) -> None:
+    # Appended gzip members form a valid multi-member gzip stream.
+    header = not os.path.exists(path)
+    df.to_csv(path, mode="a", header=header, index=False, compression="gzip" if fmt == "csv.gz" else None)
+
+
+def _with_partition_columns(df: pd.DataFrame, partition_by: Sequence[str]) -> pd.DataFrame:
+    derived = {}
+    if "year" in partition_by:
+        derived["year"] = pd.to_datetime(df["date"]).dt.year
+    if "month" in partition_by:
+        derived["month"] = pd.to_datetime(df["date"]).dt.strftime("%Y-%m")
+    return df.assign(**derived) if derived else df
+
+
+def _read_csv_export(path, tickers, columns, start, end) -> pd.DataFrame:
+    usecols = None
+    if columns is not None:
+        # date is always parsed; Ticker is needed to filter. Both are dropped again below if unrequested.
+        usecols = list(dict.fromkeys([*columns, "date", *(["Ticker"] if tickers is not None else [])]))
+
+    if not os.path.isdir(path):
+        df = pd.read_csv(path, usecols=usecols, parse_dates=["date"])
+        return filter_frame(df, tickers, start, end, columns)
+
+    frames = []
+    for root, _, files in os.walk(path):
+        keys = dict(part.split("=", 1) for part in os.path.relpath(root, path).split(os.sep) if "=" in part)
+        if tickers is not None and "Ticker" in keys and keys["Ticker"] not in tickers:
+            continue
+        for name in sorted(files):
+            if not name.endswith(".csv") and not name.endswith(".csv.gz"):
+                continue
+            file_cols = None if usecols is None else [c for c in usecols if c not in keys]
+            frame = pd.read_csv(os.path.join(root, name), usecols=file_cols, parse_dates=["date"])
+            frames.append(frame.assign(**{k: v for k, v in keys.items() if k not in _DERIVED_KEYS}))
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=usecols or ["date"])
+    return filter_frame(df, tickers, start, end, columns)
+
+
+def filter_frame(df, tickers=None, start=None, end=None, columns=None):
+    """In-memory equivalent of read_export's filters, for frames already loaded."""
+    mask = pd.Series(True, index=df.index)
+    if tickers is not None:
+        mask &= df["Ticker"].isin(list(tickers))
+    if start is not None:
+        mask &= df["date"] >= _timestamp_like(start, getattr(df["date"].dt, "tz", None))
+    if end is not None:
+        mask &= df["date"] <= _timestamp_like(end, getattr(df["date"].dt, "tz", None))
+    df = df[mask].reset_index(drop=True)
+    return df[list(columns)] if columns is not None else df
+
+
+def _timestamp_like(value, tz) -> pd.Timestamp:
+    ts = pd.Timestamp(value)
+    if tz is not None and ts.tzinfo is None:
+        ts = ts.tz_localize(tz)
+    return ts
+
+
+def _read_dataset(path, fmt, tickers, columns, start, end) -> pd.DataFrame:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(path, format=_DATASET_FORMATS[fmt], partitioning="hive" if os.path.isdir(path) else None)
+    conditions = []
+    if tickers is not None:
+        conditions.append(ds.field("Ticker").isin(list(tickers)))
+    if "date" in dataset.schema.names:
+        date_type = dataset.schema.field("date").type
+        tz = getattr(date_type, "tz", None)
+        if start is not None:
+            conditions.append(ds.field("date") >= pa.scalar(_timestamp_like(start, tz), type=date_type))
+        if end is not None:
+            conditions.append(ds.field("date") <= pa.scalar(_timestamp_like(end, tz), type=date_type))
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+
+    if columns is None:
+        # Derived partition keys are a storage detail, not part of the exported frame.
+        columns = [name for name in dataset.schema.names if name not in _DERIVED_KEYS]
+    return dataset.to_table(columns=list(columns), filter=expression).to_pandas()
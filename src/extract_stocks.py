@@ -1,19 +1,28 @@
 import logging
 import random
 import time
-import yfinance as yf
+from collections.abc import Sequence
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
 import pandas as pd
 from opentelemetry import trace
-from threading import Lock
+
+from src.http_session import get_market_data_session, request_key
+from src.lazy import lazy_import
+from src.observability import record_wait, timed_stage
+from src.price_cache import PriceCache, covers_period, slice_period
+from src.rate_limit import RetryScheduler, TokenBucket, backoff_delay, get_limiter
+
+# Loaded on the first download, so runs served from the price cache never import yfinance.
+yf = lazy_import("yfinance")
 
 logger = logging.getLogger(__name__)
 tracer = trace.get_tracer(__name__)
 
 DEFAULT_TIMEOUT = 15
-_last_call_time = 0.0
-_rate_lock = Lock()
 
 
+@timed_stage("fetch")
 def fetch_stock_data_yf(
     symbol,
     period="6mo",
@@ -22,25 +31,29 @@ def fetch_stock_data_yf(
     backoff=3,
     timeout=DEFAULT_TIMEOUT,
     return_attempts: bool = False,
+    cache: PriceCache | None = None,
+    limiter: TokenBucket | None = None,
 ):
+    """
+    Fetch one symbol, retrying up to max_retries times. The backoff between attempts
+    sleeps in the calling thread; the pipeline engines call this with max_retries=1
+    and reschedule failed tickers on a RetryScheduler timer instead.
+    """
+    limiter = limiter or get_limiter("yfinance")
     with tracer.start_as_current_span(
         "fetch_stock_data",
         attributes={"symbol": symbol, "period": period, "interval": interval},
-    ):
+    ) as span:
+        cached = _load_cached(cache, symbol, period, interval)
+        window = _download_window(cached, period)
+        span.set_attribute("cache.hit", cached is not None)
+
         for attempt in range(1, max_retries + 1):
             try:
-                _respect_rate_limit()
-                df = yf.download(symbol, period=period, interval=interval, timeout=timeout)
+                df = _download(limiter, symbol, interval=interval, timeout=timeout, **window)
             except Exception as e:
-                logger.warning(
-                    "Attempt %s: error fetching %s (%s). Retrying in %s seconds...",
-                    attempt,
-                    symbol,
-                    e,
-                    backoff,
-                )
-                time.sleep(backoff + random.random())
-                backoff *= 2
+                logger.warning("Attempt %s: error fetching %s (%s)", attempt, symbol, e)
+                backoff = _backoff_before_retry(attempt, max_retries, backoff)
                 continue
 
             # Flatten MultiIndex columns if they exist
@@ -48,30 +61,321 @@ def fetch_stock_data_yf(
                 df.columns = [col[0] for col in df.columns]
 
             if not df.empty:
-                df.reset_index(inplace=True)
-                df.rename(columns={"Date": "date", "Adj Close": "adjusted_close"}, inplace=True)
-                df["Ticker"] = symbol
+                df = _normalize_frame(df, symbol)
                 logger.info("Fetched %s rows for %s using yfinance", len(df), symbol)
+                if cache is not None:
+                    df = slice_period(cache.merge(symbol, interval, df), period)
+                return (df, attempt) if return_attempts else df
+            elif cached is not None:
+                # Nothing newer than the cached bars (e.g. market closed); serve the cache.
+                logger.info("No new bars for %s; using %s cached rows", symbol, len(cached))
+                df = slice_period(cached, period)
                 return (df, attempt) if return_attempts else df
             else:
-                logger.warning(
-                    "Attempt %s: No data fetched for %s. Retrying in %s seconds...",
-                    attempt,
-                    symbol,
-                    backoff,
-                )
-                time.sleep(backoff + random.random())
-                backoff *= 2  # Exponential backoff
-
-    raise ValueError(f"Failed to fetch data for {symbol} after {max_retries} attempts.")
-
-
-def _respect_rate_limit(min_interval: float = 0.5):
-    """Ensure at least min_interval seconds between downloads across threads."""
-    global _last_call_time
-    with _rate_lock:
-        now = time.monotonic()
-        elapsed = now - _last_call_time
-        if elapsed < min_interval:
-            time.sleep(min_interval - elapsed)
-        _last_call_time = time.monotonic()
+                logger.warning("Attempt %s: No data fetched for %s", attempt, symbol)
+                backoff = _backoff_before_retry(attempt, max_retries, backoff)
+
+    raise FetchError(f"Failed to fetch data for {symbol} after {max_retries} attempts.")
+
+
+def refresh_cached_range(
+    symbol,
+    start,
+    end,
+    cache: PriceCache,
+    interval="1d",
+    timeout=DEFAULT_TIMEOUT,
+    limiter: TokenBucket | None = None,
+):
+    """Re-download bars between start and end (inclusive dates) and overwrite them in the cache."""
+    limiter = limiter or get_limiter("yfinance")
+    with tracer.start_as_current_span(
+        "refresh_cached_range",
+        attributes={"symbol": symbol, "start": str(start), "end": str(end), "interval": interval},
+    ):
+        cache.invalidate(symbol, interval, start=start, end=end)
+        exclusive_end = (pd.Timestamp(end) + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+        df = _download(limiter, symbol, reuse=False, start=start, end=exclusive_end, interval=interval, timeout=timeout)
+        if isinstance(df.columns, pd.MultiIndex):
+            df.columns = [col[0] for col in df.columns]
+        if df.empty:
+            logger.warning("No bars returned for %s between %s and %s", symbol, start, end)
+            return cache.load(symbol, interval)
+        return cache.merge(symbol, interval, _normalize_frame(df, symbol))
+
+
+@timed_stage("fetch")
+def fetch_stock_data_batch(
+    symbols: Sequence[str],
+    period="6mo",
+    interval="1d",
+    batch_size=50,
+    max_retries=5,
+    backoff=3,
+    timeout=DEFAULT_TIMEOUT,
+    return_attempts: bool = False,
+    cache: PriceCache | None = None,
+    limiter: TokenBucket | None = None,
+):
+    """
+    Fetch many symbols with one yf.download call per batch of batch_size symbols.
+    The multi-ticker frame is split back into per-ticker frames shaped like the
+    output of fetch_stock_data_yf. Only symbols that came back empty are retried.
+    With a cache, symbols are grouped by the date of their last cached bar so each
+    group only downloads the new bars; an empty incremental result serves the cache.
+    Returns a dict of symbol -> DataFrame; symbols with no data after max_retries
+    are omitted (callers diff against their input to find them). See
+    iter_stock_data_batches for a streaming form that holds one batch at a time.
+    """
+    frames: dict[str, pd.DataFrame] = {}
+    attempts: dict[str, int] = {}
+    with tracer.start_as_current_span(
+        "fetch_stock_data_batch",
+        attributes={"symbols.count": len(symbols), "batch_size": batch_size, "period": period, "interval": interval},
+    ):
+        for symbol, df, attempt in iter_stock_data_batches(
+            symbols, period, interval, batch_size, max_retries, backoff, timeout, cache, limiter
+        ):
+            attempts[symbol] = attempt
+            if df is not None:
+                frames[symbol] = df
+
+        failed = [symbol for symbol in attempts if symbol not in frames]
+        if failed:
+            logger.warning("Failed to fetch %s symbols after %s attempts: %s", len(failed), max_retries, failed)
+        logger.info("Fetched %s/%s symbols using batched yfinance download", len(frames), len(attempts))
+        return (frames, attempts) if return_attempts else frames
+
+
+def iter_stock_data_batches(
+    symbols: Sequence[str],
+    period="6mo",
+    interval="1d",
+    batch_size=50,
+    max_retries=5,
+    backoff=3,
+    timeout=DEFAULT_TIMEOUT,
+    cache: PriceCache | None = None,
+    limiter: TokenBucket | None = None,
+):
+    """
+    Yield (symbol, frame, attempts) per symbol as its batch finishes; frame is None
+    for a symbol with no data after max_retries. Batches download one at a time on a
+    worker thread. Symbols a batch missed are re-downloaded after their backoff by a
+    RetryScheduler timer while the next batch downloads, so a retry never stalls the
+    other batches. The next batch starts only once the caller has taken the previous
+    one's frames, so a slow consumer holds the downloads back.
+    """
+    limiter = limiter or get_limiter("yfinance")
+    batch_size = max(1, batch_size)
+    symbols = list(dict.fromkeys(symbols))
+    # Only the download window is kept per symbol, not its cached history.
+    windows = {symbol: _download_window(_load_cached(cache, symbol, period, interval), period) for symbol in symbols}
+    planned = _plan_batches(windows, batch_size)
+
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="batch-fetch")
+    scheduler = RetryScheduler(executor)
+    pending: dict[Future, tuple[list[str], dict, int]] = {}
+
+    def submit(batch, window, attempt, delay=0.0):
+        args = (limiter, batch, window, period, interval, timeout, cache, attempt)
+        if delay:
+            future = scheduler.schedule(delay, _fetch_batch, *args)
+        else:
+            future = executor.submit(_fetch_batch, *args)
+        pending[future] = (batch, window, attempt)
+
+    def submit_next():
+        batch = next(planned, None)
+        if batch is not None:
+            submit(*batch, 1)
+
+    try:
+        submit_next()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch, window, attempt = pending.pop(future)
+                frames, missing = future.result()
+                # Keep the worker busy while the caller handles this batch.
+                submit_next()
+                retrying = bool(missing) and attempt < max_retries
+                if retrying:
+                    delay = backoff_delay(backoff, attempt)
+                    logger.warning(
+                        "Attempt %s: no data for %s symbols (%s); retrying in %.1f seconds",
+                        attempt,
+                        len(missing),
+                        ", ".join(missing[:10]),
+                        delay,
+                    )
+                    # The wait happens on the scheduler's timer; record the planned delay.
+                    record_wait("retry", delay, "fetch")
+                    submit(missing, window, attempt + 1, delay)
+                for symbol in batch:
+                    if symbol in frames:
+                        yield symbol, frames[symbol], attempt
+                    elif not retrying:
+                        yield symbol, None, attempt
+    finally:
+        scheduler.shutdown()
+        executor.shutdown(cancel_futures=True)
+
+
+class FetchError(ValueError):
+    """Raised when a symbol returns no data after all retries."""
+
+
+def _download(limiter: TokenBucket, tickers, reuse: bool = True, **kwargs):
+    """
+    yf.download on the shared market-data session, under the rate limiter; throttles the
+    limiter when the provider rate-limits us. With HTTP_CACHE_TTL_SECONDS, an identical
+    request made earlier in the run is answered from memory (reuse=False always downloads).
+    """
+    market_data = get_market_data_session()
+    cache = market_data.cache if reuse else None
+    key = request_key(tickers, kwargs) if cache is not None else None
+    if cache is not None:
+        df = cache.get(key)
+        if df is not None:
+            return df
+
+    with limiter.limit():
+        try:
+            df = yf.download(tickers, **market_data.request_options(kwargs))
+        except _rate_limit_error():
+            limiter.throttle()
+            raise
+    limiter.success()
+    if cache is not None and not df.empty:
+        cache.put(key, df)
+    return df
+
+
+def _rate_limit_error():
+    try:
+        from yfinance.exceptions import YFRateLimitError
+    except ImportError:  # older yfinance releases
+        return ()
+    return YFRateLimitError
+
+
+def _backoff_before_retry(attempt: int, max_retries: int, backoff: float) -> float:
+    """Sleep with jitter unless this was the last attempt; returns the next backoff."""
+    if attempt >= max_retries:
+        return backoff
+    logger.info("Retrying in %s seconds...", backoff)
+    delay = backoff + random.random()
+    time.sleep(delay)
+    record_wait("retry", delay, "fetch")
+    return backoff * 2  # Exponential backoff
+
+
+def _plan_batches(windows: dict[str, dict[str, str]], batch_size: int):
+    """Yield (symbols, download window) pairs, grouping symbols that share the same window."""
+    groups: dict[tuple, list[str]] = {}
+    for symbol, window in windows.items():
+        groups.setdefault(tuple(sorted(window.items())), []).append(symbol)
+    for key, group in groups.items():
+        for start in range(0, len(group), batch_size):
+            yield group[start:start + batch_size], dict(key)
+
+
+def _fetch_batch(
+    limiter: TokenBucket,
+    batch: list[str],
+    window: dict[str, str],
+    period: str,
+    interval: str,
+    timeout: float,
+    cache: PriceCache | None,
+    attempt: int,
+) -> tuple[dict[str, pd.DataFrame], list[str]]:
+    """One download attempt for a batch; returns (frames, symbols that came back empty)."""
+    try:
+        df = _download(
+            limiter,
+            batch,
+            interval=interval,
+            timeout=timeout,
+            group_by="ticker",
+            threads=True,
+            progress=False,
+            **window,
+        )
+    except Exception as e:  # noqa: BLE001
+        logger.warning("Attempt %s: error fetching batch of %s symbols (%s)", attempt, len(batch), e)
+        return {}, list(batch)
+
+    frames: dict[str, pd.DataFrame] = {}
+    missing: list[str] = []
+    split = _split_batch_frame(df, batch)
+    for symbol in batch:
+        if symbol in split:
+            new_bars = split[symbol]
+            if cache is not None:
+                new_bars = slice_period(cache.merge(symbol, interval, new_bars), period)
+            frames[symbol] = new_bars
+            continue
+        # An incremental window means the symbol has cached history to serve instead.
+        history = cache.load(symbol, interval) if cache is not None and "start" in window else None
+        if history is not None:
+            frames[symbol] = slice_period(history, period)
+        else:
+            missing.append(symbol)
+    return frames, missing
+
+
+def _load_cached(cache: PriceCache | None, symbol: str, period: str, interval: str) -> pd.DataFrame | None:
+    """Cached history for symbol, or None if there is none or it does not reach back far enough."""
+    if cache is None:
+        return None
+    cached = cache.load(symbol, interval)
+    if cached is None:
+        return None
+    if not covers_period(cached, period):
+        logger.info("Price cache for %s does not cover %s; fetching full window", symbol, period)
+        return None
+    return cached
+
+
+def _download_window(cached: pd.DataFrame | None, period: str) -> dict[str, str]:
+    """yf.download kwargs: the full period, or bars from the last cached day onwards."""
+    if cached is None:
+        return {"period": period}
+    # Re-fetch the last cached day as well: its bar may have been captured mid-session.
+    return {"start": cached["date"].max().strftime("%Y-%m-%d")}
+
+
+def _split_batch_frame(df, symbols: Sequence[str]) -> dict[str, pd.DataFrame]:
+    """Split a group_by="ticker" download into per-symbol frames, dropping empty ones."""
+    frames: dict[str, pd.DataFrame] = {}
+    if df is None or df.empty:
+        return frames
+
+    if not isinstance(df.columns, pd.MultiIndex):
+        # Single-symbol downloads may come back flat.
+        if len(symbols) == 1:
+            sub = df.dropna(how="all")
+            if not sub.empty:
+                frames[symbols[0]] = _normalize_frame(sub, symbols[0])
+        return frames
+
+    available = set(df.columns.get_level_values(0))
+    for symbol in symbols:
+        if symbol not in available:
+            continue
+        sub = df[symbol].dropna(how="all")
+        if sub.empty:
+            continue
+        sub.columns.name = None
+        frames[symbol] = _normalize_frame(sub, symbol)
+    return frames
+
+
+def _normalize_frame(df: pd.DataFrame, symbol: str) -> pd.DataFrame:
+    # Chained without inplace: under copy-on-write none of these copy the bars, and the
+    # slice of a batch download no longer needs a defensive copy first.
+    df = df.reset_index().rename(columns={"Date": "date", "Adj Close": "adjusted_close"})
+    return df.assign(Ticker=symbol)
+
@@ -0,0 +1,90 @@
+import logging
+
+import numpy as np
+import pandas as pd
+from opentelemetry import trace
+
+from src.observability import timed_stage
+
+logger = logging.getLogger(__name__)
+tracer = trace.get_tracer(__name__)
+
+# Trading-day windows for trailing returns; windows longer than the history are reported as n/a.
+RETURN_WINDOWS = (1, 5, 21, 63)
+VOLUME_WINDOW = 20
+PATH_POINTS = 12
+TRADING_DAYS = 252
+
+
+@timed_stage("features")
+def extract_features(df: pd.DataFrame, symbol: str | None = None, path_points: int = PATH_POINTS) -> dict:
+    """
+    Reduce one ticker's cleaned bars (date, Close, Volume) to a fixed-size set of trend
+    features: trailing returns, annualized volatility, max drawdown, latest volume z-score
+    and a downsampled close path. The result does not grow with the history length.
+    """
+    with tracer.start_as_current_span("extract_features", attributes={"rows": len(df)}):
+        df = df[(df["Close"] > 0) & (df["Volume"] > 0)]
+        df = df.assign(date=pd.to_datetime(df["date"], errors="coerce")).dropna(subset=["date"]).sort_values("date")
+        if symbol is None and "Ticker" in df.columns and len(df):
+            symbol = str(df["Ticker"].iloc[-1])
+
+        close = df["Close"].to_numpy(dtype="float64")
+        volume = df["Volume"].to_numpy(dtype="float64")
+        features = {"ticker": symbol, "bars": len(close)}
+        if len(close) == 0:
+            return features
+
+        features["start"] = df["date"].iloc[0].date().isoformat()
+        features["end"] = df["date"].iloc[-1].date().isoformat()
+        features["last_close"] = float(close[-1])
+        features["returns"] = {
+            f"{w}d": (float(close[-1] / close[-1 - w] - 1) if len(close) > w else None) for w in RETURN_WINDOWS
+        }
+
+        daily = np.diff(np.log(close))
+        features["volatility"] = float(daily.std(ddof=1) * np.sqrt(TRADING_DAYS)) if len(daily) > 1 else None
+        features["max_drawdown"] = float((close / np.maximum.accumulate(close) - 1).min())
+
+        recent = volume[-VOLUME_WINDOW - 1:-1]
+        std = recent.std(ddof=1) if len(recent) > 1 else 0.0
+        features["volume_zscore"] = float((volume[-1] - recent.mean()) / std) if std > 0 else None
+
+        # Evenly spaced samples always include the first and last bar.
+        idx = np.unique(np.linspace(0, len(close) - 1, num=min(path_points, len(close))).round().astype(int))
+        features["price_path"] = [round(float(c), 2) for c in close[idx]]
+        return features
+
+
+PROMPT_INSTRUCTION = "Summarize the recent stock trend in 2-3 sentences from these precomputed features."
+
+
+def build_prompt(features: dict) -> str:
+    """Render features as a short, fixed-layout prompt."""
+    return f"{PROMPT_INSTRUCTION}\n{describe_features(features)}"
+
+
+def describe_features(features: dict) -> str:
+    """The feature block of a prompt, starting with a `Ticker:` line (also used for multi-ticker prompts)."""
+
+    def pct(value):
+        return "n/a" if value is None else f"{value * 100:+.2f}%"
+
+    ticker_line = f"Ticker: {features.get('ticker') or 'unknown'}"
+    if features.get("bars", 0) == 0:
+        return f"{ticker_line}\nNo recent price data is available; say so briefly."
+
+    returns = ", ".join(f"{window} {pct(value)}" for window, value in features["returns"].items())
+    zscore = features["volume_zscore"]
+    volatility = features["volatility"]
+    lines = [
+        ticker_line,
+        f"Period: {features['start']} to {features['end']} ({features['bars']} bars)",
+        f"Last close: {features['last_close']:.2f}",
+        f"Returns: {returns}",
+        f"Annualized volatility: {'n/a' if volatility is None else f'{volatility * 100:.1f}%'}",
+        f"Max drawdown: {pct(features['max_drawdown'])}",
+        f"Latest volume z-score ({VOLUME_WINDOW}-bar): {'n/a' if zscore is None else f'{zscore:+.2f}'}",
+        f"Close path (oldest to newest): {', '.join(f'{c:g}' for c in features['price_path'])}",
+    ]
+    return "\n".join(lines)
@@ -0,0 +1,178 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+
+import pandas as pd
+from opentelemetry import metrics
+
+logger = logging.getLogger(__name__)
+meter = metrics.get_meter(__name__)
+
+_hit_counter = meter.create_counter("trendnest.http_cache.hits", description="Market-data requests served from memory")
+_miss_counter = meter.create_counter("trendnest.http_cache.misses", description="Market-data requests sent to Yahoo")
+
+# Options that change how a download runs but not what it returns.
+_UNKEYED_OPTIONS = ("timeout", "threads", "progress", "session")
+
+
+class ResponseCache:
+    """
+    In-process cache of market-data responses (the parsed frames) for identical requests,
+    kept for `ttl_seconds` and at most `max_entries` (least recently used evicted first).
+    Frames are stored and returned as shallow copies, so a caller renaming columns in
+    place does not change the cached frame.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 256):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self._entries: OrderedDict[Hashable, tuple] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> pd.DataFrame | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None:
+            _miss_counter.add(1)
+            return None
+        _hit_counter.add(1)
+        return entry[1].copy(deep=False)
+
+    def put(self, key: Hashable, df: pd.DataFrame) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), df.copy(deep=False))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def request_key(tickers, options: dict) -> Hashable:
+    """Cache key of a yf.download call: the symbols and every option that shapes the result."""
+    symbols = tuple(tickers) if isinstance(tickers, (list, tuple)) else (tickers,)
+    return symbols, tuple(sorted((k, str(v)) for k, v in options.items() if k not in _UNKEYED_OPTIONS))
+
+
+class MarketDataSession:
+    """
+    One HTTP session shared by every yfinance request in the process. Without it, each
+    yf.download call opens a fresh session: new connections, a TLS handshake per request
+    and the Yahoo cookie/crumb negotiated again. The session is built on first use with
+    the same backend yfinance would pick (curl_cffi with browser impersonation, or
+    requests): curl_cffi keeps a keep-alive handle per calling thread; requests gets a
+    connection pool of `pool_size`. Requests carry a (connect, read) timeout.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 10,
+        connect_timeout: float = 5.0,
+        cache_ttl_seconds: float = 0,
+        cache_max_entries: int = 256,
+    ):
+        self.pool_size = max(1, pool_size)
+        self.connect_timeout = connect_timeout
+        self.cache = ResponseCache(cache_ttl_seconds, cache_max_entries) if cache_ttl_seconds > 0 else None
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        with self._lock:
+            if self._session is None:
+                self._session = build_session(self.pool_size)
+                backend = type(self._session).__module__.split(".")[0]
+                logger.info("Market-data HTTP session ready (%s, pool of %s)", backend, self.pool_size)
+            return self._session
+
+    def request_options(self, options: dict) -> dict:
+        """yf.download keyword arguments with the shared session and a (connect, read) timeout."""
+        options = dict(options)
+        read_timeout = options.get("timeout")
+        if read_timeout is not None and not isinstance(read_timeout, tuple):
+            options["timeout"] = (min(self.connect_timeout, read_timeout), read_timeout)
+        options["session"] = self.session
+        return options
+
+    def close(self) -> None:
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+def build_session(pool_size: int):
+    """A Session of the backend yfinance uses (YF_DISABLE_CURL_CFFI selects plain requests)."""
+    if os.getenv("YF_DISABLE_CURL_CFFI", "").lower() not in ("1", "true", "yes"):
+        try:
+            from curl_cffi import requests as curl_requests
+        except ImportError:
+            pass
+        else:
+            return curl_requests.Session(impersonate="chrome")
+
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    # Hosts are few (query1/query2/fc.yahoo.com); pool_maxsize is the keep-alive connections per host.
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    # Without curl_cffi's impersonation, Yahoo expects a browser User-Agent.
+    session.headers["User-Agent"] = (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/131.0.0.0 Safari/537.36"
+    )
+    return session
+
+
+def pool_size_for(settings) -> int:
+    """HTTP_POOL_SIZE, or as many connections as fetches can run at once."""
+    if settings.http_pool_size > 0:
+        return settings.http_pool_size
+    if settings.fetch_max_concurrency > 0:
+        return settings.fetch_max_concurrency
+    return max(settings.max_workers, settings.staged_extract_workers, settings.async_fetch_concurrency)
+
+
+_session: MarketDataSession | None = None
+_session_lock = threading.Lock()
+
+
+def get_market_data_session(settings=None) -> MarketDataSession:
+    """Shared session built from Settings on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = _build(settings)
+        return _session
+
+
+def configure_market_data_session(settings) -> MarketDataSession:
+    """(Re)create the shared session, e.g. after loading a YAML config."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = _build(settings)
+        return _session
+
+
+def _build(settings=None) -> MarketDataSession:
+    if settings is None:
+        from src.config import get_settings
+
+        settings = get_settings()
+    return MarketDataSession(
+        pool_size=pool_size_for(settings),
+        connect_timeout=settings.fetch_connect_timeout_seconds,
+        cache_ttl_seconds=settings.http_cache_ttl_seconds,
+    )
@@ -0,0 +1,153 @@
+import logging
+import os
+import sqlite3
+import threading
+from collections.abc import Sequence
+from pathlib import Path
+
+import pandas as pd
+from opentelemetry import trace
+
+from src.observability import record_output, timed_stage
+
+logger = logging.getLogger(__name__)
+tracer = trace.get_tracer(__name__)
+
+# Typed columns of the prices table; other frame columns (e.g. summary) are not stored.
+# The primary key serves per-ticker lookups and date ranges, the Volume index the spike report.
+KEY_COLUMNS = ("Ticker", "interval", "date")
+VALUE_COLUMNS = ("Open", "High", "Low", "Close", "adjusted_close", "Volume")
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_SCHEMA = (
+    (
+        "CREATE TABLE IF NOT EXISTS prices ("
+        " Ticker TEXT NOT NULL, interval TEXT NOT NULL, date TEXT NOT NULL,"
+        " Open REAL, High REAL, Low REAL, Close REAL, adjusted_close REAL, Volume INTEGER,"
+        " PRIMARY KEY (Ticker, interval, date)) WITHOUT ROWID"
+    ),
+    "CREATE INDEX IF NOT EXISTS prices_volume ON prices (Volume)",
+)
+
+
+def format_date(value) -> str | None:
+    """A date/timestamp as stored: exchange-local wall time, sortable as text."""
+    if value is None:
+        return None
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is not None:
+        ts = ts.tz_localize(None)
+    return ts.strftime(DATE_FORMAT)
+
+
+def format_end_date(value) -> str | None:
+    """Upper bound of a date range; a bare date covers the whole day (intraday bars included)."""
+    if value is None:
+        return None
+    ts = pd.Timestamp(value)
+    if ts == ts.normalize() and not isinstance(value, pd.Timestamp):
+        return ts.strftime("%Y-%m-%d 23:59:59")
+    return format_date(ts)
+
+
+class LocalStore:
+    """
+    Embedded analytical copy of the cleaned bars in a single SQLite file, so reports
+    (see src/queries.py) run locally instead of against BigQuery. Rows are upserted on
+    (Ticker, interval, date), which is also the clustered primary key, so re-writing a
+    frame is idempotent and per-ticker date ranges are index range scans.
+    Dates are stored as ISO-8601 text in exchange-local time.
+    With read_only=True an existing file is opened without creating or migrating anything;
+    a missing file raises sqlite3.OperationalError.
+    """
+
+    def __init__(self, path: str, read_only: bool = False):
+        self.path = path
+        self._lock = threading.Lock()
+        if read_only:
+            uri = f"{Path(path).resolve().as_uri()}?mode=ro"
+            self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            return
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            if path != ":memory:":
+                # Readers (e.g. the dashboard) don't block the pipeline's writes.
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            # 64 MB page cache: upserts touch the primary key and the Volume index at random.
+            self._conn.execute("PRAGMA cache_size=-65536")
+            for statement in _SCHEMA:
+                self._conn.execute(statement)
+
+    @timed_stage("store")
+    def write(self, df: pd.DataFrame, interval: str | None = None) -> int:
+        """Upsert a frame of cleaned bars; frames without an interval column use `interval` (default 1d)."""
+        rows = _to_rows(df, interval or "1d")
+        columns = KEY_COLUMNS + VALUE_COLUMNS
+        sql = (
+            f"INSERT INTO prices ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+            "ON CONFLICT (Ticker, interval, date) DO UPDATE SET "
+            + ", ".join(f"{c} = excluded.{c}" for c in VALUE_COLUMNS)
+        )
+        with (
+            tracer.start_as_current_span("local_store_write", attributes={"path": self.path, "rows": len(rows)}),
+            self._lock,
+            self._conn,
+        ):
+            self._conn.executemany(sql, rows)
+        record_output("store", len(rows))
+        logger.info("Wrote %s rows to local store %s", len(rows), self.path)
+        return len(rows)
+
+    def query(self, sql: str, params: Sequence = ()) -> pd.DataFrame:
+        """Run a read query; a `date` column in the result is parsed to datetime64."""
+        with tracer.start_as_current_span("local_store_query", attributes={"path": self.path}), self._lock:
+            cursor = self._conn.execute(sql, tuple(params))
+            columns = [d[0] for d in cursor.description]
+            data = cursor.fetchall()
+        df = pd.DataFrame.from_records(data, columns=columns)
+        if "date" in df.columns:
+            df["date"] = pd.to_datetime(df["date"], format=DATE_FORMAT)
+        return df
+
+    def tickers(self, interval: str | None = None) -> list[str]:
+        sql = "SELECT DISTINCT Ticker FROM prices"
+        params: tuple = ()
+        if interval is not None:
+            sql += " WHERE interval = ?"
+            params = (interval,)
+        with self._lock:
+            return sorted(row[0] for row in self._conn.execute(sql, params))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM prices").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def _to_rows(df: pd.DataFrame, interval: str) -> list:
+    n = len(df)
+    dates = pd.to_datetime(df["date"])
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_localize(None)
+    columns = [
+        df["Ticker"].astype(str).tolist(),
+        df["interval"].astype(str).tolist() if "interval" in df.columns else [interval] * n,
+        dates.dt.strftime(DATE_FORMAT).tolist(),
+    ]
+    for name in VALUE_COLUMNS:
+        if name not in df.columns:
+            columns.append([None] * n)
+            continue
+        values = pd.to_numeric(df[name], errors="coerce")
+        if name == "Volume" and not values.isna().any():
+            columns.append(values.astype("int64").tolist())
+        else:
+            # SQLite stores a bound NaN as NULL.
+            columns.append(values.astype("float64").tolist())
+    return list(zip(*columns))
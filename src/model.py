@@ -1,13 +1,367 @@
+import json
 import logging
+import os
+import warnings
+from dataclasses import asdict, dataclass
+
+import numpy as np
+import pandas as pd
 from opentelemetry import trace
 
+from src.atomic import atomic_write
+from src.observability import timed_stage
+
 logger = logging.getLogger(__name__)
 tracer = trace.get_tracer(__name__)
 
+RETURN_WINDOWS = (5, 21)
+SHORT_WINDOW = 20
+LONG_WINDOW = 50
+RSI_WINDOW = 14
+VOLATILITY_WINDOW = 21
+TRADING_DAYS = 252
+# Columns analyze_trends needs from the combined frame (lets callers prune reads).
+INPUT_COLUMNS = ("date", "Ticker", "Close")
+
+
+def to_wide(df: pd.DataFrame, column: str = "Close") -> pd.DataFrame:
+    """Pivot the long multi-ticker frame into a date x ticker matrix (last bar wins on duplicates)."""
+    df = df.drop_duplicates(subset=["date", "Ticker"], keep="last")
+    date_codes, dates = pd.factorize(df["date"], sort=True)
+    ticker_codes, tickers = pd.factorize(df["Ticker"], sort=True)
+    # Scatter straight into the matrix: cheaper than pivot's MultiIndex unstack.
+    values = np.full((len(dates), len(tickers)), np.nan)
+    values[date_codes, ticker_codes] = df[column].to_numpy(dtype="float64")
+    return pd.DataFrame(values, index=pd.Index(dates, name="date"), columns=pd.Index(tickers, name="Ticker"))
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Trailing mean over `window` rows for every column at once, from cumulative sums.
+    Like rolling(window, min_periods=window): NaN unless the whole window is present.
+    """
+    valid = np.isfinite(values)
+    sums = np.cumsum(np.where(valid, values, 0.0), axis=0)
+    counts = np.cumsum(valid, axis=0)
+    sums[window:] = sums[window:] - sums[:-window].copy()
+    counts[window:] = counts[window:] - counts[:-window].copy()
+    out = sums / window
+    out[counts < window] = np.nan
+    return out
+
+
+def rolling_std(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing sample standard deviation (ddof=1) over `window` rows, vectorized like rolling_mean."""
+    mean = rolling_mean(values, window)
+    mean_sq = rolling_mean(values**2, window)
+    variance = np.maximum(mean_sq - mean**2, 0.0) * window / (window - 1)
+    return np.sqrt(variance)
+
+
+def compute_indicators(close: pd.DataFrame) -> dict[str, pd.DataFrame]:
+    """
+    Per-bar indicators for every ticker of a date x ticker close matrix. Each one is a
+    whole-matrix NumPy/pandas operation with no per-ticker or per-row Python loop.
+    """
+    values = close.to_numpy(dtype="float64")
+
+    def frame(data):
+        return pd.DataFrame(data, index=close.index, columns=close.columns)
+
+    indicators = {f"return_{w}d": close / close.shift(w) - 1 for w in RETURN_WINDOWS}
+    indicators[f"sma_{SHORT_WINDOW}"] = frame(rolling_mean(values, SHORT_WINDOW))
+    indicators[f"sma_{LONG_WINDOW}"] = frame(rolling_mean(values, LONG_WINDOW))
+    indicators[f"rsi_{RSI_WINDOW}"] = rsi(close, RSI_WINDOW)
+    log_returns = np.full_like(values, np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        log_returns[1:] = np.log(values[1:] / values[:-1])
+    indicators[f"volatility_{VOLATILITY_WINDOW}d"] = frame(
+        rolling_std(log_returns, VOLATILITY_WINDOW) * np.sqrt(TRADING_DAYS)
+    )
+    indicators["drawdown"] = close / close.cummax() - 1
+    return indicators
+
+
+def rsi(close: pd.DataFrame, window: int = RSI_WINDOW) -> pd.DataFrame:
+    """Wilder's RSI (exponential smoothing with alpha = 1/window)."""
+    delta = close.diff()
+    avg_gain = delta.clip(lower=0).ewm(alpha=1 / window, adjust=False, min_periods=window).mean()
+    avg_loss = (-delta.clip(upper=0)).ewm(alpha=1 / window, adjust=False, min_periods=window).mean()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = 100 - 100 / (1 + avg_gain / avg_loss)
+    # No losses in the window: RSI is 100 by definition (gain/0 -> inf already gives that; 0/0 does not).
+    return values.mask((avg_loss == 0) & avg_gain.notna(), 100.0)
+
+
+def correlation_matrix(close: pd.DataFrame) -> pd.DataFrame:
+    """
+    Correlation of daily returns between all tickers via one matrix product. Each pair
+    uses the bars both tickers have; means and scales come from each ticker's full history,
+    which avoids the O(tickers^2) pairwise loop of DataFrame.corr.
+    """
+    returns = close.pct_change(fill_method=None).to_numpy(dtype="float64")
+    mask = np.isfinite(returns)
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        centered = np.where(mask, returns - np.nanmean(np.where(mask, returns, np.nan), axis=0), 0.0)
+        scale = np.sqrt((centered**2).sum(axis=0) / np.maximum(mask.sum(axis=0) - 1, 1))
+        counts = mask.T.astype("float64") @ mask.astype("float64")
+        corr = (centered.T @ centered) / np.maximum(counts - 1, 1) / np.outer(scale, scale)
+    corr[counts < 3] = np.nan
+    np.fill_diagonal(corr, 1.0)
+    return pd.DataFrame(np.clip(corr, -1.0, 1.0), index=close.columns, columns=close.columns)
+
+
+def trend_labels(last_close, sma_short, sma_long, momentum) -> np.ndarray:
+    """uptrend when price > short MA > long MA with positive momentum, downtrend for the mirror case."""
+    up = (last_close > sma_short) & (sma_short > sma_long) & (momentum > 0)
+    down = (last_close < sma_short) & (sma_short < sma_long) & (momentum < 0)
+    return np.select([up, down], ["uptrend", "downtrend"], default="sideways")
+
+
+@timed_stage("analyze")
+def analyze_trends(
+    df: pd.DataFrame,
+    store: "IndicatorStore | None" = None,
+    interval: str = "1d",
+    full_recompute: bool = False,
+) -> pd.DataFrame:
+    """
+    Trend analytics for every ticker in the combined long frame (date, Ticker, Close).
+    Returns one row per ticker with the latest indicator values, max drawdown, average
+    correlation with the rest of the universe and a trend label. With a store, the
+    indicator values come from persisted per-ticker state (see incremental_indicators).
+    """
+    with tracer.start_as_current_span("analyze_trends", attributes={"rows": len(df)}) as span:
+        close = to_wide(df[list(INPUT_COLUMNS)])
+        span.set_attribute("tickers.count", close.shape[1])
+
+        if store is not None:
+            result = incremental_indicators(df[list(INPUT_COLUMNS)], store, interval, full_recompute)
+            result = result.reindex(close.columns)
+        else:
+            result = latest_indicators(close)
+
+        corr = correlation_matrix(close).to_numpy(copy=True)
+        np.fill_diagonal(corr, np.nan)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN rows for tickers without overlap
+            result["avg_correlation"] = np.nanmean(corr, axis=1) if len(corr) > 1 else np.nan
+
+        result["trend"] = trend_labels(
+            result["last_close"].to_numpy(),
+            result[f"sma_{SHORT_WINDOW}"].to_numpy(),
+            result[f"sma_{LONG_WINDOW}"].to_numpy(),
+            result[f"return_{RETURN_WINDOWS[-1]}d"].to_numpy(),
+        )
+        result.index.name = "Ticker"
+        logger.info("Trend analysis complete for %s tickers", len(result))
+        return result
+
+
+def latest_indicators(close: pd.DataFrame) -> pd.DataFrame:
+    """Indicator values at each ticker's last bar, recomputed over the whole matrix."""
+    indicators = compute_indicators(close)
+    present = close.notna().to_numpy()
+    last_row = len(close) - 1 - present[::-1].argmax(axis=0)
+    result = pd.DataFrame({"last_date": close.index[last_row], "last_close": close.ffill().iloc[-1]}, index=close.columns)
+    # Forward-fill so a ticker missing the final session keeps its last reading.
+    for name, frame in indicators.items():
+        result[name] = frame.ffill().iloc[-1]
+    result["max_drawdown"] = indicators["drawdown"].min()
+    return result
+
+
+# --- Incremental indicators -------------------------------------------------------------------
+
+# Closes kept per ticker: enough for the longest moving average and return window.
+_STATE_CLOSES = max(LONG_WINDOW, max(RETURN_WINDOWS) + 1)
+_RSI_ALPHA = 1 / RSI_WINDOW
+
+
+@dataclass
+class IndicatorState:
+    """
+    Everything needed to extend one ticker's indicators by new bars in O(new bars):
+    the trailing closes and their window sums, the trailing log returns and their sums,
+    Wilder's smoothed gain/loss, and the running max / worst drawdown so far.
+    """
+
+    last_date: str
+    bars: int
+    closes: list[float]
+    sum_short: float
+    sum_long: float
+    log_returns: list[float]
+    sum_lr: float
+    sum_lr_sq: float
+    avg_gain: float | None
+    avg_loss: float | None
+    running_max: float
+    max_drawdown: float
+
+    def values(self) -> dict[str, float]:
+        """Indicator values at the last bar, named like compute_indicators' output."""
+        closes = self.closes
+        last = closes[-1]
+        values = {"last_date": pd.Timestamp(self.last_date), "last_close": last}
+        for w in RETURN_WINDOWS:
+            values[f"return_{w}d"] = last / closes[-1 - w] - 1 if self.bars > w else np.nan
+        values[f"sma_{SHORT_WINDOW}"] = self.sum_short / SHORT_WINDOW if self.bars >= SHORT_WINDOW else np.nan
+        values[f"sma_{LONG_WINDOW}"] = self.sum_long / LONG_WINDOW if self.bars >= LONG_WINDOW else np.nan
+        values[f"rsi_{RSI_WINDOW}"] = _rsi_value(self.avg_gain, self.avg_loss) if self.bars > RSI_WINDOW else np.nan
+        n = VOLATILITY_WINDOW
+        if len(self.log_returns) >= n:
+            mean = self.sum_lr / n
+            variance = max(self.sum_lr_sq / n - mean**2, 0.0) * n / (n - 1)
+            values[f"volatility_{n}d"] = np.sqrt(variance) * np.sqrt(TRADING_DAYS)
+        else:
+            values[f"volatility_{n}d"] = np.nan
+        values["drawdown"] = last / self.running_max - 1
+        values["max_drawdown"] = self.max_drawdown
+        return values
+
+
+def _rsi_value(avg_gain: float | None, avg_loss: float | None) -> float:
+    if avg_gain is None or avg_loss is None:
+        return np.nan
+    if avg_loss == 0:
+        return 100.0
+    return 100 - 100 / (1 + avg_gain / avg_loss)
+
+
+def build_state(series: pd.Series) -> IndicatorState:
+    """State at the last bar of a date-indexed close series, computed with whole-array operations."""
+    series = series.dropna().sort_index()
+    closes = series.to_numpy(dtype="float64")
+    log_returns = np.log(closes[1:] / closes[:-1])
+    delta = series.diff()
+    avg_gain = avg_loss = None
+    if len(closes) > 1:
+        avg_gain = float(delta.clip(lower=0).ewm(alpha=_RSI_ALPHA, adjust=False).mean().iloc[-1])
+        avg_loss = float((-delta.clip(upper=0)).ewm(alpha=_RSI_ALPHA, adjust=False).mean().iloc[-1])
+    recent_lr = log_returns[-VOLATILITY_WINDOW:]
+    return IndicatorState(
+        last_date=series.index[-1].isoformat(),
+        bars=len(closes),
+        closes=closes[-_STATE_CLOSES:].tolist(),
+        sum_short=float(closes[-SHORT_WINDOW:].sum()),
+        sum_long=float(closes[-LONG_WINDOW:].sum()),
+        log_returns=recent_lr.tolist(),
+        sum_lr=float(recent_lr.sum()),
+        sum_lr_sq=float((recent_lr**2).sum()),
+        avg_gain=avg_gain,
+        avg_loss=avg_loss,
+        running_max=float(closes.max()),
+        max_drawdown=float((closes / np.maximum.accumulate(closes) - 1).min()),
+    )
+
+
+def advance_state(state: IndicatorState, new_bars: pd.Series) -> IndicatorState:
+    """Extend state by bars newer than state.last_date; each bar is an O(1) update of the sums and EMAs."""
+    state = IndicatorState(**{**asdict(state), "closes": list(state.closes), "log_returns": list(state.log_returns)})
+    for date, close in new_bars.dropna().sort_index().items():
+        close = float(close)
+        previous = state.closes[-1]
+        closes = state.closes
+        closes.append(close)
+        state.bars += 1
+        state.sum_short += close - (closes[-1 - SHORT_WINDOW] if state.bars > SHORT_WINDOW else 0.0)
+        state.sum_long += close - (closes[-1 - LONG_WINDOW] if state.bars > LONG_WINDOW else 0.0)
+        del closes[:-_STATE_CLOSES]
+
+        log_return = float(np.log(close / previous))
+        state.log_returns.append(log_return)
+        state.sum_lr += log_return
+        state.sum_lr_sq += log_return**2
+        if len(state.log_returns) > VOLATILITY_WINDOW:
+            dropped = state.log_returns.pop(0)
+            state.sum_lr -= dropped
+            state.sum_lr_sq -= dropped**2
+
+        gain, loss = max(close - previous, 0.0), max(previous - close, 0.0)
+        if state.avg_gain is None:
+            state.avg_gain, state.avg_loss = gain, loss
+        else:
+            state.avg_gain = (1 - _RSI_ALPHA) * state.avg_gain + _RSI_ALPHA * gain
+            state.avg_loss = (1 - _RSI_ALPHA) * state.avg_loss + _RSI_ALPHA * loss
+
+        state.running_max = max(state.running_max, close)
+        state.max_drawdown = min(state.max_drawdown, close / state.running_max - 1)
+        state.last_date = pd.Timestamp(date).isoformat()
+    return state
+
+
+class IndicatorStore:
+    """
+    Per-ticker IndicatorState on disk, laid out like the price cache:
+    <root>/interval=<interval>/ticker=<symbol>.json
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path_for(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.root, f"interval={interval}", f"ticker={symbol}.json")
+
+    def load(self, symbol: str, interval: str) -> IndicatorState | None:
+        path = self.path_for(symbol, interval)
+        if not os.path.isfile(path):
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                return IndicatorState(**json.load(f))
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning("Ignoring unreadable indicator state %s: %s", path, e)
+            return None
+
+    def save(self, symbol: str, interval: str, state: IndicatorState) -> None:
+        def write(tmp_path):
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(asdict(state), f)
+
+        atomic_write(self.path_for(symbol, interval), write)
+
+
+def update_state(state: IndicatorState | None, series: pd.Series) -> tuple[IndicatorState, bool]:
+    """
+    Bring state up to date with a ticker's close series. Only bars after state.last_date
+    are applied, provided the series still agrees with the state at last_date; otherwise
+    (no state, a gap, or revised history) the state is rebuilt from the series.
+    Returns (state, reused).
+    """
+    series = series.dropna().sort_index()
+    if state is not None:
+        anchor = pd.Timestamp(state.last_date)
+        if anchor in series.index and np.isclose(series.loc[anchor], state.closes[-1], rtol=1e-9, atol=0.0):
+            return advance_state(state, series[series.index > anchor]), True
+    return build_state(series), False
+
 
-def analyze_trends(df):
-    with tracer.start_as_current_span("analyze_trends"):
-        # Placeholder trend analysis logic
-        trend_summary = df.describe()  # Example: summary statistics
-        logger.info("Trend analysis complete")
-        return trend_summary
+def incremental_indicators(
+    df: pd.DataFrame,
+    store: IndicatorStore,
+    interval: str = "1d",
+    full_recompute: bool = False,
+) -> pd.DataFrame:
+    """
+    Latest indicator values per ticker, reusing the persisted state so each run only pays
+    for the bars added since the previous one. full_recompute rebuilds every state from
+    the frame (the verification path) and overwrites what is stored.
+    """
+    with tracer.start_as_current_span(
+        "incremental_indicators", attributes={"rows": len(df), "full_recompute": full_recompute}
+    ) as span:
+        rows, reused = {}, 0
+        for symbol, group in df.groupby("Ticker", sort=True):
+            series = group.drop_duplicates(subset="date", keep="last").set_index("date")["Close"].astype("float64")
+            previous = None if full_recompute else store.load(symbol, interval)
+            state, was_reused = update_state(previous, series)
+            reused += was_reused
+            store.save(symbol, interval, state)
+            rows[symbol] = state.values()
+        span.set_attribute("states.reused", reused)
+        logger.info("Indicator state reused for %s/%s tickers", reused, len(rows))
+        result = pd.DataFrame.from_dict(rows, orient="index")
+        result.index.name = "Ticker"
+        return result
@@ -1,16 +1,71 @@
 import logging
 import os
-from typing import Dict, Optional
+import re
+import resource
+import sys
+import threading
+import time
+from contextlib import ContextDecorator
 
 from opentelemetry import metrics, trace
-from opentelemetry.exporter.otlp.proto.http.metric_exporter import OTLPMetricExporter
-from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
-from opentelemetry.instrumentation.requests import RequestsInstrumentor
+from opentelemetry.metrics import CallbackOptions, Observation
 from opentelemetry.sdk.metrics import MeterProvider
-from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
-from opentelemetry.sdk.resources import Resource, SERVICE_NAME
+from opentelemetry.sdk.metrics.export import (
+    Histogram,
+    InMemoryMetricReader,
+    PeriodicExportingMetricReader,
+    Sum,
+)
+from opentelemetry.sdk.resources import SERVICE_NAME, Resource
 from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SimpleSpanProcessor
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    ConsoleSpanExporter,
+    SpanExporter,
+    SpanExportResult,
+)
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+from src.atomic import atomic_write
+
+logger = logging.getLogger(__name__)
+meter = metrics.get_meter("trendnest")
+
+# Every stage and wait kind the pipeline reports. Metric attributes only ever take values
+# from these sets (never tickers, paths or run ids), so the series count stays fixed.
+STAGES = ("fetch", "clean", "validate", "features", "analyze", "summarize", "export", "store", "upload")
+WAIT_KINDS = ("queue_get", "queue_put", "retry")
+SINKS = ("export", "store", "upload")
+# Where spans go when there is no OTLP endpoint.
+TRACE_EXPORTERS = ("console", "file", "none")
+# Value reported for attribute values past an AttributeGuard's limit.
+OVERFLOW_VALUE = "other"
+# Seconds, from sub-millisecond cleaning of one ticker to multi-minute uploads.
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_stage_duration = meter.create_histogram(
+    "trendnest.stage.duration_seconds",
+    unit="s",
+    description="Duration of a pipeline stage call, by stage and status (ok or error)",
+    explicit_bucket_boundaries_advisory=SECONDS_BUCKETS,
+)
+_wait_duration = meter.create_histogram(
+    "trendnest.wait.duration_seconds",
+    unit="s",
+    description="Time spent waiting on a stage queue or a retry backoff",
+    explicit_bucket_boundaries_advisory=SECONDS_BUCKETS,
+)
+_limiter_wait = meter.create_histogram(
+    "trendnest.rate_limiter.wait_seconds",
+    unit="s",
+    description="Time spent waiting for a rate limiter token or concurrency slot",
+    explicit_bucket_boundaries_advisory=SECONDS_BUCKETS,
+)
+_output_rows = meter.create_counter("trendnest.output.rows", description="Rows written, by sink")
+_output_bytes = meter.create_counter("trendnest.output.bytes", unit="By", description="Bytes written, by sink")
+
+# Filled in by setup_metrics when there is no OTLP endpoint; read by metrics_text().
+_local_reader: InMemoryMetricReader | None = None
 
 
 def setup_logging(log_level: str | None = None) -> None:
@@ -25,10 +80,10 @@ def setup_logging(log_level: str | None = None) -> None:
     )
 
 
-def _parse_headers(raw_headers: Optional[str]) -> Optional[Dict[str, str]]:
+def _parse_headers(raw_headers: str | None) -> dict[str, str] | None:
     if not raw_headers:
         return None
-    headers: Dict[str, str] = {}
+    headers: dict[str, str] = {}
     for item in raw_headers.split(","):
         if "=" in item:
             key, value = item.split("=", 1)
@@ -36,13 +91,35 @@ def _parse_headers(raw_headers: Optional[str]) -> Optional[Dict[str, str]]:
     return headers or None
 
 
-def setup_tracing(service_name: str = "trendnest") -> trace.Tracer:
+def setup_tracing(
+    service_name: str = "trendnest",
+    sample_ratio: float = 1.0,
+    exporter: str = "console",
+    file_path: str = "data/traces.jsonl",
+    instrument_requests: bool = True,
+    queue_size: int = 8192,
+) -> trace.Tracer:
     """
     Initialize OpenTelemetry tracing.
     - If OTEL_EXPORTER_OTLP_ENDPOINT is set, spans are sent to that collector.
-    - Otherwise, spans are logged to stdout via ConsoleSpanExporter.
+    - Otherwise `exporter` picks the local sink: "console" (stdout), "file" (one JSON span
+      per line appended to file_path) or "none" (tracing stays a no-op).
+    Spans are exported in batches from a background thread, so worker threads never wait
+    on serialization or I/O; when more than `queue_size` spans are waiting, new ones are
+    dropped rather than waited for.
+    `sample_ratio` of trace roots are sampled; child spans follow their parent's decision.
+    `instrument_requests` adds a span per outbound HTTP request (yfinance).
     """
+    if exporter not in TRACE_EXPORTERS:
+        raise ValueError(f"Unknown trace exporter {exporter!r}; expected one of {', '.join(TRACE_EXPORTERS)}")
+    endpoint = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+    headers = _parse_headers(os.getenv("OTEL_EXPORTER_OTLP_HEADERS"))
+    if not endpoint and exporter == "none":
+        # Nothing would read the spans, so don't record them: keep the API's no-op tracer.
+        return trace.get_tracer(service_name)
+
     provider = TracerProvider(
+        sampler=ParentBased(TraceIdRatioBased(sample_ratio)),
         resource=Resource.create(
             {
                 SERVICE_NAME: service_name,
@@ -54,29 +131,54 @@ def setup_tracing(service_name: str = "trendnest") -> trace.Tracer:
     )
     trace.set_tracer_provider(provider)
 
-    endpoint = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
-    headers = _parse_headers(os.getenv("OTEL_EXPORTER_OTLP_HEADERS"))
-
     if endpoint:
-        exporter = OTLPSpanExporter(endpoint=endpoint, headers=headers)
-        processor = BatchSpanProcessor(exporter)
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+            OTLPSpanExporter,
+        )
+
+        span_exporter = OTLPSpanExporter(endpoint=endpoint, headers=headers)
+    elif exporter == "console":
+        span_exporter = ConsoleSpanExporter()
     else:
-        exporter = ConsoleSpanExporter()
-        processor = SimpleSpanProcessor(exporter)
+        span_exporter = JsonLinesSpanExporter(file_path)
+    queue_size = max(1, queue_size)
+    provider.add_span_processor(
+        BatchSpanProcessor(span_exporter, max_queue_size=queue_size, max_export_batch_size=min(512, queue_size))
+    )
 
-    provider.add_span_processor(processor)
+    if instrument_requests:
+        # Instrument outbound HTTP requests (used by yfinance/requests).
+        from opentelemetry.instrumentation.requests import RequestsInstrumentor
 
-    # Instrument outbound HTTP requests (used by yfinance/requests).
-    RequestsInstrumentor().instrument()
+        RequestsInstrumentor().instrument()
 
     return trace.get_tracer(service_name)
 
 
+class JsonLinesSpanExporter(SpanExporter):
+    """
+    Appends finished spans to a file, one compact JSON object per line. The file is
+    opened for each exported batch, so nothing is left open between batches.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def export(self, spans) -> SpanExportResult:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(span.to_json(indent=None) + "\n" for span in spans)
+        return SpanExportResult.SUCCESS
+
+
 def setup_metrics(service_name: str = "trendnest"):
     """
-    Initialize OpenTelemetry metrics.
-    If no OTLP endpoint is configured, metrics will not be exported (but meter is still usable).
+    Initialize OpenTelemetry metrics and the process CPU/RSS gauges.
+    - If OTEL_EXPORTER_OTLP_ENDPOINT is set, metrics are pushed to that collector.
+    - Otherwise they are kept in memory for the Prometheus text output (metrics_text,
+      write_metrics_text, serve_metrics).
     """
+    global _local_reader
     endpoint = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
     headers = _parse_headers(os.getenv("OTEL_EXPORTER_OTLP_HEADERS"))
 
@@ -90,9 +192,278 @@ def setup_metrics(service_name: str = "trendnest"):
 
     metric_readers = []
     if endpoint:
+        from opentelemetry.exporter.otlp.proto.http.metric_exporter import (
+            OTLPMetricExporter,
+        )
+
         exporter = OTLPMetricExporter(endpoint=endpoint, headers=headers)
         metric_readers.append(PeriodicExportingMetricReader(exporter))
+    else:
+        metric_readers.append(InMemoryMetricReader())
 
-    provider = MeterProvider(resource=resource, metric_readers=metric_readers or None)
+    provider = MeterProvider(resource=resource, metric_readers=metric_readers)
     metrics.set_meter_provider(provider)
+    # The global provider can only be set once per process; a second call keeps the first.
+    if metrics.get_meter_provider() is provider:
+        _local_reader = None if endpoint else metric_readers[0]
+        _register_process_metrics(metrics.get_meter(service_name))
     return metrics.get_meter(service_name)
+
+
+class timed_stage(ContextDecorator):
+    """
+    Record the duration of a pipeline stage in trendnest.stage.duration_seconds, as a
+    context manager or a decorator:
+
+        @timed_stage("clean")
+        def clean_data(df): ...
+
+        with timed_stage("summarize"):
+            ...
+
+    Attributes are the stage name and status (ok, or error when the block raises).
+    """
+
+    def __init__(self, stage: str):
+        if stage not in STAGES:
+            raise ValueError(f"Unknown stage {stage!r}; expected one of {', '.join(STAGES)}")
+        self.stage = stage
+        self._started = threading.local()
+
+    def __enter__(self):
+        # Thread-local, since a decorated function can run on many threads at once.
+        starts = getattr(self._started, "stack", None)
+        if starts is None:
+            starts = self._started.stack = []
+        starts.append(time.perf_counter())
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self._started.stack.pop()
+        _stage_duration.record(seconds, attributes={"stage": self.stage, "status": "error" if exc_type else "ok"})
+        return False
+
+
+class AttributeGuard:
+    """
+    Bounds the cardinality of an instrument's attributes: each key keeps the first
+    `max_values` distinct values it sees, and any later value is reported as "other".
+    Keeps per-ticker attributes from growing one series per ticker with the universe size;
+    max_values=0 disables the cap.
+    """
+
+    def __init__(self, max_values: int):
+        self.max_values = max_values
+        self._seen: dict[str, set] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, attributes: dict | None) -> dict | None:
+        if not attributes or not self.max_values:
+            return attributes
+        bounded = None
+        for key, value in attributes.items():
+            if not self._admit(key, value):
+                bounded = bounded if bounded is not None else dict(attributes)
+                bounded[key] = OVERFLOW_VALUE
+        return attributes if bounded is None else bounded
+
+    def _admit(self, key: str, value) -> bool:
+        seen = self._seen.get(key)
+        if seen is not None and value in seen:
+            return True
+        with self._lock:
+            seen = self._seen.setdefault(key, set())
+            if value in seen:
+                return True
+            if len(seen) < self.max_values:
+                seen.add(value)
+                return True
+        return False
+
+
+class GuardedInstrument:
+    """A counter or histogram whose attributes pass through an AttributeGuard."""
+
+    def __init__(self, instrument, max_values: int):
+        self.instrument = instrument
+        self.guard = AttributeGuard(max_values)
+
+    def add(self, amount, attributes=None) -> None:
+        self.instrument.add(amount, attributes=self.guard(attributes))
+
+    def record(self, amount, attributes=None) -> None:
+        self.instrument.record(amount, attributes=self.guard(attributes))
+
+
+def record_wait(kind: str, seconds: float, stage: str) -> None:
+    """
+    Record time spent waiting rather than working: kind is queue_get (a stage worker
+    waiting for input), queue_put (blocked on a full downstream queue) or retry (a
+    backoff sleep); stage is the pipeline or engine stage that waited.
+    """
+    if kind not in WAIT_KINDS:
+        raise ValueError(f"Unknown wait kind {kind!r}; expected one of {', '.join(WAIT_KINDS)}")
+    _wait_duration.record(seconds, attributes={"kind": kind, "stage": stage})
+
+
+def record_limiter_wait(limiter: str, seconds: float, kind: str = "token") -> None:
+    """Record a rate limiter wait: kind is token (rate) or slot (concurrency cap)."""
+    _limiter_wait.record(seconds, attributes={"limiter": limiter, "kind": kind})
+
+
+def record_output(sink: str, rows: int, nbytes: int | None = None) -> None:
+    """Count rows (and bytes, when known) written by an output sink: export, store or upload."""
+    if sink not in SINKS:
+        raise ValueError(f"Unknown sink {sink!r}; expected one of {', '.join(SINKS)}")
+    _output_rows.add(rows, attributes={"sink": sink})
+    if nbytes is not None:
+        _output_bytes.add(nbytes, attributes={"sink": sink})
+
+
+def _register_process_metrics(meter) -> None:
+    """Observable gauges for this process's resident memory and CPU time, read on each collection."""
+    last = {"wall": time.monotonic(), "cpu": _cpu_seconds()}
+
+    def rss(options: CallbackOptions):
+        yield Observation(_rss_bytes())
+
+    def peak_rss(options: CallbackOptions):
+        # ru_maxrss is in KiB on Linux (bytes on macOS).
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        yield Observation(peak if sys.platform == "darwin" else peak * 1024)
+
+    def cpu_time(options: CallbackOptions):
+        times = os.times()
+        yield Observation(times.user, {"mode": "user"})
+        yield Observation(times.system, {"mode": "system"})
+
+    def utilization(options: CallbackOptions):
+        # Cores busy since the previous collection (1.0 = one core fully used).
+        wall, cpu = time.monotonic(), _cpu_seconds()
+        elapsed = wall - last["wall"]
+        if elapsed > 0:
+            yield Observation((cpu - last["cpu"]) / elapsed)
+        last.update(wall=wall, cpu=cpu)
+
+    meter.create_observable_gauge("trendnest.process.rss_bytes", [rss], unit="By", description="Resident set size")
+    meter.create_observable_gauge(
+        "trendnest.process.peak_rss_bytes", [peak_rss], unit="By", description="Peak resident set size"
+    )
+    meter.create_observable_counter(
+        "trendnest.process.cpu_seconds", [cpu_time], unit="s", description="Process CPU time, by mode (user or system)"
+    )
+    meter.create_observable_gauge(
+        "trendnest.process.cpu_utilization", [utilization], unit="1", description="CPU cores in use since the last read"
+    )
+
+
+def _cpu_seconds() -> float:
+    times = os.times()
+    return times.user + times.system
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # No procfs (e.g. macOS): the peak is the closest available figure.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def metrics_text() -> str:
+    """
+    Current metric values in the Prometheus text exposition format ("" when metrics go to
+    an OTLP collector instead). Counters gain a _total suffix; histograms are cumulative.
+    """
+    if _local_reader is None:
+        return ""
+    lines = []
+    data = _local_reader.get_metrics_data()
+    for resource_metrics in data.resource_metrics if data else []:
+        for scope_metrics in resource_metrics.scope_metrics:
+            for metric in scope_metrics.metrics:
+                lines.extend(_prometheus_lines(metric))
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def write_metrics_text(path: str) -> None:
+    """Write metrics_text() to path (atomically), e.g. for the node_exporter textfile collector."""
+    text = metrics_text()
+    if not text:
+        return
+
+    def write(tmp_path):
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    atomic_write(path, write)
+    logger.info("Metrics written to %s", path)
+
+
+def serve_metrics(port: int, host: str = ""):
+    """Serve metrics_text() at http://host:port/metrics from a daemon thread; returns the server."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = metrics_text().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug("metrics endpoint: " + format, *args)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info("Serving metrics on port %s", server.server_address[1])
+    return server
+
+
+def _prometheus_lines(metric):
+    name = re.sub(r"[^a-zA-Z0-9_:]", "_", metric.name)
+    data = metric.data
+    if isinstance(data, Histogram):
+        kind = "histogram"
+    elif isinstance(data, Sum) and data.is_monotonic:
+        kind = "counter"
+        name = name if name.endswith("_total") else f"{name}_total"
+    else:
+        kind = "gauge"
+    description = (metric.description or metric.name).replace("\\", "\\\\").replace("\n", "\\n")
+    lines = [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+    for point in data.data_points:
+        attributes = dict(point.attributes or {})
+        if kind != "histogram":
+            lines.append(f"{name}{_labels(attributes)} {_number(point.value)}")
+            continue
+        cumulative = 0
+        for bound, count in zip([*point.explicit_bounds, float("inf")], point.bucket_counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else _number(bound)
+            lines.append(f"{name}_bucket{_labels({**attributes, 'le': le})} {cumulative}")
+        lines.append(f"{name}_sum{_labels(attributes)} {_number(point.sum)}")
+        lines.append(f"{name}_count{_labels(attributes)} {point.count}")
+    return lines
+
+
+def _labels(attributes: dict) -> str:
+    if not attributes:
+        return ""
+    pairs = (f'{re.sub(r"[^a-zA-Z0-9_]", "_", str(k))}="{_escape(str(v))}"' for k, v in attributes.items())
+    return "{" + ",".join(pairs) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
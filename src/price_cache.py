@@ -0,0 +1,154 @@
+import logging
+import os
+import re
+
+import pandas as pd
+from opentelemetry import trace
+
+from src.atomic import atomic_write
+
+logger = logging.getLogger(__name__)
+tracer = trace.get_tracer(__name__)
+
+_PERIOD_RE = re.compile(r"^(\d+)(d|wk|mo|y)$")
+_PERIOD_UNITS = {"d": "days", "wk": "weeks", "mo": "months", "y": "years"}
+# Slack for weekends/holidays when checking whether cached bars cover a period.
+_COVERAGE_TOLERANCE = pd.Timedelta(days=7)
+
+
+class PriceCache:
+    """
+    On-disk OHLCV history, one Parquet file per ticker and interval:
+    <root>/interval=<interval>/ticker=<symbol>.parquet
+    Rows are keyed on `date`; newer fetches win when bars overlap.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path_for(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.root, f"interval={interval}", f"ticker={symbol}.parquet")
+
+    def load(self, symbol: str, interval: str) -> pd.DataFrame | None:
+        path = self.path_for(symbol, interval)
+        if not os.path.isfile(path):
+            return None
+        try:
+            df = pd.read_parquet(path)
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable price cache %s: %s", path, e)
+            return None
+        return df if not df.empty else None
+
+    def last_timestamp(self, symbol: str, interval: str) -> pd.Timestamp | None:
+        df = self.load(symbol, interval)
+        if df is None:
+            return None
+        return df["date"].max()
+
+    def merge(self, symbol: str, interval: str, new_bars: pd.DataFrame) -> pd.DataFrame:
+        """Merge new_bars into the cached history (de-duplicated on date) and persist it."""
+        with tracer.start_as_current_span(
+            "price_cache_merge",
+            attributes={"symbol": symbol, "interval": interval, "rows.new": len(new_bars)},
+        ):
+            cached = self.load(symbol, interval)
+            merged = new_bars if cached is None else pd.concat([cached, new_bars], ignore_index=True)
+            merged = (
+                merged.drop_duplicates(subset="date", keep="last")
+                .sort_values("date")
+                .reset_index(drop=True)
+            )
+            self._write(symbol, interval, merged)
+            logger.debug("Price cache for %s/%s now holds %s rows", symbol, interval, len(merged))
+            return merged
+
+    def invalidate(
+        self,
+        symbol: str,
+        interval: str,
+        start: str | None = None,
+        end: str | None = None,
+    ) -> None:
+        """
+        Drop cached bars for symbol/interval. Without start/end the whole file is removed.
+        With start only, every bar from start onwards is dropped so the next fetch re-downloads it.
+        """
+        path = self.path_for(symbol, interval)
+        if start is None and end is None:
+            if os.path.isfile(path):
+                os.remove(path)
+                logger.info("Invalidated price cache for %s/%s", symbol, interval)
+            return
+
+        cached = self.load(symbol, interval)
+        if cached is None:
+            return
+        mask = pd.Series(True, index=cached.index)
+        if start is not None:
+            mask &= cached["date"] >= _as_timestamp(start, cached["date"])
+        if end is not None:
+            mask &= cached["date"] <= _as_timestamp(end, cached["date"])
+        kept = cached[~mask].reset_index(drop=True)
+        if kept.empty:
+            os.remove(path)
+        else:
+            self._write(symbol, interval, kept)
+        logger.info("Invalidated %s cached bars for %s/%s", int(mask.sum()), symbol, interval)
+
+    def symbols(self, interval: str) -> list[str]:
+        directory = os.path.join(self.root, f"interval={interval}")
+        if not os.path.isdir(directory):
+            return []
+        return sorted(
+            name[len("ticker="):-len(".parquet")]
+            for name in os.listdir(directory)
+            if name.startswith("ticker=") and name.endswith(".parquet")
+        )
+
+    def _write(self, symbol: str, interval: str, df: pd.DataFrame) -> None:
+        atomic_write(self.path_for(symbol, interval), lambda tmp: df.to_parquet(tmp, index=False))
+
+
+def period_offset(period: str) -> pd.DateOffset | None:
+    """Translate a yfinance period string (5d, 6mo, 1y, ...) to an offset; None for max/ytd/unknown."""
+    match = _PERIOD_RE.match(period)
+    if not match:
+        return None
+    amount, unit = match.groups()
+    return pd.DateOffset(**{_PERIOD_UNITS[unit]: int(amount)})
+
+
+def covers_period(df: pd.DataFrame, period: str) -> bool:
+    """True if the cached bars reach back far enough to serve `period` without a full download."""
+    offset = period_offset(period)
+    if offset is None:
+        # "max" can never be proven complete from the cache alone, so it always downloads in full.
+        return period == "ytd" and df["date"].min() <= _year_start(df["date"].max()) + _COVERAGE_TOLERANCE
+    cutoff = pd.Timestamp.now(tz=df["date"].dt.tz) - offset
+    return df["date"].min() <= cutoff + _COVERAGE_TOLERANCE
+
+
+def slice_period(df: pd.DataFrame, period: str) -> pd.DataFrame:
+    """Trim cached history to the requested period window, measured back from the latest bar."""
+    latest = df["date"].max()
+    offset = period_offset(period)
+    if offset is not None:
+        cutoff = latest - offset
+    elif period == "ytd":
+        cutoff = _year_start(latest)
+    else:
+        return df.reset_index(drop=True)
+    return df[df["date"] > cutoff].reset_index(drop=True)
+
+
+def _year_start(ts: pd.Timestamp) -> pd.Timestamp:
+    return ts.normalize().replace(month=1, day=1)
+
+
+def _as_timestamp(value: str, dates: pd.Series) -> pd.Timestamp:
+    ts = pd.Timestamp(value)
+    tz = dates.dt.tz
+    if tz is not None and ts.tzinfo is None:
+        ts = ts.tz_localize(tz)
+    return ts
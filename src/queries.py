@@ -0,0 +1,87 @@
+"""
+Local equivalents of the reports in sql/, run against the LocalStore instead of BigQuery.
+Every filter is a bound parameter, and the typed columns need no PARSE_DATE/CAST per row.
+"""
+
+from collections.abc import Sequence
+
+import pandas as pd
+
+from src.local_store import LocalStore, format_date, format_end_date
+
+
+def latest_prices(store: LocalStore, tickers: Sequence[str] | None = None, interval: str = "1d") -> pd.DataFrame:
+    """
+    Most recent close per ticker (sql/latest_prices.sql). Each ticker's latest bar is
+    found with a primary-key seek, so a ticker that missed the last session still shows.
+    Columns: Ticker, date, latest_close.
+    """
+    tickers_sql = ""
+    params: list = [interval]
+    if tickers is not None:
+        tickers_sql = f" AND Ticker IN ({', '.join('?' * len(tickers))})"
+        params += list(tickers)
+    return store.query(
+        "SELECT t.Ticker, p.date, p.Close AS latest_close"
+        f" FROM (SELECT DISTINCT Ticker FROM prices WHERE interval = ?{tickers_sql}) t"
+        " JOIN prices p ON p.Ticker = t.Ticker AND p.interval = ?"
+        " AND p.date = (SELECT MAX(date) FROM prices WHERE Ticker = t.Ticker AND interval = ?)"
+        " ORDER BY t.Ticker",
+        [*params, interval, interval],
+    )
+
+
+def monthly_averages(
+    store: LocalStore,
+    ticker: str,
+    start=None,
+    end=None,
+    interval: str = "1d",
+) -> pd.DataFrame:
+    """
+    Average close and volume per calendar month for one ticker (sql/monthly_averages.sql),
+    optionally limited to [start, end]. Columns: month (YYYY-MM), avg_close, avg_volume.
+    """
+    sql = (
+        "SELECT substr(date, 1, 7) AS month, ROUND(AVG(Close), 2) AS avg_close, ROUND(AVG(Volume)) AS avg_volume"
+        " FROM prices WHERE Ticker = ? AND interval = ?"
+    )
+    params = [ticker, interval]
+    if start is not None:
+        sql += " AND date >= ?"
+        params.append(format_date(start))
+    if end is not None:
+        sql += " AND date <= ?"
+        params.append(format_end_date(end))
+    return store.query(sql + " GROUP BY month ORDER BY month", params)
+
+
+def volume_spikes(
+    store: LocalStore,
+    min_volume: int = 100_000_000,
+    tickers: Sequence[str] | None = None,
+    start=None,
+    end=None,
+    limit: int | None = None,
+    interval: str = "1d",
+) -> pd.DataFrame:
+    """
+    Bars that traded more than `min_volume` shares, largest first (sql/volume_spikes.sql).
+    The Volume index serves both the filter and the ordering. Columns: date, Ticker, volume.
+    """
+    sql = "SELECT date, Ticker, Volume AS volume FROM prices WHERE Volume > ? AND interval = ?"
+    params: list = [int(min_volume), interval]
+    if tickers is not None:
+        sql += f" AND Ticker IN ({', '.join('?' * len(tickers))})"
+        params += list(tickers)
+    if start is not None:
+        sql += " AND date >= ?"
+        params.append(format_date(start))
+    if end is not None:
+        sql += " AND date <= ?"
+        params.append(format_end_date(end))
+    sql += " ORDER BY Volume DESC"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+    return store.query(sql, params)
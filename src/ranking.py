@@ -0,0 +1,104 @@
+import logging
+
+import numpy as np
+import pandas as pd
+from opentelemetry import trace
+
+logger = logging.getLogger(__name__)
+tracer = trace.get_tracer(__name__)
+
+RANKING_METRICS = ("pct_change", "n_day_return", "volume_surge", "vol_adjusted_return")
+# Candidate yfinance periods with their approximate number of trading sessions, smallest first.
+_PERIOD_BARS = (("5d", 5), ("1mo", 21), ("3mo", 63), ("6mo", 126), ("1y", 252), ("2y", 504))
+
+
+def lookback_period(metric: str, lookback: int) -> str:
+    """Smallest yfinance period holding enough trading days to score `metric` over `lookback` bars."""
+    # Two bars of slack for holidays and a not-yet-published latest session.
+    needed = (2 if metric == "pct_change" else lookback + 1) + 2
+    for period, bars in _PERIOD_BARS:
+        if bars >= needed:
+            return period
+    return _PERIOD_BARS[-1][0]
+
+
+def frames_to_wide(frames: dict[str, pd.DataFrame], column: str) -> pd.DataFrame:
+    """Pivot per-ticker frames into a date x ticker matrix of `column`."""
+    series = {
+        symbol: df.set_index("date")[column]
+        for symbol, df in frames.items()
+        if df is not None and column in df.columns and not df.empty
+    }
+    if not series:
+        return pd.DataFrame()
+    return pd.DataFrame(series).sort_index()
+
+
+def score_universe(
+    closes: pd.DataFrame,
+    metric: str = "pct_change",
+    lookback: int = 5,
+    volumes: pd.DataFrame | None = None,
+) -> pd.Series:
+    """
+    Score every ticker (column) of a date x ticker close matrix in one vectorized pass.
+    Tickers without enough history score NaN.
+    """
+    if metric not in RANKING_METRICS:
+        raise ValueError(f"Unknown ranking metric {metric!r}; expected one of {RANKING_METRICS}")
+    if closes.empty:
+        return pd.Series(dtype="float64")
+
+    # Forward-fill so a ticker missing the latest session still uses its last close.
+    prices = closes.ffill().to_numpy(dtype="float64")
+    window = 1 if metric == "pct_change" else lookback
+    if len(prices) <= window:
+        return pd.Series(np.nan, index=closes.columns)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if metric in ("pct_change", "n_day_return"):
+            scores = (prices[-1] / prices[-1 - window] - 1.0) * 100
+        elif metric == "vol_adjusted_return":
+            log_returns = np.diff(np.log(prices[-1 - window:]), axis=0)
+            total = log_returns.sum(axis=0)
+            volatility = np.nanstd(log_returns, axis=0, ddof=1) * np.sqrt(window)
+            scores = total / volatility
+        else:
+            if volumes is None or volumes.empty:
+                raise ValueError("volume_surge ranking requires a volume matrix")
+            vols = volumes.reindex(columns=closes.columns).to_numpy(dtype="float64")
+            baseline = np.nanmean(vols[-1 - window:-1], axis=0)
+            scores = vols[-1] / baseline
+
+    scores[~np.isfinite(scores)] = np.nan
+    return pd.Series(scores, index=closes.columns)
+
+
+def top_k(scores: pd.Series, k: int) -> list[str]:
+    """Highest-scoring k tickers, using a partial sort instead of ordering the whole universe."""
+    scores = scores.dropna()
+    if k <= 0 or scores.empty:
+        return []
+    values = scores.to_numpy()
+    if k < len(values):
+        candidates = np.argpartition(-values, k - 1)[:k]
+    else:
+        candidates = np.arange(len(values))
+    ordered = candidates[np.argsort(-values[candidates], kind="stable")]
+    return scores.index[ordered].tolist()
+
+
+def rank_frames(
+    frames: dict[str, pd.DataFrame],
+    limit: int,
+    metric: str = "pct_change",
+    lookback: int = 5,
+) -> list[str]:
+    with tracer.start_as_current_span(
+        "rank_universe",
+        attributes={"universe_size": len(frames), "metric": metric, "lookback": lookback},
+    ):
+        closes = frames_to_wide(frames, "Close")
+        volumes = frames_to_wide(frames, "Volume") if metric == "volume_surge" else None
+        scores = score_universe(closes, metric=metric, lookback=lookback, volumes=volumes)
+        return top_k(scores, limit)
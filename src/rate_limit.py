@@ -0,0 +1,204 @@
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Executor, Future
+from contextlib import contextmanager
+
+from src.observability import record_limiter_wait
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Token bucket refilled at `rate` tokens/s holding at most `burst` tokens.
+    Callers reserve a token under the lock and sleep outside it, so waiting threads
+    do not serialize behind each other. An optional semaphore caps concurrent requests
+    (per-host concurrency). The effective rate halves on throttle() and recovers
+    gradually on success(), down to `min_rate`.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int = 1,
+        max_concurrency: int | None = None,
+        min_rate: float | None = None,
+        name: str = "default",
+    ):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.name = name
+        self.base_rate = float(rate)
+        self.rate = float(rate)
+        self.min_rate = float(min_rate) if min_rate else self.base_rate / 16
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """Take `tokens` now and return how long the caller must wait before using them."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Tokens may go negative: later callers queue up behind earlier reservations.
+            self._tokens -= tokens
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Block until `tokens` are available; returns the time spent waiting."""
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+        record_limiter_wait(self.name, delay, "token")
+        return delay
+
+    def throttle(self) -> None:
+        """Provider pushed back (e.g. HTTP 429): halve the rate and drain the burst."""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+        logger.warning("Rate limiter %s throttled to %.2f req/s", self.name, self.rate)
+
+    def success(self) -> None:
+        """Additively recover towards the configured rate after a successful call."""
+        if self.rate >= self.base_rate:
+            return
+        with self._lock:
+            self.rate = min(self.base_rate, self.rate + self.base_rate / 10)
+
+    @contextmanager
+    def limit(self, tokens: float = 1.0):
+        """Hold a concurrency slot (if configured) and a token for the duration of a request."""
+        if self._slots is not None:
+            started = time.perf_counter()
+            self._slots.acquire()
+            record_limiter_wait(self.name, time.perf_counter() - started, "slot")
+        try:
+            self.acquire(tokens)
+            yield self
+        finally:
+            if self._slots is not None:
+                self._slots.release()
+
+
+_limiters: dict[str, TokenBucket] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name: str, settings=None) -> TokenBucket:
+    """
+    Shared limiter for a named budget. "yfinance" and "gemini" read their limits from
+    Settings; any other name gets its own bucket with the yfinance limits, so a component
+    can opt into a separate budget by asking for a different name.
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            limiter = _build_limiter(name, settings)
+            _limiters[name] = limiter
+        return limiter
+
+
+def configure_limiters(settings) -> None:
+    """(Re)create the named limiters from settings, e.g. after loading a YAML config."""
+    with _limiters_lock:
+        names = set(_limiters) | {"yfinance", "gemini"}
+        _limiters.clear()
+        for name in names:
+            _limiters[name] = _build_limiter(name, settings)
+
+
+def _build_limiter(name: str, settings=None) -> TokenBucket:
+    if settings is None:
+        from src.config import get_settings
+
+        settings = get_settings()
+    if name == "gemini":
+        return TokenBucket(
+            settings.llm_rate_per_second,
+            burst=settings.llm_burst,
+            max_concurrency=settings.llm_max_concurrency or None,
+            name=name,
+        )
+    return TokenBucket(
+        settings.fetch_rate_per_second,
+        burst=settings.fetch_burst,
+        max_concurrency=settings.fetch_max_concurrency or None,
+        name=name,
+    )
+
+
+def backoff_delay(base: float, attempt: int) -> float:
+    """Exponential backoff with jitter for the given (1-based) attempt."""
+    return base * (2 ** (attempt - 1)) + random.random()
+
+
+class RetryScheduler:
+    """
+    Re-submits work to an executor after a delay from a single timer thread, so a
+    task waiting out its backoff does not occupy a worker slot. schedule() returns a
+    Future that resolves with the result of the delayed call.
+    """
+
+    def __init__(self, executor: Executor):
+        self._executor = executor
+        self._heap: list = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="retry-scheduler", daemon=True)
+        self._thread.start()
+
+    def schedule(self, delay: float, fn: Callable, *args, **kwargs) -> Future:
+        outer: Future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("RetryScheduler is shut down")
+            heapq.heappush(self._heap, (time.monotonic() + delay, next(self._counter), outer, fn, args, kwargs))
+            self._cond.notify()
+        return outer
+
+    def shutdown(self) -> None:
+        """Stop the timer thread; pending retries are cancelled."""
+        with self._cond:
+            self._closed = True
+            pending, self._heap = self._heap, []
+            self._cond.notify()
+        for _, _, outer, _, _, _ in pending:
+            outer.cancel()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._closed and (not self._heap or self._heap[0][0] > time.monotonic()):
+                    timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                    self._cond.wait(timeout)
+                if self._closed:
+                    return
+                _, _, outer, fn, args, kwargs = heapq.heappop(self._heap)
+            if not outer.set_running_or_notify_cancel():
+                continue
+            try:
+                inner = self._executor.submit(fn, *args, **kwargs)
+            except Exception as e:  # noqa: BLE001
+                outer.set_exception(e)
+                continue
+            inner.add_done_callback(lambda f, outer=outer: _chain(f, outer))
+
+
+def _chain(source: Future, target: Future) -> None:
+    if source.cancelled():
+        target.set_exception(RuntimeError("Scheduled retry was cancelled"))
+    elif source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
@@ -0,0 +1,107 @@
+import logging
+from collections.abc import Sequence
+
+import numpy as np
+import pandas as pd
+from opentelemetry import trace
+
+logger = logging.getLogger(__name__)
+tracer = trace.get_tracer(__name__)
+
+PRICE_COLUMNS = ("Open", "High", "Low", "Close", "adjusted_close")
+# A price column is stored as float32 only if every value survives the round trip to
+# within half a cent; above ~65k float32 can't guarantee that, so such tickers stay float64.
+PRICE_TOLERANCE = 0.005
+
+
+def compact_frame(df: pd.DataFrame, symbol: str | None = None, price_tolerance: float = PRICE_TOLERANCE) -> pd.DataFrame:
+    """
+    Normalize one ticker's cleaned bars to compact dtypes: datetime64 dates, float32
+    prices (where lossless to `price_tolerance`), the smallest integer type that holds
+    Volume, and Ticker as a categorical. With `symbol`, the Ticker column is set to it.
+    """
+    with tracer.start_as_current_span("compact_frame", attributes={"rows": len(df)}):
+        columns = {}
+        if "date" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["date"]):
+            columns["date"] = pd.to_datetime(df["date"])
+        columns.update(_compact_prices(df, price_tolerance))
+        if "Volume" in df.columns:
+            columns["Volume"] = _compact_integers(df["Volume"])
+        if symbol is not None:
+            codes = np.zeros(len(df), dtype="int8")
+            columns["Ticker"] = pd.Categorical.from_codes(codes, categories=[symbol])
+        elif "Ticker" in df.columns and not isinstance(df["Ticker"].dtype, pd.CategoricalDtype):
+            columns["Ticker"] = df["Ticker"].astype("category")
+        # One frame construction instead of an assign per column (cheaper for short frames).
+        data = {name: columns.pop(name, df[name]) for name in df.columns}
+        data.update(columns)
+        return pd.DataFrame(data, index=df.index)
+
+
+def combine_frames(frames: Sequence[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatenate per-ticker frames in one copy. Categorical Tickers are merged through their
+    codes into a single categorical over every ticker (pd.concat would fall back to object
+    strings when the categories differ). A single frame is returned as is.
+    """
+    frames = [frame for frame in frames if frame is not None]
+    if not frames:
+        return pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0]
+    with tracer.start_as_current_span("combine_frames", attributes={"frames": len(frames)}):
+        if not all("Ticker" in f.columns and isinstance(f["Ticker"].dtype, pd.CategoricalDtype) for f in frames):
+            return pd.concat(frames, ignore_index=True)
+        categories = {}
+        codes = []
+        for frame in frames:
+            ticker = frame["Ticker"].cat
+            # Map this frame's category codes onto positions in the combined category list.
+            remap = np.array([categories.setdefault(c, len(categories)) for c in ticker.categories] + [-1], dtype="int32")
+            # Missing values (code -1) index the trailing -1.
+            codes.append(remap[ticker.codes.to_numpy()])
+        combined = pd.concat([frame.drop(columns="Ticker") for frame in frames], ignore_index=True)
+        ticker = pd.Categorical.from_codes(np.concatenate(codes), categories=list(categories))
+        position = list(frames[0].columns).index("Ticker")
+        combined.insert(min(position, combined.shape[1]), "Ticker", ticker)
+        return combined
+
+
+def bytes_per_row(df: pd.DataFrame) -> float:
+    """Deep memory usage (index and Python string objects included) divided by the row count."""
+    return float(df.memory_usage(deep=True).sum()) / max(len(df), 1)
+
+
+def _compact_prices(df: pd.DataFrame, tolerance: float) -> dict:
+    names = [name for name in PRICE_COLUMNS if name in df.columns and df[name].dtype == "float64"]
+    if not names:
+        return {}
+    # One 2-D pass over all price columns; per-column round trips cost more in pandas overhead than in math.
+    values = df[names].to_numpy()
+    narrowed = values.astype("float32")
+    with np.errstate(invalid="ignore"):
+        error = np.abs(narrowed - values)
+    error[np.isnan(error)] = 0.0
+    worst = error.max(axis=0) if len(values) else np.zeros(len(names))
+    compact = {}
+    for i, name in enumerate(names):
+        if worst[i] > tolerance:
+            logger.debug("Keeping %s as float64: float32 would be off by %.4f", name, worst[i])
+            continue
+        compact[name] = pd.Series(narrowed[:, i], index=df.index, name=name)
+    return compact
+
+
+def _compact_integers(values: pd.Series) -> pd.Series:
+    """
+    int32 for Volume unless a value needs int64 (narrower types overflow too easily in sums).
+    Float volumes (from NaN-padded batch downloads) are converted only if all are whole numbers.
+    """
+    if values.dtype.kind not in "iuf" or values.empty:
+        return values
+    array = values.to_numpy()
+    if values.dtype.kind == "f" and not (np.isfinite(array).all() and (array == np.round(array)).all()):
+        return values
+    low, high = array.min(), array.max()
+    info = np.iinfo("int32")
+    return values.astype("int32" if info.min <= low and high <= info.max else "int64")
@@ -0,0 +1,394 @@
+import itertools
+import logging
+import queue
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import pandas as pd
+from opentelemetry import trace
+
+from src.export import (
+    append_part,
+    path_size,
+    remove_path,
+    staging_path,
+    swap_into_place,
+)
+from src.extract_stocks import FetchError, iter_stock_data_batches
+from src.features import extract_features
+from src.observability import record_output, record_wait, timed_stage
+from src.pipeline import (
+    PipelineMetrics,
+    collect_summaries,
+    fetch_ticker,
+    prepare_and_extract,
+    record_failure,
+)
+from src.rate_limit import RetryScheduler, backoff_delay
+from src.schema import combine_frames
+
+logger = logging.getLogger(__name__)
+tracer = trace.get_tracer(__name__)
+
+_DONE = object()
+
+
+@dataclass
+class StageStats:
+    name: str
+    workers: int
+    processed: int = 0
+    failed: int = 0
+    busy_seconds: float = 0.0
+    # Time spent waiting for upstream work vs. blocked on a full downstream queue (backpressure).
+    starved_seconds: float = 0.0
+    blocked_seconds: float = 0.0
+
+
+class Stage:
+    """
+    A pool of worker threads reading (symbol, payload) items from a bounded inbox.
+    fn(symbol, payload) returns the payload for the next stage, or None to drop the item.
+    When the last worker sees the end marker, the stage closes its downstream stage.
+    """
+
+    def __init__(self, name: str, fn: Callable, workers: int, queue_size: int):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.inbox: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self.downstream: Stage | None = None
+        self.stats = StageStats(name=name, workers=self.workers)
+        self._lock = threading.Lock()
+        self._alive = 0
+        self._threads: list[threading.Thread] = []
+
+    def start(self, on_error: Callable[[str, Exception], None]) -> None:
+        self._alive = self.workers
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, args=(on_error,), name=f"stage-{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def close(self) -> None:
+        """Signal end of input: one end marker per worker."""
+        for _ in range(self.workers):
+            self.inbox.put(_DONE)
+
+    def join(self) -> None:
+        for thread in self._threads:
+            thread.join()
+
+    def _work(self, on_error) -> None:
+        while True:
+            waited = time.perf_counter()
+            item = self.inbox.get()
+            starved = time.perf_counter() - waited
+            if item is _DONE:
+                break
+            record_wait("queue_get", starved, self.name)
+            symbol, payload = item
+            started = time.perf_counter()
+            try:
+                result = self.fn(symbol, payload)
+            except Exception as e:  # noqa: BLE001
+                self._record(starved, time.perf_counter() - started, 0.0, failed=True)
+                on_error(symbol, e)
+                continue
+            busy = time.perf_counter() - started
+
+            blocked = 0.0
+            if result is not None and self.downstream is not None:
+                put_started = time.perf_counter()
+                self.downstream.inbox.put((symbol, result))
+                blocked = time.perf_counter() - put_started
+                record_wait("queue_put", blocked, self.name)
+            self._record(starved, busy, blocked)
+
+        with self._lock:
+            self._alive -= 1
+            last = self._alive == 0
+        if last and self.downstream is not None:
+            self.downstream.close()
+
+    def _record(self, starved: float, busy: float, blocked: float, failed: bool = False) -> None:
+        with self._lock:
+            self.stats.starved_seconds += starved
+            self.stats.busy_seconds += busy
+            self.stats.blocked_seconds += blocked
+            if failed:
+                self.stats.failed += 1
+            else:
+                self.stats.processed += 1
+
+
+class StreamingSink:
+    """
+    Consumes cleaned frames one at a time: appends each to the export (a CSV file, or a
+    part file per frame for columnar/partitioned formats) and buffers rows for upload,
+    flushing every `chunk_rows`. The export is built at a staging path and swapped into
+    place on close(). Buffered rows are dropped only once their upload succeeds; a failed
+    upload raises and leaves them buffered.
+    """
+
+    def __init__(
+        self,
+        export_path: str,
+        upload: Callable[[pd.DataFrame], None] | None = None,
+        chunk_rows=50_000,
+        fmt: str = "csv",
+        partition_by: list[str] | None = None,
+    ):
+        self.export_path = export_path
+        self.upload = upload
+        self.chunk_rows = chunk_rows
+        self.fmt = fmt
+        self.partition_by = partition_by
+        self.rows_written = 0
+        self._staging = staging_path(export_path)
+        self._buffer: list[pd.DataFrame] = []
+        self._buffered_rows = 0
+
+    def write(self, df: pd.DataFrame, upload: bool = True) -> None:
+        """Export `df`; upload=False keeps it out of the upload (rows already uploaded earlier)."""
+        with timed_stage("export"):
+            append_part(df, self._staging, self.fmt, self.partition_by)
+        record_output("export", len(df))
+        self.rows_written += len(df)
+        if self.upload is None or not upload:
+            return
+        self._buffer.append(df)
+        self._buffered_rows += len(df)
+        if self._buffered_rows >= self.chunk_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._buffer or self.upload is None:
+            return
+        self.upload(combine_frames(self._buffer))
+        self._buffer, self._buffered_rows = [], 0
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            if self.rows_written:
+                swap_into_place(self._staging, self.export_path)
+                # Rows were counted as they were appended; the size is only final now.
+                record_output("export", 0, path_size(self.export_path))
+            else:
+                remove_path(self._staging)
+        logger.info("Streaming sink wrote %s rows to %s", self.rows_written, self.export_path)
+
+    def abort(self) -> None:
+        """Discard the staged export of a failed run; the published export is left as it was."""
+        remove_path(self._staging)
+
+
+def run_staged_engine(
+    tickers: list[str],
+    settings,
+    period: str,
+    interval: str,
+    run_id: str,
+    metrics: PipelineMetrics,
+    sink: StreamingSink,
+    batch_size: int = 0,
+    cache=None,
+    summarizer=None,
+    checkpoint=None,
+    quarantine=None,
+) -> tuple[list[dict], list[StageStats]]:
+    """
+    extract -> transform/validate -> analyze -> summarize -> sink, each stage with its
+    own worker count and connected by bounded queues. A slow stage fills its inbox and
+    blocks upstream producers, so memory stays bounded by the queue sizes rather than
+    the universe size. The summarize stage only queues features on the summarizer,
+    which sends them as batched LLM requests on its own pool; without a summarizer the
+    analyze and summarize stages are left out. With a checkpoint, the sink stage also
+    saves each ticker's cleaned frame. Rows failing validation go to `quarantine`.
+    A sink failure (export, upload or checkpoint) is not a per-ticker failure: later
+    frames are dropped, and the error is raised once the stages have drained.
+    Extract workers make a single fetch attempt; a failed fetch is put back on the
+    extract inbox after its backoff by a timer thread, so the wait holds no worker.
+    With batch_size > 1, tickers are downloaded in batches (iter_stock_data_batches) and
+    each batch's frames are fed to the extract stage as it finishes, so a full extract
+    inbox also holds back the next download.
+    Returns (dead-letter rows, per-stage stats).
+    """
+    summaries = {}
+    failed_rows: list[dict] = []
+    failures_lock = threading.Lock()
+    attributes = {"environment": settings.environment}
+
+    sink_errors: list[Exception] = []
+
+    def on_error(symbol, error):
+        with failures_lock:
+            record_failure(symbol, error, run_id, failed_rows, metrics, settings)
+
+    def on_sink_error(symbol, error):
+        logger.error("Sink failed on %s: %s", symbol, error, exc_info=error, extra={"run_id": run_id})
+        sink_errors.append(error)
+
+    # Tickers whose fetch has not succeeded or failed for good; the extract stage is
+    # closed only once none are left, since a pending retry re-enters its inbox.
+    unresolved = [len(tickers)]
+    unresolved_lock = threading.Lock()
+    all_resolved = threading.Event()
+    if not tickers:
+        all_resolved.set()
+
+    def resolved():
+        with unresolved_lock:
+            unresolved[0] -= 1
+            if unresolved[0] == 0:
+                all_resolved.set()
+
+    def extract(symbol, payload):
+        # payload: None, the attempt number of a retry, or a (frame, attempts) pair from a batch download.
+        prefetched = payload if isinstance(payload, tuple) else None
+        attempt = payload if isinstance(payload, int) else 1
+        retrying = False
+        try:
+            df_raw, attempts, fetch_duration = fetch_ticker(
+                symbol,
+                settings,
+                period,
+                interval,
+                prefetched=prefetched,
+                cache=cache,
+                max_retries=1,
+                run_id=run_id,
+            )
+        except FetchError:
+            if attempt >= settings.fetch_retries:
+                raise
+            delay = backoff_delay(settings.fetch_backoff, attempt)
+            logger.warning(
+                "Fetch attempt %s for %s failed; retrying in %.1f seconds",
+                attempt,
+                symbol,
+                delay,
+                extra={"run_id": run_id},
+            )
+            metrics.retry_counter.add(1, attributes={"ticker": symbol, **attributes})
+            # The wait happens on the scheduler's timer; record the planned delay.
+            record_wait("retry", delay, "fetch")
+            retrying = True
+            scheduler.schedule(delay, stages[0].inbox.put, (symbol, attempt + 1))
+            return None
+        finally:
+            if not retrying:
+                resolved()
+        if fetch_duration is not None:
+            metrics.fetch_latency_hist.record(fetch_duration, attributes={"ticker": symbol, **attributes})
+        if attempts > 1:
+            metrics.retry_counter.add(attempts - 1, attributes={"ticker": symbol, **attributes})
+        if df_raw is None or df_raw.empty:
+            logger.warning("No data for %s. Skipping.", symbol, extra={"run_id": run_id})
+            return None
+        return df_raw
+
+    def transform(symbol, df_raw):
+        # Features stay in the analyze stage; with CPU_WORKERS the cleaning runs in a worker process.
+        df_clean, _ = prepare_and_extract(
+            symbol, df_raw, settings, interval, quarantine=quarantine, run_id=run_id, with_features=False
+        )
+        return df_clean
+
+    def analyze(symbol, df_clean):
+        return df_clean, extract_features(df_clean, symbol)
+
+    def summarize(symbol, payload):
+        df_clean, features = payload
+        summaries[symbol] = summarizer.submit(symbol, features)
+        return df_clean
+
+    def write(symbol, df_clean):
+        if sink_errors:
+            # The run has failed; keep draining so upstream stages are not blocked on a full queue.
+            return
+        sink.write(df_clean)
+        if checkpoint is not None:
+            checkpoint.save_frame(symbol, df_clean)
+        metrics.row_counter.add(len(df_clean), attributes=attributes)
+        metrics.ticker_counter.add(1, attributes={"ticker": symbol, **attributes})
+
+    queue_size = settings.staged_queue_size
+    stages = [
+        Stage("extract", extract, settings.staged_extract_workers, queue_size),
+        Stage("transform", transform, settings.staged_transform_workers, queue_size),
+    ]
+    if summarizer is not None:
+        stages += [
+            Stage("analyze", analyze, settings.staged_analyze_workers, queue_size),
+            Stage("summarize", summarize, settings.staged_summarize_workers, queue_size),
+        ]
+    # A single sink worker keeps export appends ordered and the upload buffer unshared.
+    stages.append(Stage("sink", write, 1, queue_size))
+    for upstream, downstream in itertools.pairwise(stages):
+        upstream.downstream = downstream
+
+    # Delayed retries are re-queued from this pool, so a full extract inbox blocks it rather than the timer.
+    retry_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="staged-retry")
+    scheduler = RetryScheduler(retry_executor)
+    with tracer.start_as_current_span("staged_engine", attributes={"tickers.count": len(tickers)}):
+        for stage in stages:
+            stage.start(on_sink_error if stage.name == "sink" else on_error)
+        try:
+            if batch_size > 1:
+                batches = iter_stock_data_batches(
+                    tickers,
+                    period,
+                    interval,
+                    batch_size,
+                    settings.fetch_retries,
+                    settings.fetch_backoff,
+                    settings.fetch_timeout,
+                    cache,
+                )
+                for symbol, df_raw, attempts in batches:
+                    if df_raw is None:
+                        on_error(symbol, FetchError(f"Failed to fetch data for {symbol} after {attempts} attempts."))
+                        resolved()
+                        continue
+                    # Blocks once the extract inbox is full, and with it the next batch download.
+                    stages[0].inbox.put((symbol, (df_raw, attempts)))
+            else:
+                for symbol in tickers:
+                    # Blocks once the extract inbox is full: the producer is throttled too.
+                    stages[0].inbox.put((symbol, None))
+            all_resolved.wait()
+        finally:
+            scheduler.shutdown()
+            retry_executor.shutdown()
+        stages[0].close()
+        for stage in stages:
+            stage.join()
+        try:
+            if sink_errors:
+                sink.abort()
+                raise sink_errors[0]
+            sink.close()
+        finally:
+            if summarizer is not None:
+                collect_summaries(summarizer, summaries, run_id, checkpoint)
+
+    stats = [stage.stats for stage in stages]
+    for s in stats:
+        logger.info(
+            "Stage %-9s workers=%s processed=%s failed=%s busy=%.2fs starved=%.2fs blocked=%.2fs",
+            s.name,
+            s.workers,
+            s.processed,
+            s.failed,
+            s.busy_seconds,
+            s.starved_seconds,
+            s.blocked_seconds,
+            extra={"run_id": run_id},
+        )
+    return failed_rows, stats
@@ -1,39 +1,264 @@
 import logging
 import os
-import pandas as pd
-import google.generativeai as genai
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
 from dotenv import load_dotenv
 from opentelemetry import trace
 
 from src.config import get_settings
+from src.features import build_prompt, describe_features, extract_features
+from src.observability import record_wait, timed_stage
+from src.rate_limit import backoff_delay, get_limiter
+from src.summary_cache import get_summary_cache, summary_key
 
 load_dotenv()
 
-settings = get_settings()
-genai.configure(api_key=settings.gemini_api_key or os.getenv("GEMINI_API_KEY"))
-model = genai.GenerativeModel("gemini-1.5-pro")
+MODEL_NAME = "gemini-1.5-pro"
+FALLBACK_SUMMARY = "Summary unavailable due to API error."
 
 logger = logging.getLogger(__name__)
 tracer = trace.get_tracer(__name__)
 
-def generate_summary(df):
-    with tracer.start_as_current_span("generate_summary"):
-        logger.info("Generating summary with Gemini 1.5")
-        # Clean potentially erroneous rows
-        df = df[(df["Close"] > 0) & (df["Volume"] > 0)].copy()
-        df["date"] = pd.to_datetime(df["date"], errors="coerce")
-        df = df.dropna(subset=["date"])
-        df = df.sort_values("date").reset_index(drop=True)
+_SECTION_RE = re.compile(r"^\s*#{2,}\s*([A-Za-z0-9.\-^=]+)\s*$", re.MULTILINE)
+
+
+class StubModel:
+    """
+    Local stand-in for the Gemini model (LLM_BACKEND=stub) for tests and benchmarks.
+    Answers every `Ticker:` block of a prompt in the multi-ticker format after `latency` seconds.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def generate_content(self, prompt, request_options=None):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        tickers = re.findall(r"^Ticker: (\S+)", prompt, re.MULTILINE)
+        text = "\n".join(f"### {t}\n{t}: stub summary." for t in tickers)
+        return type("StubResponse", (), {"text": text})()
+
+
+def _build_model(settings):
+    if settings.llm_backend == "stub":
+        return StubModel(latency=settings.llm_stub_latency)
+    import google.generativeai as genai
+
+    genai.configure(api_key=settings.gemini_api_key or os.getenv("GEMINI_API_KEY"))
+    return genai.GenerativeModel(MODEL_NAME)
+
+
+# Created on first use: importing this module must not load the Gemini SDK or configure a client.
+model = None
+_model_lock = threading.Lock()
+
+
+def get_model(settings=None):
+    global model
+    with _model_lock:
+        if model is None:
+            model = _build_model(settings or get_settings())
+    return model
+
+
+def build_batch_prompt(features_list: list[dict]) -> str:
+    """One prompt covering several tickers; answers come back in `### TICKER` sections."""
+    blocks = "\n\n".join(describe_features(f) for f in features_list)
+    return (
+        "Summarize the recent stock trend of each ticker below in 2-3 sentences from its precomputed features.\n"
+        "Answer with one section per ticker: a line '### <TICKER>' followed by its summary.\n\n"
+        f"{blocks}"
+    )
+
+
+def parse_batch_response(text: str, tickers: list[str]) -> dict[str, str]:
+    """Split a multi-ticker answer into per-ticker summaries; tickers without a section are left out."""
+    wanted = {t.upper(): t for t in tickers}
+    sections = _SECTION_RE.split(text or "")
+    if len(sections) == 1 and len(tickers) == 1 and sections[0].strip():
+        # A lone ticker answered without the section heading.
+        return {tickers[0]: sections[0].strip()}
+    found = {}
+    # split() yields [preamble, ticker1, body1, ticker2, body2, ...]
+    for heading, body in zip(sections[1::2], sections[2::2]):
+        symbol = wanted.get(heading.strip().upper())
+        if symbol is not None and body.strip():
+            found[symbol] = body.strip()
+    return found
 
-        # Optionally remove first and last rows if enough data is present
-        if len(df) > 4:
-            df = df.iloc[1:-1]
 
-        prompt = f"Summarize recent stock trends from this data:\n{df.to_markdown(index=False)}"
+def _is_rate_limited(error: Exception) -> bool:
+    return type(error).__name__ in ("ResourceExhausted", "TooManyRequests") or "429" in str(error)
 
+
+def _resolve_leftovers(done: Future, batch) -> None:
+    # A batch that crashed outright must not leave callers waiting on its futures.
+    if done.exception() is not None:
+        logger.error("Summary batch failed: %s", done.exception())
+    for _, _, _, future in batch:
+        if not future.done():
+            future.set_result(FALLBACK_SUMMARY)
+
+
+class SummaryService:
+    """
+    Summarizes many tickers with few LLM calls. submit() answers cache hits at once and
+    queues misses; every `batch_size` misses become one multi-ticker request run on a pool
+    of `max_concurrency` threads. Each request has a timeout and is retried with jittered
+    backoff; tickers missing from an answer are re-asked in the next attempt. Tickers still
+    unanswered after `max_retries` get FALLBACK_SUMMARY.
+    """
+
+    def __init__(
+        self,
+        model,
+        model_name: str = MODEL_NAME,
+        batch_size: int = 8,
+        max_concurrency: int = 4,
+        timeout: float = 60.0,
+        max_retries: int = 3,
+        backoff: float = 1.0,
+        cache=None,
+        limiter=None,
+    ):
+        self.model = model
+        self.model_name = model_name
+        self.batch_size = max(1, batch_size)
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout
+        self.max_retries = max(1, max_retries)
+        self.backoff = backoff
+        self.cache = cache
+        self.limiter = limiter
+        self.requests = 0
+        self._pending: list[tuple[str, dict, str, Future]] = []
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+
+    def submit(self, symbol: str, features: dict, force_refresh: bool = False) -> Future:
+        """Queue one ticker; the returned future resolves to its summary."""
+        future: Future = Future()
+        features = {**features, "ticker": symbol}
+        key = summary_key(build_prompt(features), self.model_name)
+        if self.cache is not None and not force_refresh:
+            cached = self.cache.get(key, attributes={"model": self.model_name})
+            if cached is not None:
+                future.set_result(cached)
+                return future
+        with self._lock:
+            self._pending.append((symbol, features, key, future))
+            batch = self._take_batch() if len(self._pending) >= self.batch_size else None
+        if batch:
+            self._dispatch(batch)
+        return future
+
+    def flush(self) -> None:
+        """Send the queued tickers even if they don't fill a batch."""
+        with self._lock:
+            batches = []
+            while self._pending:
+                batches.append(self._take_batch())
+        for batch in batches:
+            self._dispatch(batch)
+
+    def summarize(self, features_by_symbol: dict[str, dict], force_refresh: bool = False) -> dict[str, str]:
+        futures = {s: self.submit(s, f, force_refresh) for s, f in features_by_symbol.items()}
+        self.flush()
+        return {s: f.result() for s, f in futures.items()}
+
+    def close(self) -> None:
+        self.flush()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _take_batch(self):
+        batch, self._pending = self._pending[: self.batch_size], self._pending[self.batch_size:]
+        return batch
+
+    def _dispatch(self, batch) -> None:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_concurrency, thread_name_prefix="trendnest-llm")
+            executor = self._executor
+        executor.submit(self._run_batch, batch).add_done_callback(lambda f, batch=batch: _resolve_leftovers(f, batch))
+
+    def _run_batch(self, batch) -> None:
+        remaining = list(batch)
+        with timed_stage("summarize"), tracer.start_as_current_span(
+            "summarize_batch", attributes={"tickers.count": len(batch)}
+        ) as span:
+            for attempt in range(1, self.max_retries + 1):
+                if not remaining:
+                    break
+                try:
+                    answers = self._request(remaining)
+                except Exception as e:  # noqa: BLE001
+                    logger.warning("LLM request for %s tickers failed (attempt %s): %s", len(remaining), attempt, e)
+                    if self.limiter is not None and _is_rate_limited(e):
+                        self.limiter.throttle()
+                    answers = {}
+                for item in remaining:
+                    symbol, _, key, future = item
+                    if symbol in answers:
+                        if self.cache is not None:
+                            self.cache.put(key, self.model_name, answers[symbol])
+                        future.set_result(answers[symbol])
+                remaining = [item for item in remaining if item[0] not in answers]
+                if remaining and attempt < self.max_retries:
+                    delay = backoff_delay(self.backoff, attempt)
+                    time.sleep(delay)
+                    record_wait("retry", delay, "summarize")
+            span.set_attribute("tickers.unanswered", len(remaining))
+        for symbol, _, _, future in remaining:
+            logger.error("No summary for %s after %s attempts", symbol, self.max_retries)
+            future.set_result(FALLBACK_SUMMARY)
+
+    def _request(self, items) -> dict[str, str]:
+        symbols = [symbol for symbol, _, _, _ in items]
+        prompt = build_batch_prompt([features for _, features, _, _ in items])
+        with self._lock:
+            self.requests += 1
+        if self.limiter is not None:
+            with self.limiter.limit():
+                response = self.model.generate_content(prompt, request_options={"timeout": self.timeout})
+            self.limiter.success()
+        else:
+            response = self.model.generate_content(prompt, request_options={"timeout": self.timeout})
+        return parse_batch_response(response.text, symbols)
+
+
+def build_summary_service(settings=None, cache=None) -> SummaryService:
+    settings = settings or get_settings()
+    return SummaryService(
+        get_model(settings),
+        batch_size=settings.summary_batch_size,
+        max_concurrency=settings.summary_max_concurrency,
+        timeout=settings.summary_timeout,
+        max_retries=settings.summary_retries,
+        backoff=settings.summary_backoff,
+        cache=cache if cache is not None else get_summary_cache(),
+        limiter=get_limiter("gemini"),
+    )
+
+
+def generate_summary(data, force_refresh=False):
+    """
+    Summarize one ticker. `data` is either its cleaned bars (date, Close, Volume) or
+    features already computed by src.features.extract_features; either way the prompt
+    is a fixed-size feature digest rather than the raw history. Engines summarizing many
+    tickers should use build_summary_service() so requests are batched.
+    """
+    with tracer.start_as_current_span("generate_summary"):
+        features = data if isinstance(data, dict) else extract_features(data)
+        symbol = features.get("ticker") or "unknown"
+        service = build_summary_service(cache=get_summary_cache())
         try:
-            response = model.generate_content(prompt)
-            return response.text
-        except Exception as e:
-            logger.exception("Gemini summarization failed: %s", e)
-            return "Summary unavailable due to API error."
+            return service.summarize({symbol: features}, force_refresh=force_refresh)[symbol]
+        finally:
+            service.close()
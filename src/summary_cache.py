@@ -0,0 +1,129 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from opentelemetry import metrics
+
+logger = logging.getLogger(__name__)
+meter = metrics.get_meter(__name__)
+
+_hit_counter = meter.create_counter("trendnest.summary_cache.hits", description="Summaries served from the cache")
+_miss_counter = meter.create_counter("trendnest.summary_cache.misses", description="Summaries that needed an LLM call")
+
+
+def summary_key(prompt: str, model_name: str) -> str:
+    """Content hash of the exact prompt and the model that answers it."""
+    return hashlib.sha256(f"{model_name}\0{prompt}".encode()).hexdigest()
+
+
+class SummaryCache:
+    """
+    Persistent summary store in a single SQLite file. Entries expire after `ttl_seconds`
+    (0 disables expiry). When more than `max_entries` are stored, the least recently
+    read ones are evicted. With force_refresh, lookups always miss but new summaries
+    are still written, which refreshes the stored entries.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 0, max_entries: int = 0, force_refresh: bool = False):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.force_refresh = force_refresh
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS summaries ("
+                " key TEXT PRIMARY KEY, model TEXT NOT NULL, summary TEXT NOT NULL,"
+                " created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS summaries_accessed ON summaries (accessed_at)")
+
+    def get(self, key: str, attributes: dict | None = None) -> str | None:
+        if self.force_refresh:
+            _miss_counter.add(1, attributes={"reason": "refresh", **(attributes or {})})
+            return None
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT summary, created_at FROM summaries WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM summaries WHERE key = ?", (key,))
+                row = None
+            if row is not None:
+                self._conn.execute("UPDATE summaries SET accessed_at = ? WHERE key = ?", (now, key))
+        if row is None:
+            _miss_counter.add(1, attributes={"reason": "absent", **(attributes or {})})
+            return None
+        _hit_counter.add(1, attributes=attributes or {})
+        return row[0]
+
+    def put(self, key: str, model_name: str, summary: str) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries (key, model, summary, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, model_name, summary, now, now),
+            )
+            if self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM summaries WHERE key IN ("
+                    " SELECT key FROM summaries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM summaries")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_DISABLED = object()
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_summary_cache(settings=None) -> SummaryCache | None:
+    """Shared cache built from Settings on first use; None when SUMMARY_CACHE_ENABLED is off."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = _build_cache(settings)
+        return None if _cache is _DISABLED else _cache
+
+
+def configure_summary_cache(settings, force_refresh: bool = False) -> SummaryCache | None:
+    """(Re)create the shared cache, e.g. after loading a YAML config or for --refresh-summaries."""
+    global _cache
+    with _cache_lock:
+        if isinstance(_cache, SummaryCache):
+            _cache.close()
+        _cache = _build_cache(settings, force_refresh)
+        return None if _cache is _DISABLED else _cache
+
+
+def _build_cache(settings=None, force_refresh: bool = False):
+    if settings is None:
+        from src.config import get_settings
+
+        settings = get_settings()
+    if not settings.summary_cache_enabled:
+        # A sentinel rather than None, so get_summary_cache doesn't try to build it again.
+        return _DISABLED
+    return SummaryCache(
+        settings.summary_cache_path,
+        ttl_seconds=settings.summary_cache_ttl_seconds,
+        max_entries=settings.summary_cache_max_entries,
+        force_refresh=force_refresh,
+    )
@@ -1,18 +1,130 @@
 import logging
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
 from opentelemetry import trace
 
+from src.observability import timed_stage
+
 logger = logging.getLogger(__name__)
 tracer = trace.get_tracer(__name__)
 
-def clean_data(df):
-    with tracer.start_as_current_span("clean_data"):
-        # Example transformation: drop nulls and sort by date
-        df_clean = df.dropna()
 
-        # Drop duplicate columns if any
-        df_clean = df_clean.loc[:, ~df_clean.columns.duplicated()]
+@dataclass(frozen=True)
+class Selection:
+    """
+    What the transform keeps of the input frame so far: row positions in output order
+    (None while every row is kept in its original order) and column positions. Steps
+    only narrow or reorder positions; the data is copied once, in `apply_steps`.
+    """
+
+    rows: np.ndarray | None
+    columns: np.ndarray
+
+
+# A step maps (input frame, selection so far) to a narrower or reordered selection.
+Step = Callable[[pd.DataFrame, Selection], Selection]
+
+
+def drop_missing(df: pd.DataFrame, selection: Selection) -> Selection:
+    """Drop rows with a missing value in any selected column (like DataFrame.dropna)."""
+    keep = np.ones(len(df), dtype=bool)
+    for position in selection.columns:
+        keep &= ~np.asarray(_column(df, position).array.isna())
+    if selection.rows is not None:
+        keep = keep[selection.rows]
+        return Selection(selection.rows[keep], selection.columns)
+    if keep.all():
+        return selection
+    return Selection(np.flatnonzero(keep), selection.columns)
+
+
+def drop_duplicate_columns(df: pd.DataFrame, selection: Selection) -> Selection:
+    """Keep the first of several columns with the same name."""
+    unique = ~df.columns.duplicated()
+    return Selection(selection.rows, selection.columns[unique[selection.columns]])
+
+
+def sort_by_date(df: pd.DataFrame, selection: Selection) -> Selection:
+    """
+    Order bars by date within each ticker, tickers staying in order of first appearance,
+    so one ticker's frame and the combined multi-ticker frame are handled alike. Frames
+    already in that order (the usual case) are left as they are.
+    """
+    positions = {df.columns[p]: p for p in reversed(selection.columns)}
+    if "date" not in positions:
+        return selection
+    dates = _rows(_sort_key(_column(df, positions["date"])), selection)
+    codes = None
+    if "Ticker" in positions:
+        ticker = _column(df, positions["Ticker"])
+        if isinstance(ticker.dtype, pd.CategoricalDtype):
+            ticker = ticker.cat.codes
+        # Codes in order of first appearance, so the ticker blocks keep their order.
+        # (Factorizing the Series avoids materializing Arrow-backed strings as objects.)
+        codes, uniques = pd.factorize(ticker)
+        codes = _rows(codes, selection)
+        same = codes[1:] == codes[:-1]
+        contiguous = len(codes) - int(same.sum()) <= len(uniques)
+    else:
+        same = np.ones(max(len(dates) - 1, 0), dtype=bool)
+        contiguous = True
+    if contiguous and not (dates[1:][same] < dates[:-1][same]).any():
+        return selection
+    order = np.argsort(dates, kind="stable") if codes is None else np.lexsort((dates, codes))
+    rows = order if selection.rows is None else selection.rows[order]
+    return Selection(rows, selection.columns)
 
-        if 'date' in df_clean.columns:
-            df_clean = df_clean.sort_values(by='date')
-        logger.info("Data cleaned and sorted")
+
+CLEAN_STEPS = (drop_missing, drop_duplicate_columns, sort_by_date)
+
+
+def apply_steps(df: pd.DataFrame, steps: Iterable[Step] = CLEAN_STEPS, symbol: str | None = None) -> pd.DataFrame:
+    """
+    Run `steps` over df and materialize the result with a single take. When no step
+    drops or reorders anything, the result shares df's data (copy-on-write). With
+    `symbol`, the Ticker column is set to it.
+    """
+    selection = Selection(None, np.arange(df.shape[1]))
+    for step in steps:
+        selection = step(df, selection)
+    all_columns = len(selection.columns) == df.shape[1]
+    if selection.rows is None:
+        result = df.copy(deep=False) if all_columns else df.iloc[:, selection.columns]
+    else:
+        result = df.iloc[selection.rows] if all_columns else df.iloc[selection.rows, selection.columns]
+    if symbol is not None:
+        result["Ticker"] = symbol
+    return result
+
+
+@timed_stage("clean")
+def clean_data(df: pd.DataFrame, symbol: str | None = None) -> pd.DataFrame:
+    """
+    Drop rows with missing values and duplicate columns, and sort by date (by Ticker
+    then date for a combined multi-ticker frame). See `CLEAN_STEPS`.
+    """
+    with tracer.start_as_current_span("clean_data", attributes={"rows": len(df)}):
+        df_clean = apply_steps(df, CLEAN_STEPS, symbol)
+        logger.info("Data cleaned and sorted (%s of %s rows kept)", len(df_clean), len(df))
         return df_clean
+
+
+def _column(df: pd.DataFrame, position: int) -> pd.Series:
+    # Label lookup is several times cheaper than iloc when the names are unique.
+    return df[df.columns[position]] if df.columns.is_unique else df.iloc[:, position]
+
+
+def _rows(values: np.ndarray, selection: Selection) -> np.ndarray:
+    return values if selection.rows is None else values[selection.rows]
+
+
+def _sort_key(values: pd.Series) -> np.ndarray:
+    if isinstance(values.dtype, pd.DatetimeTZDtype):
+        values = values.dt.tz_convert("UTC").dt.tz_localize(None)
+    if values.dtype.kind in "mMfiub":
+        return values.to_numpy()
+    # Strings (e.g. ISO dates read from CSV) and other objects sort through their ranks.
+    return pd.factorize(values, sort=True)[0]
@@ -1,17 +1,263 @@
+import io
 import logging
 import os
-import pandas_gbq
-from google.oauth2 import service_account
+import time
+import uuid
+from collections.abc import Sequence
+from dataclasses import dataclass
+from functools import lru_cache
+
+import pandas as pd
 from opentelemetry import trace
 
+from src.atomic import atomic_write
 from src.config import get_settings
+from src.observability import record_output, record_wait, timed_stage
 
 logger = logging.getLogger(__name__)
 tracer = trace.get_tracer(__name__)
 
+MERGE_KEYS = ("Ticker", "date", "interval")
+
+
+class UploadError(RuntimeError):
+    """Raised when one or more chunks could not be written after retries."""
+
+
+@dataclass
+class ChunkReport:
+    index: int
+    rows: int
+    bytes: int
+    seconds: float
+    attempts: int
+    error: str | None = None
+
+
+@lru_cache(maxsize=4)
+def load_credentials(credentials_path: str):
+    """Service-account credentials, read from disk once per path."""
+    if not credentials_path or not os.path.isfile(credentials_path):
+        raise OSError("Missing or invalid GOOGLE_APPLICATION_CREDENTIALS path.")
+    from google.oauth2 import service_account
+
+    return service_account.Credentials.from_service_account_file(credentials_path)
+
+
+@lru_cache(maxsize=4)
+def get_bigquery_client(project_id: str, credentials_path: str):
+    from google.cloud import bigquery
+
+    return bigquery.Client(project=project_id, credentials=load_credentials(credentials_path))
+
+
+def to_parquet_bytes(df: pd.DataFrame) -> bytes:
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, index=False)
+    return buffer.getvalue()
+
+
+class BigQueryWriter:
+    """Writes chunks to BigQuery as Parquet load jobs; merges go through a staging table."""
+
+    def __init__(self, project_id: str, dataset: str, credentials_path: str):
+        self.project_id = project_id
+        self.dataset = dataset
+        self.credentials_path = credentials_path
+
+    @property
+    def client(self):
+        return get_bigquery_client(self.project_id, self.credentials_path)
+
+    def _table_id(self, table: str) -> str:
+        return f"{self.project_id}.{self.dataset}.{table}"
+
+    def _load(self, payload: bytes, table_id: str, truncate: bool = False) -> None:
+        from google.cloud import bigquery
+
+        if truncate:
+            job_config = bigquery.LoadJobConfig(
+                source_format=bigquery.SourceFormat.PARQUET,
+                write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,
+            )
+        else:
+            # Appends may add columns, e.g. `interval` on a table created before the sink wrote it.
+            job_config = bigquery.LoadJobConfig(
+                source_format=bigquery.SourceFormat.PARQUET,
+                write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+                schema_update_options=[bigquery.SchemaUpdateOption.ALLOW_FIELD_ADDITION],
+            )
+        self.client.load_table_from_file(io.BytesIO(payload), table_id, job_config=job_config).result()
+
+    def append(self, df: pd.DataFrame, table: str) -> int:
+        payload = to_parquet_bytes(df)
+        self._load(payload, self._table_id(table))
+        return len(payload)
+
+    def merge(self, df: pd.DataFrame, table: str, keys: Sequence[str]) -> int:
+        from google.api_core.exceptions import NotFound
+
+        target = self._table_id(table)
+        # MERGE fails when two source rows match one target row (overlapping or re-fetched bars).
+        payload = to_parquet_bytes(df.drop_duplicates(subset=list(keys), keep="last"))
+        try:
+            existing = {field.name for field in self.client.get_table(target).schema}
+        except NotFound:
+            # First write creates the table; nothing to merge against yet.
+            self._load(payload, target)
+            return len(payload)
+        if "interval" in df.columns and "interval" not in existing:
+            # Tables created before the sink wrote `interval` need it before MERGE can insert into it.
+            self.client.query(f"ALTER TABLE `{target}` ADD COLUMN IF NOT EXISTS `interval` STRING").result()
+
+        staging = self._table_id(f"{table}__staging_{uuid.uuid4().hex[:12]}")
+        self._load(payload, staging, truncate=True)
+        try:
+            self.client.query(build_merge_sql(target, staging, list(df.columns), keys)).result()
+        finally:
+            self.client.delete_table(staging, not_found_ok=True)
+        return len(payload)
+
+
+class LocalWriter:
+    """
+    Local stand-in for BigQueryWriter: each table is a Parquet file under `directory`.
+    Merges upsert on the key columns, so re-runs are idempotent just like the MERGE path.
+    """
 
-def upload_to_bigquery(df):
-    settings = get_settings()
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def path_for(self, table: str) -> str:
+        return os.path.join(self.directory, f"{table}.parquet")
+
+    def read(self, table: str) -> pd.DataFrame:
+        path = self.path_for(table)
+        return pd.read_parquet(path) if os.path.isfile(path) else pd.DataFrame()
+
+    def append(self, df: pd.DataFrame, table: str) -> int:
+        self._write(pd.concat([self.read(table), df], ignore_index=True), table)
+        return len(to_parquet_bytes(df))
+
+    def merge(self, df: pd.DataFrame, table: str, keys: Sequence[str]) -> int:
+        combined = pd.concat([self.read(table), df], ignore_index=True)
+        self._write(combined.drop_duplicates(subset=list(keys), keep="last").reset_index(drop=True), table)
+        return len(to_parquet_bytes(df))
+
+    def _write(self, df: pd.DataFrame, table: str) -> None:
+        atomic_write(self.path_for(table), lambda tmp: df.to_parquet(tmp, index=False))
+
+
+def build_merge_sql(target: str, source: str, columns: Sequence[str], keys: Sequence[str]) -> str:
+    on = " AND ".join(f"T.`{k}` = S.`{k}`" for k in keys)
+    updates = ", ".join(f"`{c}` = S.`{c}`" for c in columns if c not in keys)
+    column_list = ", ".join(f"`{c}`" for c in columns)
+    values = ", ".join(f"S.`{c}`" for c in columns)
+    sql = f"MERGE `{target}` T USING `{source}` S ON {on} "
+    if updates:
+        sql += f"WHEN MATCHED THEN UPDATE SET {updates} "
+    return sql + f"WHEN NOT MATCHED THEN INSERT ({column_list}) VALUES ({values})"
+
+
+class BigQuerySink:
+    """
+    Writes a frame to `table` in chunks of `chunk_rows`, retrying each chunk independently.
+    mode="merge" upserts on (Ticker, date, interval) so re-running a load does not duplicate
+    rows. Both modes write the interval column, so a table can switch between them.
+    Every chunk is attempted; failures are raised together at the end.
+    """
+
+    def __init__(
+        self,
+        writer,
+        table: str,
+        chunk_rows: int = 50_000,
+        mode: str = "append",
+        interval: str | None = None,
+        max_retries: int = 3,
+        backoff: float = 2.0,
+    ):
+        if mode not in ("append", "merge"):
+            raise ValueError("mode must be 'append' or 'merge'")
+        self.writer = writer
+        self.table = table
+        self.chunk_rows = max(1, chunk_rows)
+        self.mode = mode
+        self.interval = interval
+        self.max_retries = max(1, max_retries)
+        self.backoff = backoff
+
+    def write(self, df: pd.DataFrame) -> list[ChunkReport]:
+        df = _flatten_columns(df)
+        if "interval" not in df.columns:
+            df = df.assign(interval=self.interval or "1d")
+
+        reports: list[ChunkReport] = []
+        with tracer.start_as_current_span(
+            "bigquery_sink_write",
+            attributes={"table": self.table, "mode": self.mode, "rows": len(df), "chunk_rows": self.chunk_rows},
+        ) as span:
+            for index, start in enumerate(range(0, len(df), self.chunk_rows)):
+                reports.append(self._write_chunk(index, df.iloc[start:start + self.chunk_rows]))
+            span.set_attribute("bytes", sum(r.bytes for r in reports))
+
+        failed = [r for r in reports if r.error]
+        if failed:
+            raise UploadError(
+                f"{len(failed)}/{len(reports)} chunks failed for {self.table}: "
+                + "; ".join(f"chunk {r.index}: {r.error}" for r in failed)
+            )
+        return reports
+
+    def _write_chunk(self, index: int, chunk: pd.DataFrame) -> ChunkReport:
+        started = time.perf_counter()
+        error = None
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                if self.mode == "merge":
+                    written = self.writer.merge(chunk, self.table, MERGE_KEYS)
+                else:
+                    written = self.writer.append(chunk, self.table)
+            except Exception as e:  # noqa: BLE001
+                error = str(e)
+                logger.warning("Chunk %s for %s failed (attempt %s): %s", index, self.table, attempt, e)
+                if attempt < self.max_retries:
+                    time.sleep(self.backoff * attempt)
+                    record_wait("retry", self.backoff * attempt, "upload")
+                continue
+            report = ChunkReport(index, len(chunk), written, time.perf_counter() - started, attempt)
+            logger.info(
+                "Wrote chunk %s to %s: %s rows, %s bytes in %.2fs",
+                index,
+                self.table,
+                report.rows,
+                report.bytes,
+                report.seconds,
+            )
+            return report
+        return ChunkReport(index, len(chunk), 0, time.perf_counter() - started, self.max_retries, error)
+
+
+def build_sink(settings=None, interval: str | None = None) -> BigQuerySink:
+    settings = settings or get_settings()
+    if settings.bq_writer == "local":
+        writer = LocalWriter(settings.bq_local_dir)
+    else:
+        credentials_path = settings.google_credentials_path or os.getenv("GOOGLE_APPLICATION_CREDENTIALS", "")
+        load_credentials(credentials_path)  # fail fast on a missing key file
+        writer = BigQueryWriter(settings.gcp_project_id, settings.bq_dataset, credentials_path)
+    return BigQuerySink(
+        writer,
+        settings.bq_table,
+        chunk_rows=settings.bq_chunk_rows,
+        mode=settings.bq_write_mode,
+        interval=interval or settings.fetch_interval,
+    )
+
+
+@timed_stage("upload")
+def upload_to_bigquery(df, settings=None, interval: str | None = None) -> list[ChunkReport]:
+    settings = settings or get_settings()
     with tracer.start_as_current_span(
         "upload_to_bigquery",
         attributes={
@@ -21,32 +267,28 @@ def upload_to_bigquery(df):
         },
     ):
         logger.info("Uploading data to BigQuery")
-
-        # Authenticate using service account
-        credentials_path = settings.google_credentials_path or os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
-        if not credentials_path or not os.path.isfile(credentials_path):
-            raise EnvironmentError("Missing or invalid GOOGLE_APPLICATION_CREDENTIALS path.")
-
-        credentials = service_account.Credentials.from_service_account_file(credentials_path)
-
-        # Set global context for pandas_gbq
-        pandas_gbq.context.credentials = credentials
-        pandas_gbq.context.project = settings.gcp_project_id
-
-        # Flatten column headers in case of MultiIndex
-        df.columns = [col[0] if isinstance(col, tuple) else str(col) for col in df.columns]
-
-        logger.debug("Column names: %s", df.columns.tolist())  # type: ignore
-        logger.debug("Columns are strings: %s", all(isinstance(col, str) for col in df.columns))
-
         try:
-            pandas_gbq.to_gbq(
-                dataframe=df,
-                destination_table=f"{settings.bq_dataset}.{settings.bq_table}",
-                project_id=settings.gcp_project_id,
-                if_exists="append"
-            )
-            logger.info("Upload to BigQuery complete: %s.%s", settings.bq_dataset, settings.bq_table)
-        except Exception as e:
-            logger.exception("Failed to upload to BigQuery: %s", e)
+            reports = build_sink(settings, interval=interval).write(df)
+        except Exception:
+            logger.exception("Failed to upload to BigQuery")
             raise
+        record_output("upload", sum(r.rows for r in reports), sum(r.bytes for r in reports))
+        logger.info(
+            "Upload to BigQuery complete: %s.%s (%s rows, %s bytes in %s chunks)",
+            settings.bq_dataset,
+            settings.bq_table,
+            sum(r.rows for r in reports),
+            sum(r.bytes for r in reports),
+            len(reports),
+        )
+        return reports
+
+
+def _flatten_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Flatten column headers in case of MultiIndex; BigQuery needs plain string names."""
+    columns = [col[0] if isinstance(col, tuple) else str(col) for col in df.columns]
+    if columns == list(df.columns):
+        return df
+    df = df.copy()
+    df.columns = columns
+    return df
@@ -1,21 +1,35 @@
 import logging
-from typing import Iterable, List
+import re
+import threading
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
 
+import numpy as np
 import pandas as pd
-from opentelemetry import trace
+from opentelemetry import metrics, trace
+
+from src.observability import timed_stage
 
 logger = logging.getLogger(__name__)
 tracer = trace.get_tracer(__name__)
+meter = metrics.get_meter(__name__)
 
 REQUIRED_COLUMNS = ("date", "Close", "Volume")
+PRICE_COLUMNS = ("Open", "High", "Low", "Close")
+# Relative slack for OHLC ordering, so float rounding of equal prices isn't flagged.
+OHLC_TOLERANCE = 1e-6
+
+_violation_counter = meter.create_counter(
+    "trendnest.validation.violations", description="Rows violating a validation rule, by rule and severity"
+)
 
 
-def validate_schema(df: pd.DataFrame) -> List[str]:
+def validate_schema(df: pd.DataFrame) -> list[str]:
     """
     Validate that required columns exist and contain non-empty data.
     Returns a list of error messages (empty if valid).
     """
-    errors: List[str] = []
+    errors: list[str] = []
     with tracer.start_as_current_span("validate_schema"):
         for col in REQUIRED_COLUMNS:
             if col not in df.columns:
@@ -30,3 +44,239 @@ def validate_schema(df: pd.DataFrame) -> List[str]:
         if errors:
             logger.warning("Validation errors: %s", errors)
         return errors
+
+
+class RowContext:
+    """
+    Columns parsed once per validation pass and shared by every rule: numeric arrays
+    (NaN where missing or unparseable), dates as datetime64 and, for the per-ticker
+    rules, whether each row continues the previous row's ticker.
+    """
+
+    def __init__(self, df: pd.DataFrame, interval: str):
+        self.df = df
+        self.size = len(df)
+        self.interval = interval
+        self._numeric: dict[str, np.ndarray] = {}
+        if "date" not in df.columns:
+            self.dates = np.full(self.size, np.datetime64("NaT"), dtype="datetime64[ns]")
+        else:
+            dates = df["date"]
+            if not pd.api.types.is_datetime64_any_dtype(dates):
+                dates = pd.to_datetime(dates, errors="coerce")
+            if getattr(dates.dt, "tz", None) is not None:
+                # Exchange-local wall time; steps across a DST change are off by an hour at most.
+                dates = dates.dt.tz_localize(None)
+            self.dates = dates.to_numpy()
+        if "Ticker" not in df.columns:
+            codes = np.zeros(self.size, dtype=np.intp)
+        elif isinstance(df["Ticker"].dtype, pd.CategoricalDtype):
+            codes = df["Ticker"].cat.codes.to_numpy()
+        else:
+            codes, _ = pd.factorize(df["Ticker"])
+        self.same_ticker = np.zeros(self.size, dtype=bool)
+        self.same_ticker[1:] = codes[1:] == codes[:-1]
+        # Each ticker's rows form one block (true for per-ticker and combined frames).
+        self.tickers_contiguous = self.size - int(self.same_ticker.sum()) == len(np.unique(codes))
+        self._date_step: np.ndarray | None = None
+
+    def has(self, *columns: str) -> bool:
+        return all(c in self.df.columns for c in columns)
+
+    def numeric(self, column: str) -> np.ndarray:
+        if column not in self._numeric:
+            values = self.df[column]
+            if values.dtype.kind not in "fiu":
+                values = pd.to_numeric(values, errors="coerce")
+            self._numeric[column] = values.to_numpy(dtype="float64")
+        return self._numeric[column]
+
+    def date_step(self) -> np.ndarray:
+        """Time since the previous bar of the same ticker (NaT on each ticker's first row)."""
+        if self._date_step is None:
+            step = np.full(self.size, np.timedelta64("NaT"), dtype="timedelta64[ns]")
+            dates = self.dates.astype("datetime64[ns]")
+            step[1:] = dates[1:] - dates[:-1]
+            step[~self.same_ticker] = np.timedelta64("NaT")
+            self._date_step = step
+        return self._date_step
+
+
+@dataclass(frozen=True)
+class Rule:
+    """
+    A row-level check. `check` returns a boolean mask of the rows that violate the rule
+    (or None when its columns are absent). Violations of "error" rules quarantine the
+    row; "warn" rules are only counted and logged.
+    """
+
+    id: str
+    description: str
+    check: Callable[[RowContext], np.ndarray | None]
+    severity: str = "error"
+
+
+def _unparseable_date(ctx: RowContext) -> np.ndarray | None:
+    return np.isnat(ctx.dates) if ctx.has("date") else None
+
+
+def _non_numeric(ctx: RowContext) -> np.ndarray | None:
+    columns = [c for c in (*PRICE_COLUMNS, "Volume") if ctx.has(c)]
+    if not columns:
+        return None
+    return np.logical_or.reduce([np.isnan(ctx.numeric(c)) for c in columns])
+
+
+def _non_positive_price(ctx: RowContext) -> np.ndarray | None:
+    columns = [c for c in PRICE_COLUMNS if ctx.has(c)]
+    if not columns:
+        return None
+    with np.errstate(invalid="ignore"):
+        return np.logical_or.reduce([ctx.numeric(c) <= 0 for c in columns])
+
+
+def _negative_volume(ctx: RowContext) -> np.ndarray | None:
+    if not ctx.has("Volume"):
+        return None
+    with np.errstate(invalid="ignore"):
+        return ctx.numeric("Volume") < 0
+
+
+def _ohlc_inconsistent(ctx: RowContext) -> np.ndarray | None:
+    if not ctx.has(*PRICE_COLUMNS):
+        return None
+    open_, high, low, close = (ctx.numeric(c) for c in PRICE_COLUMNS)
+    slack = np.abs(high) * OHLC_TOLERANCE
+    with np.errstate(invalid="ignore"):
+        return (high + slack < np.maximum(open_, close)) | (low - slack > np.minimum(open_, close)) | (low > high + slack)
+
+
+def _dates_out_of_order(ctx: RowContext) -> np.ndarray | None:
+    if not ctx.has("date"):
+        return None
+    return ctx.date_step() < np.timedelta64(0, "ns")
+
+
+def _duplicate_bar(ctx: RowContext) -> np.ndarray | None:
+    if not ctx.has("date"):
+        return None
+    step = ctx.date_step()
+    if ctx.tickers_contiguous and not (step < np.timedelta64(0, "ns")).any():
+        # Bars in date order per ticker: a duplicate can only repeat the previous row's date.
+        return step == np.timedelta64(0, "ns")
+    keys = ["Ticker", "date"] if ctx.has("Ticker") else ["date"]
+    # The first bar for a (Ticker, date) is kept; later ones are the duplicates.
+    return ctx.df.duplicated(subset=keys, keep="first").to_numpy()
+
+
+def _gap_before(ctx: RowContext) -> np.ndarray | None:
+    if not ctx.has("date"):
+        return None
+    return ctx.date_step() > gap_threshold(ctx.interval)
+
+
+RULES = (
+    Rule("dtype.date", "date is missing or not a valid timestamp", _unparseable_date),
+    Rule("dtype.numeric", "a price or Volume is missing or not numeric", _non_numeric),
+    Rule("range.price", "a price is zero or negative", _non_positive_price),
+    Rule("range.volume", "Volume is negative", _negative_volume),
+    Rule("ohlc.consistency", "High/Low do not bound Open and Close", _ohlc_inconsistent),
+    Rule("dates.monotonic", "date is earlier than the previous bar of the ticker", _dates_out_of_order),
+    Rule("dates.duplicate", "another bar has the same (Ticker, date)", _duplicate_bar),
+    Rule("dates.gap", "unusually long gap since the previous bar of the ticker", _gap_before, severity="warn"),
+)
+
+
+def gap_threshold(interval: str) -> np.timedelta64:
+    """
+    Longest expected step between consecutive bars: three intervals, but never less than
+    five days, so weekends and holiday weekends aren't gaps (e.g. 1d -> 5 days, 1mo -> 93 days).
+    """
+    match = re.fullmatch(r"(\d+)(m|h|d|wk|mo)", (interval or "1d").strip())
+    if not match:
+        return np.timedelta64(5, "D")
+    count, unit = int(match.group(1)), match.group(2)
+    days = {"m": 1 / 1440, "h": 1 / 24, "d": 1, "wk": 7, "mo": 31}[unit] * count
+    return np.timedelta64(int(max(3 * days, 5) * 86400), "s")
+
+
+@dataclass
+class ValidationResult:
+    valid: pd.DataFrame
+    # Offending rows with a `rule_ids` column listing the violated "error" rules (";"-separated).
+    quarantined: pd.DataFrame
+    # Rows flagged per rule, "warn" rules included.
+    violations: dict[str, int] = field(default_factory=dict)
+
+
+@timed_stage("validate")
+def validate_rows(df: pd.DataFrame, interval: str = "1d", rules: Iterable[Rule] = RULES) -> ValidationResult:
+    """
+    Evaluate every rule as a vectorized mask over df (one ticker or the combined
+    multi-ticker frame, bars ordered by date within each ticker) and split it into valid
+    and quarantined rows. Work is linear in the row count; columns are parsed once.
+    """
+    rules = list(rules)
+    with tracer.start_as_current_span("validate_rows", attributes={"rows": len(df), "rules": len(rules)}) as span:
+        ctx = RowContext(df, interval)
+        masks = {}
+        for rule in rules:
+            mask = rule.check(ctx)
+            if mask is not None:
+                masks[rule] = np.asarray(mask, dtype=bool)
+
+        violations = {rule.id: int(mask.sum()) for rule, mask in masks.items() if mask.any()}
+        errors = [(rule, mask) for rule, mask in masks.items() if rule.severity == "error"]
+        bad = np.logical_or.reduce([mask for _, mask in errors]) if errors else np.zeros(len(df), dtype=bool)
+
+        rule_ids = np.full(int(bad.sum()), "", dtype=object)
+        for rule, mask in errors:
+            hit = mask[bad]
+            rule_ids[hit] = rule_ids[hit] + (";" + rule.id)
+        if bad.any():
+            quarantined = df[bad].assign(rule_ids=[ids[1:] for ids in rule_ids])
+            valid = df[~bad]
+        else:
+            quarantined = pd.DataFrame(columns=[*df.columns, "rule_ids"])
+            valid = df
+
+        for rule, mask in masks.items():
+            if rule.id in violations:
+                _violation_counter.add(violations[rule.id], attributes={"rule": rule.id, "severity": rule.severity})
+        span.set_attribute("quarantined", len(quarantined))
+        return ValidationResult(valid=valid, quarantined=quarantined, violations=violations)
+
+
+class Quarantine:
+    """Rows rejected by validate_rows across tickers (thread-safe), for the dead-letter output."""
+
+    def __init__(self):
+        self._frames: list[pd.DataFrame] = []
+        self._lock = threading.Lock()
+
+    def add(self, rows: pd.DataFrame) -> None:
+        if rows.empty:
+            return
+        with self._lock:
+            self._frames.append(rows)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(frame) for frame in self._frames)
+
+    def rows(self) -> pd.DataFrame:
+        """The quarantined bars with their rule_ids, as one frame (Ticker as plain strings)."""
+        with self._lock:
+            frames = list(self._frames)
+        if not frames:
+            return pd.DataFrame(columns=["Ticker", "date", "rule_ids"])
+        return pd.concat([frame.astype({"Ticker": str}) if "Ticker" in frame else frame for frame in frames])
+
+    def to_frame(self, run_id: str | None = None) -> pd.DataFrame:
+        """One dead-letter row per quarantined bar: Ticker, date, rule_ids, error, run_id, then the bar's values."""
+        rows = self.rows()
+        if rows.empty:
+            return pd.DataFrame(columns=["Ticker", "date", "rule_ids", "error", "run_id"])
+        rows = rows.assign(error="row failed validation", run_id=run_id).reset_index(drop=True)
+        leading = [c for c in ("Ticker", "date", "rule_ids", "error", "run_id") if c in rows.columns]
+        return rows[leading + [c for c in rows.columns if c not in leading]]
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def bars(
+    ticker="AAPL",
+    periods=None,
+    start="2024-01-01",
+    freq="D",
+    dates=None,
+    close=None,
+    volume=1_000,
+    ohlc=False,
+    spread=1.0,
+    tz=None,
+):
+    """
+    One ticker's bars in the pipeline's long layout: date, [Open, High, Low,] Close,
+    Volume, Ticker. `close` and `volume` take a scalar or one value per bar; without
+    `dates`, bars run from `start` at `freq` (as many as `close` has, else `periods`,
+    else 5). Close defaults to 100, 101, ...; with ohlc, Open equals Close and High/Low
+    sit `spread` above/below it. ticker=None leaves out the Ticker column, like a raw
+    yfinance frame.
+    """
+    if dates is not None:
+        index = pd.to_datetime(dates)
+    else:
+        if periods is None:
+            periods = 5 if close is None or np.ndim(close) == 0 else len(close)
+        index = pd.date_range(start, periods=periods, freq=freq, tz=tz)
+    n = len(index)
+    close = 100.0 + np.arange(n) if close is None else np.array(np.broadcast_to(np.asarray(close, dtype="float64"), n))
+
+    columns = {"date": index}
+    if ohlc:
+        columns.update({"Open": close, "High": close + spread, "Low": close - spread})
+    columns.update({"Close": close, "Volume": np.array(np.broadcast_to(volume, n))})
+    if ticker is not None:
+        columns["Ticker"] = ticker
+    return pd.DataFrame(columns)
+
+
+@pytest.fixture
+def make_bars():
+    """Factory for single-ticker bar frames; see bars()."""
+    return bars
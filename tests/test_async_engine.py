@@ -0,0 +1,44 @@
+from opentelemetry.metrics import NoOpMeter
+
+from src import async_engine
+from src.config import Settings
+from src.extract_stocks import FetchError
+from src.pipeline import PipelineMetrics
+from src.summarize import StubModel, SummaryService
+
+
+def test_async_engine_retries_streams_results_and_collects_failures(monkeypatch, make_bars):
+    attempts = {}
+
+    def fake_fetch(symbol, settings, period, interval, prefetched=None, cache=None, max_retries=None, run_id=None):
+        attempts[symbol] = attempts.get(symbol, 0) + 1
+        if symbol == "FLAKY" and attempts[symbol] == 1:
+            raise FetchError("transient")
+        if symbol == "BAD":
+            raise FetchError("always fails")
+        return make_bars(symbol, periods=2), 1, 0.01
+
+    monkeypatch.setattr(async_engine, "fetch_ticker", fake_fetch)
+    monkeypatch.setattr(async_engine, "backoff_delay", lambda base, attempt: 0.0)
+
+    sunk = []
+    model = StubModel()
+    summarizer = SummaryService(model, batch_size=8)
+    settings = Settings(fetch_retries=2, async_fetch_concurrency=2)
+    frames, failed = async_engine.run_async_engine(
+        ["AAPL", "FLAKY", "BAD"],
+        settings,
+        "1mo",
+        "1d",
+        "run-1",
+        PipelineMetrics.create(NoOpMeter("test")),
+        sink=sunk.append,
+        summarizer=summarizer,
+    )
+
+    assert sorted(df["Ticker"].iloc[0] for df in frames) == ["AAPL", "FLAKY"]
+    assert attempts == {"AAPL": 1, "FLAKY": 2, "BAD": 2}
+    assert [row["Ticker"] for row in failed] == ["BAD"]
+    assert len(sunk) == 1 and len(sunk[0]) == 4
+    # Both successful tickers were summarized in one batched request.
+    assert model.calls == 1
@@ -0,0 +1,32 @@
+from pathlib import Path
+
+import pytest
+
+from src.atomic import atomic_write
+
+
+def _writer(text):
+    return lambda tmp: Path(tmp).write_text(text)
+
+
+def test_atomic_write_replaces_the_file(tmp_path):
+    path = tmp_path / "nested" / "state.json"
+    atomic_write(str(path), _writer("old"))
+    atomic_write(str(path), _writer("new"))
+
+    assert path.read_text() == "new"
+    assert [p.name for p in path.parent.iterdir()] == ["state.json"]
+
+
+def test_failed_write_keeps_the_old_file_and_removes_the_temp_file(tmp_path):
+    path = tmp_path / "state.json"
+    path.write_text("old")
+
+    def fail(tmp):
+        Path(tmp).write_text("partial")
+        raise OSError("disk full")
+
+    with pytest.raises(OSError, match="disk full"):
+        atomic_write(str(path), fail)
+    assert path.read_text() == "old"
+    assert [p.name for p in tmp_path.iterdir()] == ["state.json"]
@@ -0,0 +1,53 @@
+import pytest
+
+from benchmarks.fakes import FakeMarketData, FakeProviderError, FlakyStubModel
+from benchmarks.pipeline import compare
+from src.extract_stocks import _split_batch_frame
+
+
+def test_fake_market_data_is_deterministic_and_shaped_like_yfinance():
+    market = FakeMarketData(bars=30, seed=7)
+    single = market.download("AAPL", period="6mo")
+    batch = market.download(["AAPL", "MSFT"], period="6mo", group_by="ticker")
+
+    assert single.index.name == "Date" and len(single) == 30
+    assert single.columns.get_level_values(1).unique().tolist() == ["AAPL"]
+    bars = single.xs("AAPL", axis=1, level=1)
+    assert (bars["High"] >= bars[["Open", "Close"]].max(axis=1)).all()
+    assert set(_split_batch_frame(batch, ["AAPL", "MSFT"])) == {"AAPL", "MSFT"}
+    assert single["Close"]["AAPL"].equals(FakeMarketData(bars=30, seed=7).download("AAPL")["Close"]["AAPL"])
+    assert market.rows_served == 90
+
+
+def test_failures_repeat_for_the_same_seed():
+    def outcomes(seed):
+        llm = FlakyStubModel(error_rate=0.5, seed=seed)
+        results = []
+        for _ in range(20):
+            try:
+                llm.generate_content("Ticker: AAPL")
+                results.append(True)
+            except FakeProviderError:
+                results.append(False)
+        return results
+
+    assert outcomes(1) == outcomes(1)
+    assert 0 < sum(outcomes(1)) < 20
+
+
+def _report(tickers_per_second, peak_rss_mb, p99_ms):
+    stages = {"process_ticker": {"count": 10, "p50_ms": p99_ms / 2, "p99_ms": p99_ms, "total_s": 1.0}}
+    return {"results": [{"tickers": 100, "tickers_per_second": tickers_per_second, "peak_rss_mb": peak_rss_mb, "stages": stages}]}
+
+
+@pytest.mark.parametrize(
+    "current, regressed",
+    [
+        (_report(95, 210, 55), False),
+        (_report(70, 200, 50), True),
+        (_report(100, 300, 50), True),
+        (_report(100, 200, 80), True),
+    ],
+)
+def test_compare_flags_regressions_beyond_tolerance(current, regressed):
+    assert bool(compare(current, _report(100, 200, 50), tolerance=0.2)) == regressed
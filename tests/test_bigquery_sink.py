@@ -0,0 +1,144 @@
+import io
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from src.upload import (
+    MERGE_KEYS,
+    BigQuerySink,
+    BigQueryWriter,
+    LocalWriter,
+    UploadError,
+    build_merge_sql,
+)
+
+
+def test_append_writes_in_chunks_and_reports_rows_and_bytes(tmp_path, make_bars):
+    writer = LocalWriter(str(tmp_path))
+    reports = BigQuerySink(writer, "prices", chunk_rows=2).write(make_bars(close=[1.0, 2.0, 3.0]))
+
+    assert [r.rows for r in reports] == [2, 1]
+    assert all(r.bytes > 0 for r in reports)
+    assert len(writer.read("prices")) == 3
+
+
+def test_merge_is_idempotent_on_ticker_date_interval(tmp_path, make_bars):
+    writer = LocalWriter(str(tmp_path))
+    sink = BigQuerySink(writer, "prices", chunk_rows=2, mode="merge", interval="1d")
+    sink.write(make_bars(close=[1.0, 2.0, 3.0]))
+    sink.write(make_bars(close=[1.0, 2.5, 3.0]))
+
+    stored = writer.read("prices").sort_values("date")
+    assert len(stored) == 3
+    assert stored["Close"].tolist() == [1.0, 2.5, 3.0]
+    assert set(stored["interval"]) == {"1d"}
+
+
+def test_append_and_merge_write_the_same_columns(tmp_path, make_bars):
+    writer = LocalWriter(str(tmp_path))
+    BigQuerySink(writer, "prices", interval="1d").write(make_bars(close=[1.0, 2.0]))
+    BigQuerySink(writer, "prices", mode="merge", interval="1d").write(make_bars(close=[1.0, 2.5]))
+
+    stored = writer.read("prices")
+    assert "interval" in stored.columns and stored["interval"].notna().all()
+    assert stored.sort_values("date")["Close"].tolist() == [1.0, 2.5]
+
+
+def test_bigquery_merge_stages_one_row_per_key(make_bars):
+    loaded = []
+
+    class FakeClient:
+        def get_table(self, table_id):
+            return SimpleNamespace(schema=[SimpleNamespace(name=c) for c in ("Ticker", "date", "interval", "Close")])
+
+        def query(self, sql):
+            return self
+
+        def result(self):
+            return None
+
+        def delete_table(self, table_id, not_found_ok=False):
+            pass
+
+    class RecordingWriter(BigQueryWriter):
+        client = FakeClient()
+
+        def _load(self, payload, table_id, truncate=False):
+            loaded.append(pd.read_parquet(io.BytesIO(payload)))
+
+    refetched = pd.concat([make_bars(close=[1.0, 2.0]), make_bars(close=[1.5])], ignore_index=True)
+    refetched = refetched.assign(interval="1d")
+    RecordingWriter("p", "d", "").merge(refetched, "prices", MERGE_KEYS)
+
+    staged = loaded[0].sort_values("date")
+    assert len(staged) == 2
+    # The re-fetched bar wins.
+    assert staged["Close"].tolist() == [1.5, 2.0]
+
+
+def test_bigquery_loads_add_the_interval_column_to_existing_tables(make_bars):
+    from google.cloud import bigquery
+
+    class FakeClient:
+        def __init__(self):
+            self.jobs, self.queries = [], []
+
+        def load_table_from_file(self, file, table_id, job_config):
+            self.jobs.append((table_id, job_config))
+            return SimpleNamespace(result=lambda: None)
+
+        def get_table(self, table_id):
+            # Created by the old to_gbq upload: no interval column.
+            return SimpleNamespace(schema=[SimpleNamespace(name=c) for c in ("date", "Close", "Volume", "Ticker")])
+
+        def query(self, sql):
+            self.queries.append(sql)
+            return SimpleNamespace(result=lambda: None)
+
+        def delete_table(self, table_id, not_found_ok=False):
+            pass
+
+    class FakeClientWriter(BigQueryWriter):
+        client = FakeClient()
+
+    writer = FakeClientWriter("p", "d", "")
+    BigQuerySink(writer, "prices", interval="1d").write(make_bars(close=[1.0, 2.0]))
+    table_id, config = writer.client.jobs[0]
+    assert table_id == "p.d.prices"
+    assert config.write_disposition == bigquery.WriteDisposition.WRITE_APPEND
+    assert config.schema_update_options == [bigquery.SchemaUpdateOption.ALLOW_FIELD_ADDITION]
+
+    BigQuerySink(writer, "prices", mode="merge", interval="1d").write(make_bars(close=[1.0, 2.5]))
+    _, staging_config = writer.client.jobs[1]
+    assert staging_config.write_disposition == bigquery.WriteDisposition.WRITE_TRUNCATE
+    assert not staging_config.schema_update_options
+    alter, merge = writer.client.queries
+    assert alter == "ALTER TABLE `p.d.prices` ADD COLUMN IF NOT EXISTS `interval` STRING"
+    assert merge.startswith("MERGE `p.d.prices`")
+
+
+def test_failed_chunk_is_retried_then_reported_without_losing_others(tmp_path, make_bars):
+    class FlakyWriter(LocalWriter):
+        calls = 0
+
+        def append(self, df, table):
+            FlakyWriter.calls += 1
+            if df["Close"].iloc[0] == 1.0:
+                raise RuntimeError("quota exceeded")
+            return super().append(df, table)
+
+    writer = FlakyWriter(str(tmp_path))
+    sink = BigQuerySink(writer, "prices", chunk_rows=1, max_retries=2, backoff=0)
+    with pytest.raises(UploadError, match="chunk 0"):
+        sink.write(make_bars(close=[1.0, 2.0]))
+    # The second chunk still landed.
+    assert writer.read("prices")["Close"].tolist() == [2.0]
+    assert FlakyWriter.calls == 3
+
+
+def test_build_merge_sql():
+    sql = build_merge_sql("p.d.t", "p.d.s", ["Ticker", "date", "interval", "Close"], ["Ticker", "date", "interval"])
+    assert "ON T.`Ticker` = S.`Ticker` AND T.`date` = S.`date` AND T.`interval` = S.`interval`" in sql
+    assert "UPDATE SET `Close` = S.`Close`" in sql
+    assert "INSERT (`Ticker`, `date`, `interval`, `Close`)" in sql
@@ -0,0 +1,61 @@
+import pandas as pd
+import pytest
+
+from run_pipeline import clear_dead_letters, summarize_checkpointed
+from src.checkpoint import RunCheckpoint, parse_stages
+from src.summarize import StubModel, SummaryService
+
+
+def test_parse_stages_orders_and_validates():
+    assert parse_stages(None) == ["fetch", "summarize", "export", "analyze", "store", "upload"]
+    assert parse_stages("upload, Export") == ["export", "upload"]
+    with pytest.raises(ValueError, match="clean"):
+        parse_stages("fetch,clean")
+
+
+def test_checkpoint_round_trip(tmp_path, make_bars):
+    root = str(tmp_path)
+    checkpoint = RunCheckpoint.create(root, "run-1", ["A", "B", "C"], {"period": "1mo"})
+    frame_c = make_bars("C", periods=2)
+    checkpoint.save_frame("C", frame_c)
+    checkpoint.save_frame("A", make_bars("A", periods=2))
+    checkpoint.save_summaries({"A": "up"})
+    checkpoint.save_summaries({"C": "flat"})
+    checkpoint.mark("export", "done")
+    checkpoint.mark("upload", "failed", error="boom")
+
+    resumed = RunCheckpoint.load(root, "run-1")
+    assert resumed.tickers == ["A", "B", "C"]
+    assert resumed.params == {"period": "1mo"}
+    assert resumed.completed() == ["A", "C"]
+    assert resumed.summaries() == {"A": "up", "C": "flat"}
+    assert resumed.is_done("export") and resumed.status("upload") == "failed"
+    pd.testing.assert_frame_equal(resumed.load_frames(["C"])[0], frame_c)
+
+    resumed.reset(["export"])
+    assert RunCheckpoint.load(root, "run-1").status("export") is None
+    with pytest.raises(FileNotFoundError):
+        RunCheckpoint.load(root, "missing")
+
+
+def test_resume_summarizes_only_tickers_without_a_summary(tmp_path, make_bars):
+    checkpoint = RunCheckpoint.create(str(tmp_path), "run-1", ["A", "B"], {})
+    for symbol in ("A", "B"):
+        checkpoint.save_frame(symbol, make_bars(symbol, periods=2))
+    checkpoint.save_summaries({"A": "already summarized"})
+
+    model = StubModel()
+    summarize_checkpointed(SummaryService(model), checkpoint, "run-1")
+    assert checkpoint.summaries() == {"A": "already summarized", "B": "B: stub summary."}
+    assert model.calls == 1
+
+
+def test_clear_dead_letters_keeps_other_runs(tmp_path):
+    path = tmp_path / "failed.csv"
+    pd.DataFrame(
+        [{"Ticker": "A", "error": "x", "run_id": "run-1"}, {"Ticker": "B", "error": "y", "run_id": "run-0"}]
+    ).to_csv(path, index=False)
+    clear_dead_letters(str(path), "run-1")
+    assert pd.read_csv(path)["Ticker"].tolist() == ["B"]
+    clear_dead_letters(str(path), "run-0")
+    assert not path.exists()
@@ -1,3 +1,5 @@
+import pytest
+
 from src.config import Settings
 
 
@@ -9,3 +11,11 @@ def test_log_level_uppercased():
 def test_tickers_universe_parsing():
     settings = Settings(tickers_universe="aapl, msft , nvda")
     assert settings.tickers_universe == ["AAPL", "MSFT", "NVDA"]
+
+
+def test_trace_settings_are_validated():
+    assert Settings(trace_exporter="FILE").trace_exporter == "file"
+    with pytest.raises(ValueError):
+        Settings(trace_exporter="kafka")
+    with pytest.raises(ValueError):
+        Settings(trace_sample_ratio=1.5)
@@ -0,0 +1,29 @@
+import pandas as pd
+
+from src.cpu_pool import CpuPool, from_ipc, to_ipc
+from src.features import extract_features
+from src.pipeline import prepare_ticker
+from src.validation import Quarantine
+
+
+def test_ipc_round_trip_keeps_compact_dtypes_and_index(make_bars):
+    df = prepare_ticker("AAPL", make_bars(periods=40, ohlc=True)).iloc[5:]
+    pd.testing.assert_frame_equal(from_ipc(to_ipc(df)), df)
+
+
+def test_pool_matches_in_process_prepare(make_bars):
+    raw = make_bars(periods=40, ohlc=True)
+    raw.loc[7, "Low"] = raw.loc[7, "High"] + 5
+    local_quarantine, pooled_quarantine = Quarantine(), Quarantine()
+    expected = prepare_ticker("AAPL", raw, quarantine=local_quarantine)
+
+    pool = CpuPool(1)
+    try:
+        df_clean, features = pool.prepare("AAPL", raw, quarantine=pooled_quarantine)
+    finally:
+        pool.close()
+
+    pd.testing.assert_frame_equal(df_clean, expected)
+    assert features == extract_features(expected, "AAPL")
+    pd.testing.assert_frame_equal(pooled_quarantine.to_frame("r"), local_quarantine.to_frame("r"))
+    assert len(pooled_quarantine) == 1
@@ -0,0 +1,87 @@
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+
+from src import dashboard_data
+from src.dashboard_data import DashboardData, downsample, lttb
+from src.export import export_frame
+
+
+def _bars(make_bars, symbols=("AAPL", "MSFT", "NVDA"), periods=48 * 10):
+    rng = np.random.default_rng(0)
+    return pd.concat(
+        [make_bars(s, periods=periods, freq="30min", close=100 + rng.normal(0, 1, periods).cumsum()) for s in symbols],
+        ignore_index=True,
+    )
+
+
+def test_lttb_keeps_endpoints_and_extremes():
+    x = np.arange(1000.0)
+    y = np.sin(x / 50)
+    y[437] = 25.0
+    kept = lttb(x, y, 50)
+    assert len(kept) == 50
+    assert kept[0] == 0 and kept[-1] == 999
+    assert 437 in kept
+    assert np.all(np.diff(kept) > 0)
+    assert lttb(x[:10], y[:10], 50).tolist() == list(range(10))
+
+
+def test_downsample_limits_points_per_ticker(make_bars):
+    df = pd.concat([_bars(make_bars), _bars(make_bars, symbols=("SHORT",), periods=20)], ignore_index=True)
+    out = downsample(df, 100)
+    sizes = out.groupby("Ticker").size()
+    assert sizes.drop("SHORT").eq(100).all()
+    assert sizes["SHORT"] == 20
+    # Rows are kept whole and in date order within each ticker.
+    assert out.groupby("Ticker")["date"].apply(lambda d: d.is_monotonic_increasing).all()
+    merged = out.merge(df, on=["Ticker", "date"], suffixes=("", "_src"))
+    assert (merged["Close"] == merged["Close_src"]).all()
+
+
+def test_queries_push_down_and_are_cached_until_the_export_changes(tmp_path, monkeypatch, make_bars):
+    path = str(tmp_path / "export")
+    export_frame(_bars(make_bars), path, "parquet", partition_by=["Ticker"])
+    reads = []
+    original = dashboard_data.read_export
+    monkeypatch.setattr(dashboard_data, "read_export", lambda *a, **k: reads.append(k) or original(*a, **k))
+
+    data = DashboardData(path)
+    assert data.tickers() == ["AAPL", "MSFT", "NVDA"]
+    frame = data.frame(["MSFT"], start=dt.date(2024, 1, 3), end=dt.date(2024, 1, 4), columns=["date", "Ticker", "Close"])
+    assert set(frame["Ticker"]) == {"MSFT"}
+    assert list(frame.columns) == ["date", "Ticker", "Close"]
+    # A bare end date includes that day's intraday bars.
+    assert frame["date"].min() == pd.Timestamp("2024-01-03") and frame["date"].max() == pd.Timestamp("2024-01-04 23:30")
+    assert reads[-1]["tickers"] == ["MSFT"]
+
+    data.frame(["MSFT"], start=dt.date(2024, 1, 3), end=dt.date(2024, 1, 4), columns=["date", "Ticker", "Close"])
+    chart = data.chart_frame(["AAPL", "NVDA"], points=50, smooth_window=7)
+    data.chart_frame(["AAPL", "NVDA"], points=50, smooth_window=7)
+    assert chart.groupby("Ticker").size().eq(50).all()
+    assert len(reads) == 3
+
+    export_frame(_bars(make_bars, symbols=("AAPL", "TSLA")), path, "parquet", partition_by=["Ticker"])
+    assert data.tickers() == ["AAPL", "TSLA"]
+    assert len(reads) == 4
+
+
+def test_csv_export_is_parsed_once_per_version(tmp_path, make_bars):
+    path = str(tmp_path / "cleaned.csv")
+    export_frame(_bars(make_bars), path, "csv")
+    data = DashboardData(path)
+    assert data.columns() == ["date", "Close", "Volume", "Ticker"]
+    assert data.tickers() == ["AAPL", "MSFT", "NVDA"]
+    first, last = data.date_range(["AAPL"])
+    assert first == pd.Timestamp("2024-01-01")
+    assert last == pd.Timestamp("2024-01-10 23:30")
+    assert len(data.frame(["AAPL", "MSFT"], end=first.date())) == 2 * 48
+    assert data.loads == 1
+
+    # A re-export drops the old version's entries, the parsed CSV included.
+    old_version = data.version()
+    export_frame(_bars(make_bars, symbols=("TSLA",)), path, "csv")
+    assert data.tickers() == ["TSLA"]
+    assert data.loads == 2
+    assert all(key[0] != old_version for key in data._cache)
@@ -0,0 +1,65 @@
+import os
+
+import pandas as pd
+import pytest
+
+from src.export import append_part, detect_format, export_frame, read_export
+
+
+@pytest.fixture
+def frame(make_bars):
+    return pd.concat(
+        [
+            make_bars("AAPL", start="2024-01-30", close=[10.0, 11.0, 12.0], volume=[100, 200, 300]),
+            make_bars("MSFT", start="2024-01-31", close=[20.0, 21.0], volume=[400, 500]),
+        ],
+        ignore_index=True,
+    )
+
+
+@pytest.mark.parametrize("fmt,name", [("csv", "out.csv"), ("csv.gz", "out.csv.gz"), ("parquet", "out.parquet"), ("feather", "out.feather")])
+def test_round_trip_with_pruning(tmp_path, fmt, name, frame):
+    path = str(tmp_path / name)
+    export_frame(frame, path, fmt)
+
+    assert detect_format(path) == fmt
+    df = read_export(path, tickers=["MSFT"], columns=["date", "Close"], start="2024-02-01")
+    assert list(df.columns) == ["date", "Close"]
+    assert df["Close"].tolist() == [21.0]
+    assert pd.api.types.is_datetime64_any_dtype(df["date"])
+    # No staging files are left next to the export.
+    assert os.listdir(tmp_path) == [name]
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "feather", "csv"])
+def test_partitioned_dataset_reads_back_only_requested_partitions(tmp_path, fmt, frame):
+    path = str(tmp_path / "prices")
+    export_frame(frame, path, fmt, partition_by=["Ticker", "month"])
+
+    assert sorted(os.listdir(path)) == ["Ticker=AAPL", "Ticker=MSFT"]
+    assert sorted(os.listdir(os.path.join(path, "Ticker=AAPL"))) == ["month=2024-01", "month=2024-02"]
+
+    df = read_export(path, tickers=["AAPL"])
+    assert sorted(df.columns) == ["Close", "Ticker", "Volume", "date"]
+    assert sorted(df["Close"].tolist()) == [10.0, 11.0, 12.0]
+
+    # Re-exporting replaces the dataset rather than adding to it.
+    export_frame(frame.iloc[:1], path, fmt, partition_by=["Ticker", "month"])
+    assert len(read_export(path)) == 1
+
+
+def test_append_part_accumulates_dataset(tmp_path, frame):
+    path = str(tmp_path / "stream")
+    append_part(frame[frame["Ticker"] == "AAPL"], path, "parquet", ["Ticker"])
+    append_part(frame[frame["Ticker"] == "MSFT"], path, "parquet", ["Ticker"])
+
+    df = read_export(path, columns=["Ticker", "Close"])
+    assert len(df) == 5
+    assert sorted(df["Ticker"].astype(str).unique()) == ["AAPL", "MSFT"]
+
+
+def test_rejects_unknown_format_and_partition_key(tmp_path, frame):
+    with pytest.raises(ValueError):
+        export_frame(frame, str(tmp_path / "out.xlsx"), "xlsx")
+    with pytest.raises(ValueError):
+        export_frame(frame, str(tmp_path / "out"), "parquet", partition_by=["Close"])
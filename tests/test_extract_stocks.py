@@ -0,0 +1,71 @@
+import pandas as pd
+
+from src import extract_stocks
+from src.extract_stocks import fetch_stock_data_batch
+from src.rate_limit import TokenBucket
+
+
+def _multi_ticker_frame(symbols):
+    index = pd.DatetimeIndex(["2024-01-01", "2024-01-02"], name="Date")
+    columns = pd.MultiIndex.from_product([symbols, ["Open", "High", "Low", "Close", "Volume"]], names=["Ticker", "Price"])
+    return pd.DataFrame(1.0, index=index, columns=columns)
+
+
+def test_fetch_stock_data_batch_splits_and_retries_only_missing(monkeypatch):
+    calls = []
+
+    def fake_download(tickers, **kwargs):
+        calls.append(list(tickers))
+        df = _multi_ticker_frame(tickers)
+        if len(calls) == 1:
+            # First attempt: MSFT comes back all-NaN
+            df.loc[:, "MSFT"] = float("nan")
+        return df
+
+    monkeypatch.setattr(extract_stocks.yf, "download", fake_download)
+    monkeypatch.setattr(extract_stocks, "backoff_delay", lambda base, attempt: 0.0)
+
+    frames, attempts = fetch_stock_data_batch(["AAPL", "MSFT"], batch_size=10, return_attempts=True)
+
+    assert calls == [["AAPL", "MSFT"], ["MSFT"]]
+    assert set(frames) == {"AAPL", "MSFT"}
+    assert attempts == {"AAPL": 1, "MSFT": 2}
+    aapl = frames["AAPL"]
+    assert list(aapl.columns) == ["date", "Open", "High", "Low", "Close", "Volume", "Ticker"]
+    assert (aapl["Ticker"] == "AAPL").all()
+    assert len(aapl) == 2
+
+
+def test_fetch_stock_data_batch_chunks_and_omits_failures(monkeypatch):
+    calls = []
+
+    def fake_download(tickers, **kwargs):
+        calls.append(list(tickers))
+        return _multi_ticker_frame([t for t in tickers if t != "BAD"])
+
+    monkeypatch.setattr(extract_stocks.yf, "download", fake_download)
+    monkeypatch.setattr(extract_stocks, "backoff_delay", lambda base, attempt: 0.0)
+
+    frames = fetch_stock_data_batch(["A", "B", "C", "BAD"], batch_size=2, max_retries=2)
+
+    assert calls == [["A", "B"], ["C", "BAD"], ["BAD"]]
+    assert set(frames) == {"A", "B", "C"}
+
+
+def test_batch_retry_waits_on_a_timer_while_the_next_batch_downloads(monkeypatch):
+    calls = []
+
+    def fake_download(tickers, **kwargs):
+        calls.append(list(tickers))
+        # A is empty on its first attempt only.
+        return _multi_ticker_frame([t for t in tickers if t != "A" or calls.count(["A"]) > 1])
+
+    monkeypatch.setattr(extract_stocks.yf, "download", fake_download)
+    monkeypatch.setattr(extract_stocks, "backoff_delay", lambda base, attempt: 0.2)
+
+    limiter = TokenBucket(1000, burst=10)
+    results = list(extract_stocks.iter_stock_data_batches(["A", "B"], batch_size=1, max_retries=2, limiter=limiter))
+
+    # B was downloaded during A's backoff rather than after it.
+    assert calls == [["A"], ["B"], ["A"]]
+    assert [(symbol, attempt) for symbol, _, attempt in results] == [("B", 1), ("A", 2)]
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.features import build_prompt, extract_features
+
+
+def test_features_match_hand_computed_values():
+    df = pd.DataFrame(
+        {
+            "date": pd.bdate_range("2024-01-01", periods=6),
+            "Close": [100.0, 110.0, 99.0, 105.0, 120.0, 114.0],
+            "Volume": [10.0, 10.0, 12.0, 8.0, 10.0, 30.0],
+        }
+    )
+    features = extract_features(df.sample(frac=1, random_state=0), "XYZ")
+
+    assert features["ticker"] == "XYZ"
+    assert features["bars"] == 6
+    assert features["end"] == "2024-01-08"
+    assert features["returns"]["1d"] == pytest.approx(114 / 120 - 1)
+    assert features["returns"]["5d"] == pytest.approx(0.14)
+    assert features["returns"]["21d"] is None
+    assert features["max_drawdown"] == pytest.approx(99 / 110 - 1)
+    assert features["volume_zscore"] == pytest.approx((30 - 10) / np.std([10, 10, 12, 8, 10], ddof=1))
+    assert features["price_path"][0] == 100.0 and features["price_path"][-1] == 114.0
+
+
+def test_prompt_size_is_bounded_by_features_not_history(make_bars):
+    short = build_prompt(extract_features(make_bars(periods=60, freq="B")))
+    long = build_prompt(extract_features(make_bars(periods=5_000, freq="B")))
+    assert "AAPL" in long
+    assert len(long) < 1_000
+    assert abs(len(long) - len(short)) < 100
+
+
+def test_empty_history_gives_a_prompt(make_bars):
+    features = extract_features(make_bars(periods=3, freq="B").iloc[0:0], "AAPL")
+    assert features["bars"] == 0
+    assert "AAPL" in build_prompt(features)
@@ -0,0 +1,61 @@
+import pandas as pd
+
+from src import extract_stocks, http_session
+from src.config import Settings
+from src.http_session import (
+    MarketDataSession,
+    ResponseCache,
+    pool_size_for,
+    request_key,
+)
+from src.rate_limit import TokenBucket
+
+
+def test_response_cache_expires_and_returns_copies(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(http_session.time, "monotonic", lambda: now[0])
+    cache = ResponseCache(ttl_seconds=60)
+    cache.put("k", pd.DataFrame({"Close": [1.0, 2.0]}))
+
+    first = cache.get("k")
+    first.columns = ["Renamed"]
+    assert list(cache.get("k").columns) == ["Close"]
+
+    now[0] += 61
+    assert cache.get("k") is None
+
+
+def test_request_key_ignores_transport_options():
+    assert request_key("AAPL", {"period": "6mo", "timeout": 5}) == request_key("AAPL", {"timeout": 30, "period": "6mo"})
+    assert request_key(["AAPL", "MSFT"], {"period": "6mo"}) != request_key(["AAPL", "MSFT"], {"period": "1y"})
+
+
+def test_connect_timeout_is_read_from_the_environment(monkeypatch):
+    monkeypatch.setenv("FETCH_CONNECT_TIMEOUT_SECONDS", "2.5")
+    assert http_session._build(Settings()).connect_timeout == 2.5
+
+
+def test_pool_size_follows_fetch_concurrency():
+    assert pool_size_for(Settings(http_pool_size=3)) == 3
+    assert pool_size_for(Settings(fetch_max_concurrency=6)) == 6
+    assert pool_size_for(Settings(fetch_max_concurrency=0, max_workers=12, async_fetch_concurrency=4)) == 12
+
+
+def test_download_shares_the_session_and_reuses_identical_requests(monkeypatch):
+    market_data = MarketDataSession(connect_timeout=2, cache_ttl_seconds=60)
+    monkeypatch.setattr(http_session, "_session", market_data)
+    calls = []
+
+    def fake_download(tickers, **kwargs):
+        calls.append(kwargs)
+        return pd.DataFrame({"Close": [1.0]}, index=pd.DatetimeIndex(["2024-01-02"], name="Date"))
+
+    monkeypatch.setattr(extract_stocks.yf, "download", fake_download)
+    limiter = TokenBucket(rate=1000, burst=10)
+    extract_stocks._download(limiter, "AAPL", period="6mo", timeout=15)
+    extract_stocks._download(limiter, "AAPL", period="6mo", timeout=15)
+    extract_stocks._download(limiter, "AAPL", reuse=False, period="6mo", timeout=15)
+
+    assert len(calls) == 2
+    assert all(call["session"] is market_data.session for call in calls)
+    assert calls[0]["timeout"] == (2, 15)
@@ -0,0 +1,86 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.local_store import LocalStore
+from src.queries import latest_prices, monthly_averages, volume_spikes
+
+
+def test_write_upserts_on_ticker_interval_date(tmp_path, make_bars):
+    store = LocalStore(str(tmp_path / "store.sqlite"))
+    bars = make_bars("AAPL", periods=5, ohlc=True)
+    assert store.write(bars) == 5
+    store.write(bars.assign(Close=bars["Close"] + 10))
+    store.write(bars, interval="1h")
+    assert len(store) == 10
+
+    reopened = LocalStore(store.path)
+    rows = reopened.query("SELECT date, Close, Volume FROM prices WHERE interval = ? ORDER BY date", ["1d"])
+    assert rows["Close"].tolist() == [110.0, 111.0, 112.0, 113.0, 114.0]
+    assert rows["Volume"].dtype == "int64"
+    assert rows["date"].iloc[0] == pd.Timestamp("2024-01-01")
+    assert reopened.tickers() == ["AAPL"]
+
+
+def test_read_only_store_never_creates_or_writes(tmp_path, make_bars):
+    missing = tmp_path / "missing.sqlite"
+    with pytest.raises(sqlite3.OperationalError):
+        LocalStore(str(missing), read_only=True)
+    assert not missing.exists()
+
+    path = str(tmp_path / "store.sqlite")
+    LocalStore(path).write(make_bars("AAPL", periods=3, ohlc=True))
+    reader = LocalStore(path, read_only=True)
+    assert reader.tickers() == ["AAPL"]
+    with pytest.raises(sqlite3.OperationalError):
+        reader.write(make_bars("MSFT", periods=1, ohlc=True))
+
+
+def test_tz_aware_dates_are_stored_as_local_wall_time(make_bars):
+    store = LocalStore(":memory:")
+    store.write(make_bars("AAPL", start="2024-01-02", periods=1, tz="America/New_York"))
+    assert store.query("SELECT date FROM prices")["date"].iloc[0] == pd.Timestamp("2024-01-02")
+
+
+def test_latest_prices_is_per_ticker(make_bars):
+    store = LocalStore(":memory:")
+    store.write(pd.concat([make_bars("AAPL", periods=10), make_bars("MSFT", close=np.arange(200.0, 208.0))]))
+
+    latest = latest_prices(store)
+    assert latest["Ticker"].tolist() == ["AAPL", "MSFT"]
+    assert latest["date"].tolist() == [pd.Timestamp("2024-01-10"), pd.Timestamp("2024-01-08")]
+    assert latest["latest_close"].tolist() == [109.0, 207.0]
+    assert latest_prices(store, tickers=["MSFT"])["Ticker"].tolist() == ["MSFT"]
+    assert latest_prices(store, interval="1h").empty
+
+
+def test_monthly_averages_with_date_range(make_bars):
+    store = LocalStore(":memory:")
+    store.write(pd.concat([make_bars("AAPL", start="2024-01-30", periods=4), make_bars("MSFT", start="2024-01-30", close=500.0, periods=4)]))
+
+    report = monthly_averages(store, "AAPL")
+    assert report["month"].tolist() == ["2024-01", "2024-02"]
+    assert report["avg_close"].tolist() == [100.5, 102.5]
+    assert report["avg_volume"].tolist() == [1_000, 1_000]
+
+    # A bare end date includes that day.
+    assert monthly_averages(store, "AAPL", start="2024-01-31", end="2024-02-01")["avg_close"].tolist() == [
+        101.0,
+        102.0,
+    ]
+
+
+def test_volume_spikes_filters_and_orders_by_volume(make_bars):
+    store = LocalStore(":memory:")
+    bars = make_bars("TSLA", periods=4)
+    bars["Volume"] = [50_000_000, 150_000_000, 300_000_000, 120_000_000]
+    store.write(pd.concat([bars, make_bars("AAPL", periods=4, volume=200_000_000)]))
+
+    spikes = volume_spikes(store, tickers=["TSLA"])
+    assert spikes["volume"].tolist() == [300_000_000, 150_000_000, 120_000_000]
+    assert spikes.columns.tolist() == ["date", "Ticker", "volume"]
+    assert len(volume_spikes(store)) == 7
+    assert len(volume_spikes(store, limit=2)) == 2
+    assert volume_spikes(store, tickers=["TSLA"], end="2024-01-02")["volume"].tolist() == [150_000_000]
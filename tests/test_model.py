@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.model import (
+    IndicatorStore,
+    analyze_trends,
+    build_state,
+    compute_indicators,
+    correlation_matrix,
+    incremental_indicators,
+    latest_indicators,
+    to_wide,
+    update_state,
+)
+
+
+def _long_frame(make_bars, n_tickers=4, n_bars=120, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2023-01-02", periods=n_bars)
+    frames = []
+    for i in range(n_tickers):
+        close = 100 * np.exp(np.cumsum(rng.normal(0.001 * (i - 1), 0.02, n_bars)))
+        frames.append(make_bars(f"T{i}", dates=dates, close=close))
+    df = pd.concat(frames, ignore_index=True)
+    # Ragged history: T3 starts late and has a missing session.
+    return df.drop(df[(df["Ticker"] == "T3") & ((df["date"] < dates[30]) | (df["date"] == dates[60]))].index)
+
+
+def test_indicators_match_per_ticker_pandas(make_bars):
+    df = _long_frame(make_bars)
+    close = to_wide(df)
+    indicators = compute_indicators(close)
+
+    for symbol in close.columns:
+        series = close[symbol]
+        pd.testing.assert_series_equal(
+            indicators["sma_20"][symbol], series.rolling(20, min_periods=20).mean(), check_names=False
+        )
+        expected_vol = np.log(series / series.shift(1)).rolling(21, min_periods=21).std() * np.sqrt(252)
+        pd.testing.assert_series_equal(
+            indicators["volatility_21d"][symbol], expected_vol, check_names=False, rtol=1e-6
+        )
+        pd.testing.assert_series_equal(
+            indicators["drawdown"][symbol], series / series.cummax() - 1, check_names=False
+        )
+
+
+def test_rsi_bounds_and_extremes():
+    dates = pd.bdate_range("2024-01-01", periods=40)
+    close = pd.DataFrame({"UP": np.arange(40.0) + 1, "DOWN": 100 - np.arange(40.0), "MIX": 50 + np.sin(np.arange(40))})
+    close.index = dates
+    rsi = compute_indicators(close)["rsi_14"].iloc[-1]
+    assert rsi["UP"] == 100.0
+    assert rsi["DOWN"] == pytest.approx(0.0)
+    assert 0 < rsi["MIX"] < 100
+
+
+def test_correlation_matches_pandas_without_gaps(make_bars):
+    close = to_wide(_long_frame(make_bars)).drop(columns="T3")
+    expected = close.pct_change(fill_method=None).corr()
+    np.testing.assert_allclose(correlation_matrix(close).to_numpy(), expected.to_numpy(), atol=1e-10)
+
+
+def test_analyze_trends_labels_every_ticker(make_bars):
+    dates = pd.bdate_range("2024-01-01", periods=80)
+    df = pd.concat(
+        [
+            make_bars("UP", dates=dates, close=np.linspace(10, 50, 80)),
+            make_bars("DOWN", dates=dates, close=np.linspace(50, 10, 80)),
+            make_bars("SHORT", dates=dates, close=np.linspace(10, 12, 80)).tail(10),
+        ]
+    )
+    result = analyze_trends(df)
+    assert result.loc["UP", "trend"] == "uptrend"
+    assert result.loc["DOWN", "trend"] == "downtrend"
+    assert result.loc["SHORT", "trend"] == "sideways"  # not enough bars for the moving averages
+    assert result.loc["DOWN", "max_drawdown"] == pytest.approx(10 / 50 - 1)
+    assert result.loc["UP", "last_close"] == pytest.approx(50)
+    assert result.loc["SHORT", "last_date"] == dates[-1]
+
+
+def _single_ticker_frames(make_bars, n_tickers=3, n_bars=150):
+    # Each ticker on its own gapless calendar, so per-ticker state and the matrix path see the same bars.
+    df = _long_frame(make_bars, n_tickers=n_tickers, n_bars=n_bars)
+    return df[df["Ticker"] != "T3"]
+
+
+def test_incremental_state_matches_full_recompute(tmp_path, make_bars):
+    df = _single_ticker_frames(make_bars)
+    dates = sorted(df["date"].unique())
+    store = IndicatorStore(str(tmp_path))
+
+    # Seed with the first 60 bars, then feed the rest a few bars at a time.
+    incremental_indicators(df[df["date"] <= dates[59]], store)
+    for end in (61, 62, 80, 149):
+        result = incremental_indicators(df[df["date"] <= dates[end]], store)
+
+    batch = latest_indicators(to_wide(df))
+    pd.testing.assert_frame_equal(result, batch, check_exact=False, rtol=1e-8, check_freq=False)
+
+    full = incremental_indicators(df, IndicatorStore(str(tmp_path / "fresh")), full_recompute=True)
+    pd.testing.assert_frame_equal(full, batch, check_exact=False, rtol=1e-8, check_freq=False)
+
+
+def test_advance_state_only_touches_new_bars(tmp_path, make_bars):
+    series = to_wide(_single_ticker_frames(make_bars, n_tickers=1))["T0"]
+    seeded = build_state(series.iloc[:100])
+    state, reused = update_state(seeded, series)
+    assert reused
+    assert state.bars == len(series)
+    expected = build_state(series)
+    for field in ("sum_short", "sum_long", "sum_lr", "sum_lr_sq", "avg_gain", "avg_loss", "running_max", "max_drawdown"):
+        assert getattr(state, field) == pytest.approx(getattr(expected, field), rel=1e-9, abs=1e-12)
+    assert state.closes == pytest.approx(expected.closes)
+
+
+def test_revised_history_triggers_rebuild(tmp_path, make_bars):
+    store = IndicatorStore(str(tmp_path))
+    df = _single_ticker_frames(make_bars, n_tickers=1)
+    incremental_indicators(df, store)
+    revised = df.assign(Close=df["Close"] * 1.01)
+    state, reused = update_state(store.load("T0", "1d"), revised.set_index("date")["Close"])
+    assert not reused
+    assert state.closes[-1] == pytest.approx(revised["Close"].iloc[-1])
+
+
+def test_analyze_trends_with_store_matches_batch(tmp_path, make_bars):
+    df = _single_ticker_frames(make_bars)
+    with_state = analyze_trends(df, store=IndicatorStore(str(tmp_path)))
+    pd.testing.assert_frame_equal(with_state, analyze_trends(df), check_exact=False, rtol=1e-8, check_freq=False)
@@ -0,0 +1,116 @@
+import os
+import re
+
+import pytest
+
+from src import observability
+from src.observability import (
+    AttributeGuard,
+    JsonLinesSpanExporter,
+    metrics_text,
+    record_output,
+    setup_metrics,
+    timed_stage,
+)
+from src.rate_limit import TokenBucket
+
+
+@pytest.fixture(scope="module", autouse=True)
+def local_metrics():
+    # No OTLP endpoint: metrics stay in memory for the text output.
+    endpoint = os.environ.pop("OTEL_EXPORTER_OTLP_ENDPOINT", None)
+    setup_metrics()
+    yield
+    if endpoint is not None:
+        os.environ["OTEL_EXPORTER_OTLP_ENDPOINT"] = endpoint
+
+
+def _sample(name, **labels):
+    """Value of one series in the Prometheus text, or 0 if it has not been recorded yet."""
+    for line in metrics_text().splitlines():
+        match = re.match(r"(\w+)(?:\{(.*)\})? (\S+)$", line)
+        if not match or match.group(1) != name:
+            continue
+        found = dict(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', match.group(2) or ""))
+        if found == {k: str(v) for k, v in labels.items()}:
+            return float(match.group(3))
+    return 0.0
+
+
+def test_timed_stage_records_duration_and_status():
+    before_ok = _sample("trendnest_stage_duration_seconds_count", stage="clean", status="ok")
+    before_error = _sample("trendnest_stage_duration_seconds_count", stage="clean", status="error")
+
+    @timed_stage("clean")
+    def work(fail=False):
+        if fail:
+            raise RuntimeError("boom")
+
+    work()
+    with pytest.raises(RuntimeError):
+        work(fail=True)
+
+    assert _sample("trendnest_stage_duration_seconds_count", stage="clean", status="ok") == before_ok + 1
+    assert _sample("trendnest_stage_duration_seconds_count", stage="clean", status="error") == before_error + 1
+    assert _sample("trendnest_stage_duration_seconds_bucket", stage="clean", status="ok", le="+Inf") >= 1
+
+
+def test_unknown_stage_and_sink_are_rejected():
+    with pytest.raises(ValueError):
+        timed_stage("AAPL")
+    with pytest.raises(ValueError):
+        record_output("s3", 10)
+
+
+def test_rate_limiter_wait_is_its_own_metric():
+    before = _sample("trendnest_rate_limiter_wait_seconds_count", limiter="obs-test", kind="token")
+    bucket = TokenBucket(rate=1000, burst=1, max_concurrency=1, name="obs-test")
+    with bucket.limit():
+        pass
+    bucket.acquire()
+
+    assert _sample("trendnest_rate_limiter_wait_seconds_count", limiter="obs-test", kind="token") == before + 2
+    assert _sample("trendnest_rate_limiter_wait_seconds_count", limiter="obs-test", kind="slot") >= 1
+
+
+def test_text_output_has_counters_and_process_gauges(tmp_path):
+    before = _sample("trendnest_output_rows_total", sink="store")
+    record_output("store", 25)
+    text = metrics_text()
+
+    assert "# TYPE trendnest_output_rows_total counter" in text
+    assert "# TYPE trendnest_stage_duration_seconds histogram" in text
+    assert _sample("trendnest_output_rows_total", sink="store") == before + 25
+    assert _sample("trendnest_process_rss_bytes") > 0
+    assert _sample("trendnest_process_cpu_seconds_total", mode="user") > 0
+
+    path = tmp_path / "metrics" / "trendnest.prom"
+    observability.write_metrics_text(str(path))
+    assert "trendnest_output_rows_total" in path.read_text()
+
+
+def test_attribute_guard_caps_distinct_values_per_key():
+    guard = AttributeGuard(max_values=2)
+    seen = [guard({"ticker": t, "environment": "dev"})["ticker"] for t in ("AAPL", "MSFT", "NVDA", "AAPL")]
+
+    assert seen == ["AAPL", "MSFT", "other", "AAPL"]
+    assert guard({"environment": "dev"}) == {"environment": "dev"}
+    assert AttributeGuard(max_values=0)({"ticker": "NVDA"}) == {"ticker": "NVDA"}
+
+
+def test_json_lines_exporter_writes_one_span_per_line(tmp_path):
+    import json
+
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+    path = tmp_path / "traces" / "spans.jsonl"
+    provider = TracerProvider()
+    provider.add_span_processor(BatchSpanProcessor(JsonLinesSpanExporter(str(path))))
+    tracer = provider.get_tracer("test")
+    with tracer.start_as_current_span("process_ticker"), tracer.start_as_current_span("clean_data"):
+        pass
+    provider.shutdown()
+
+    spans = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [span["name"] for span in spans] == ["clean_data", "process_ticker"]
@@ -0,0 +1,57 @@
+import pandas as pd
+
+from src import extract_stocks
+from src.extract_stocks import fetch_stock_data_yf
+from src.price_cache import PriceCache, slice_period
+
+
+def test_merge_deduplicates_on_date_keeping_newest(tmp_path, make_bars):
+    cache = PriceCache(str(tmp_path))
+    cache.merge("AAPL", "1d", make_bars(close=[10.0, 11.0]))
+    merged = cache.merge("AAPL", "1d", make_bars(dates=["2024-01-02", "2024-01-03"], close=[11.5, 12.0]))
+
+    assert merged["date"].dt.strftime("%Y-%m-%d").tolist() == ["2024-01-01", "2024-01-02", "2024-01-03"]
+    assert merged["Close"].tolist() == [10.0, 11.5, 12.0]
+    assert cache.last_timestamp("AAPL", "1d") == pd.Timestamp("2024-01-03")
+
+
+def test_invalidate_from_date_and_whole_file(tmp_path, make_bars):
+    cache = PriceCache(str(tmp_path))
+    cache.merge("AAPL", "1d", make_bars(close=[1.0, 2.0, 3.0]))
+
+    cache.invalidate("AAPL", "1d", start="2024-01-02")
+    assert cache.load("AAPL", "1d")["Close"].tolist() == [1.0]
+
+    cache.invalidate("AAPL", "1d")
+    assert cache.load("AAPL", "1d") is None
+
+
+def test_slice_period_trims_to_window(make_bars):
+    df = make_bars(dates=["2023-01-01", "2023-11-15", "2024-06-01"], close=[1.0, 2.0, 3.0])
+    assert slice_period(df, "6mo")["Close"].tolist() == [3.0]
+    assert len(slice_period(df, "max")) == 3
+
+
+def test_fetch_only_requests_bars_after_cache(tmp_path, monkeypatch, make_bars):
+    cache = PriceCache(str(tmp_path))
+    today = pd.Timestamp.now().normalize()
+    history = pd.date_range(end=today - pd.Timedelta(days=1), periods=200, freq="D")
+    cache.merge("AAPL", "1d", make_bars(dates=history, close=[1.0] * len(history)))
+
+    calls = []
+
+    def fake_download(symbol, **kwargs):
+        calls.append(kwargs)
+        index = pd.DatetimeIndex([today - pd.Timedelta(days=1), today], name="Date")
+        return pd.DataFrame({"Close": [2.0, 3.0], "Volume": [100, 100]}, index=index)
+
+    monkeypatch.setattr(extract_stocks.yf, "download", fake_download)
+
+    df = fetch_stock_data_yf("AAPL", period="1mo", cache=cache)
+
+    assert "period" not in calls[0]
+    assert calls[0]["start"] == (today - pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+    assert df["date"].is_unique
+    assert df["Close"].iloc[-2:].tolist() == [2.0, 3.0]
+    assert df["date"].min() > today - pd.DateOffset(months=1) - pd.Timedelta(days=1)
+    assert len(cache.load("AAPL", "1d")) == 201
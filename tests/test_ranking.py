@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.ranking import lookback_period, score_universe, top_k
+
+
+def _closes():
+    index = pd.date_range("2024-01-01", periods=6, freq="D")
+    return pd.DataFrame(
+        {
+            "UP": [10, 11, 12, 13, 14, 15],
+            "FLAT": [10, 10, 10, 10, 10, 10],
+            "DOWN": [15, 14, 13, 12, 11, 10],
+            "JUMP": [10, 10, 10, 10, 10, 12],
+        },
+        index=index,
+        dtype="float64",
+    )
+
+
+def test_pct_change_matches_last_two_closes():
+    scores = score_universe(_closes(), metric="pct_change")
+    assert scores["JUMP"] == pytest.approx(20.0)
+    assert scores["UP"] == pytest.approx((15 / 14 - 1) * 100)
+    assert top_k(scores, 2) == ["JUMP", "UP"]
+
+
+def test_n_day_return_and_short_history_is_nan():
+    scores = score_universe(_closes(), metric="n_day_return", lookback=5)
+    assert scores["UP"] == pytest.approx(50.0)
+    assert top_k(scores, 1) == ["UP"]
+    assert score_universe(_closes(), metric="n_day_return", lookback=10).isna().all()
+
+
+def test_volume_surge_and_vol_adjusted_return():
+    closes = _closes()
+    volumes = pd.DataFrame(100.0, index=closes.index, columns=closes.columns)
+    volumes.iloc[-1, volumes.columns.get_loc("FLAT")] = 500.0
+    surge = score_universe(closes, metric="volume_surge", lookback=3, volumes=volumes)
+    assert top_k(surge, 1) == ["FLAT"]
+
+    adjusted = score_universe(closes, metric="vol_adjusted_return", lookback=5)
+    # Zero volatility makes the score undefined rather than infinite.
+    assert np.isnan(adjusted["FLAT"])
+    assert adjusted["JUMP"] > 0 > adjusted["DOWN"]
+
+
+def test_top_k_handles_k_larger_than_universe_and_unknown_metric():
+    scores = pd.Series({"A": 1.0, "B": np.nan, "C": 3.0})
+    assert top_k(scores, 10) == ["C", "A"]
+    with pytest.raises(ValueError):
+        score_universe(_closes(), metric="nope")
+
+
+def test_lookback_period():
+    assert lookback_period("pct_change", 5) == "5d"
+    assert lookback_period("n_day_return", 15) == "1mo"
+    assert lookback_period("n_day_return", 120) == "6mo"
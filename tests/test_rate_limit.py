@@ -0,0 +1,60 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.rate_limit import RetryScheduler, TokenBucket
+
+
+def test_token_bucket_allows_burst_then_spaces_requests():
+    bucket = TokenBucket(rate=10, burst=3)
+    delays = [bucket.reserve() for _ in range(5)]
+    assert delays[:3] == [0.0, 0.0, 0.0]
+    # Queued reservations wait one refill interval behind each other.
+    assert delays[3] == pytest.approx(0.1, abs=0.02)
+    assert delays[4] == pytest.approx(0.2, abs=0.02)
+
+
+def test_token_bucket_throttle_and_recovery():
+    bucket = TokenBucket(rate=8, burst=2, min_rate=1)
+    bucket.throttle()
+    assert bucket.rate == 4
+    for _ in range(5):
+        bucket.throttle()
+    assert bucket.rate == 1
+    for _ in range(20):
+        bucket.success()
+    assert bucket.rate == 8
+
+
+def test_token_bucket_caps_concurrency():
+    bucket = TokenBucket(rate=1000, burst=1000, max_concurrency=2)
+    active = []
+    peak = []
+
+    def work():
+        with bucket.limit():
+            active.append(1)
+            peak.append(len(active))
+            time.sleep(0.02)
+            active.pop()
+
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        list(executor.map(lambda _: work(), range(6)))
+    assert max(peak) <= 2
+
+
+def test_retry_scheduler_runs_after_delay_without_holding_worker():
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        scheduler = RetryScheduler(executor)
+        start = time.monotonic()
+        delayed = scheduler.schedule(0.1, lambda: "retried")
+        # The only worker stays free while the retry waits.
+        assert executor.submit(lambda: "immediate").result(timeout=0.05) == "immediate"
+        assert delayed.result(timeout=1) == "retried"
+        assert time.monotonic() - start >= 0.1
+
+        failing = scheduler.schedule(0.0, lambda: 1 / 0)
+        with pytest.raises(ZeroDivisionError):
+            failing.result(timeout=1)
+        scheduler.shutdown()
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+from src.pipeline import prepare_ticker
+from src.schema import bytes_per_row, combine_frames, compact_frame
+
+
+def test_compact_frame_dtypes(make_bars):
+    df = compact_frame(make_bars(None, ohlc=True).assign(date=lambda d: d["date"].dt.strftime("%Y-%m-%d")), "AAPL")
+    assert pd.api.types.is_datetime64_any_dtype(df["date"])
+    assert {str(df[c].dtype) for c in ("Open", "High", "Low", "Close")} == {"float32"}
+    assert df["Volume"].dtype == "int32"
+    assert isinstance(df["Ticker"].dtype, pd.CategoricalDtype)
+    assert df["Ticker"].cat.categories.tolist() == ["AAPL"]
+
+
+def test_prices_stay_float64_when_float32_would_lose_cents(make_bars):
+    df = compact_frame(make_bars(None, close=712_345.67, ohlc=True), "BRK-A")
+    assert df["Close"].dtype == "float64"
+    assert df["Open"].dtype == "float64"
+
+
+def test_volume_needing_int64_or_with_gaps_is_kept_wide(make_bars):
+    assert compact_frame(make_bars(None, volume=5_000_000_000, ohlc=True), "X")["Volume"].dtype == "int64"
+    gappy = make_bars(None, ohlc=True).assign(Volume=lambda d: d["Volume"].astype("float64"))
+    gappy.loc[3, "Volume"] = np.nan
+    assert compact_frame(gappy, "X")["Volume"].dtype == "float64"
+
+
+def test_combine_frames_keeps_a_single_categorical(make_bars):
+    frames = [prepare_ticker(symbol, make_bars(None, periods=n, ohlc=True)) for symbol, n in (("MSFT", 3), ("AAPL", 4), ("NVDA", 2))]
+    combined = combine_frames(frames)
+
+    assert isinstance(combined["Ticker"].dtype, pd.CategoricalDtype)
+    assert combined["Ticker"].tolist() == ["MSFT"] * 3 + ["AAPL"] * 4 + ["NVDA"] * 2
+    assert list(combined.columns) == list(frames[0].columns)
+    assert combined["Close"].dtype == "float32"
+    assert combine_frames(frames[:1]) is frames[0]
+
+
+def test_compact_frames_use_less_memory_per_row(make_bars):
+    raw = {f"T{i}": make_bars(None, periods=500, ohlc=True) for i in range(20)}
+    baseline = pd.concat([prepare_ticker(s, df, compact=False) for s, df in raw.items()], ignore_index=True)
+    compact = combine_frames([prepare_ticker(s, df) for s, df in raw.items()])
+
+    pd.testing.assert_frame_equal(
+        compact.astype({"Close": "float64", "Volume": "int64", "Ticker": "str"})[["date", "Ticker", "Volume"]],
+        baseline[["date", "Ticker", "Volume"]],
+        check_dtype=False,
+    )
+    assert np.allclose(compact["Close"], baseline["Close"], atol=0.005)
+    assert bytes_per_row(compact) < 0.6 * bytes_per_row(baseline)
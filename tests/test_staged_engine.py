@@ -0,0 +1,166 @@
+import threading
+import time
+
+import pandas as pd
+import pytest
+from opentelemetry.metrics import NoOpMeter
+
+from src import staged_engine
+from src.config import Settings
+from src.extract_stocks import FetchError
+from src.pipeline import PipelineMetrics
+from src.staged_engine import Stage, StreamingSink, run_staged_engine
+from src.summarize import StubModel, SummaryService
+
+
+def test_staged_engine_streams_into_sink_and_dead_letters_failures(tmp_path, monkeypatch, make_bars):
+    def fake_fetch(symbol, settings, period, interval, prefetched=None, cache=None, max_retries=None, run_id=None):
+        if symbol == "BAD":
+            raise ValueError("boom")
+        return make_bars(symbol, periods=2), 1, 0.01
+
+    monkeypatch.setattr(staged_engine, "fetch_ticker", fake_fetch)
+
+    uploads = []
+    model = StubModel()
+    export_path = tmp_path / "out.csv"
+    sink = StreamingSink(str(export_path), upload=uploads.append, chunk_rows=4)
+    settings = Settings(staged_queue_size=1)
+    failed, stats = run_staged_engine(
+        ["A", "B", "BAD", "C"],
+        settings,
+        "1mo",
+        "1d",
+        "run-1",
+        PipelineMetrics.create(NoOpMeter("test")),
+        sink,
+        summarizer=SummaryService(model, batch_size=2),
+    )
+
+    exported = pd.read_csv(export_path)
+    assert sorted(exported["Ticker"].unique()) == ["A", "B", "C"]
+    assert len(exported) == 6
+    # One chunk flushed at the 4-row threshold, the remainder on close.
+    assert [len(chunk) for chunk in uploads] == [4, 2]
+    assert [row["Ticker"] for row in failed] == ["BAD"]
+    by_name = {s.name: s for s in stats}
+    assert by_name["extract"].failed == 1
+    assert by_name["sink"].processed == 3
+    # A full batch of two plus the remainder flushed at the end.
+    assert model.calls == 2
+
+
+def test_staged_engine_streams_batch_downloads_into_extract(tmp_path, monkeypatch, make_bars):
+    def fake_batches(tickers, period, interval, batch_size, max_retries, backoff, timeout, cache):
+        assert batch_size == 2
+        for symbol in tickers:
+            yield symbol, (None if symbol == "BAD" else make_bars(symbol, periods=2)), max_retries
+
+    def no_fetch(*args, **kwargs):
+        raise AssertionError("batch-downloaded tickers must not be fetched again")
+
+    monkeypatch.setattr(staged_engine, "iter_stock_data_batches", fake_batches)
+    monkeypatch.setattr("src.pipeline.fetch_stock_data_yf", no_fetch)
+
+    export_path = tmp_path / "out.csv"
+    sink = StreamingSink(str(export_path))
+    failed, stats = run_staged_engine(
+        ["A", "BAD", "B"],
+        Settings(staged_queue_size=1, fetch_retries=2),
+        "1mo",
+        "1d",
+        "run-1",
+        PipelineMetrics.create(NoOpMeter("test")),
+        sink,
+        batch_size=2,
+    )
+
+    assert sorted(pd.read_csv(export_path)["Ticker"].unique()) == ["A", "B"]
+    assert [row["Ticker"] for row in failed] == ["BAD"]
+    assert {s.name: s for s in stats}["sink"].processed == 2
+
+
+def test_staged_engine_retries_failed_fetches_off_the_worker(tmp_path, monkeypatch, make_bars):
+    attempts = {}
+
+    def fake_fetch(symbol, settings, period, interval, prefetched=None, cache=None, max_retries=None, run_id=None):
+        # Each call is a single attempt; the engine owns the retries.
+        assert max_retries == 1
+        attempts[symbol] = attempts.get(symbol, 0) + 1
+        if symbol == "BAD" or (symbol == "FLAKY" and attempts[symbol] == 1):
+            raise FetchError("transient")
+        return make_bars(symbol, periods=2), 1, 0.01
+
+    monkeypatch.setattr(staged_engine, "fetch_ticker", fake_fetch)
+    monkeypatch.setattr(staged_engine, "backoff_delay", lambda base, attempt: 0.0)
+    sink = StreamingSink(str(tmp_path / "out.csv"))
+    settings = Settings(fetch_retries=3, staged_extract_workers=1, staged_queue_size=1)
+    failed, stats = run_staged_engine(
+        ["FLAKY", "BAD", "A"], settings, "1mo", "1d", "run-1", PipelineMetrics.create(NoOpMeter("test")), sink
+    )
+
+    assert attempts == {"FLAKY": 2, "BAD": 3, "A": 1}
+    assert [row["Ticker"] for row in failed] == ["BAD"]
+    assert sorted(pd.read_csv(tmp_path / "out.csv")["Ticker"].unique()) == ["A", "FLAKY"]
+    assert stats[-1].processed == 2
+
+
+def test_staged_engine_without_summarizer_skips_analyze_and_summarize(tmp_path, monkeypatch, make_bars):
+    monkeypatch.setattr(staged_engine, "fetch_ticker", lambda symbol, *args, **kwargs: (make_bars(symbol, periods=2), 1, None))
+    sink = StreamingSink(str(tmp_path / "out.csv"))
+    failed, stats = run_staged_engine(
+        ["A", "B"], Settings(), "1mo", "1d", "run-1", PipelineMetrics.create(NoOpMeter("test")), sink
+    )
+    assert not failed
+    assert [s.name for s in stats] == ["extract", "transform", "sink"]
+    assert stats[-1].processed == 2
+
+
+def test_failed_upload_fails_the_run_and_keeps_the_chunk(tmp_path, monkeypatch, make_bars):
+    monkeypatch.setattr(staged_engine, "fetch_ticker", lambda symbol, *args, **kwargs: (make_bars(symbol, periods=2), 1, None))
+    attempts = []
+
+    def failing_upload(chunk):
+        attempts.append(sorted(chunk["Ticker"].unique()))
+        raise RuntimeError("bigquery unavailable")
+
+    export_path = tmp_path / "out.csv"
+    sink = StreamingSink(str(export_path), upload=failing_upload, chunk_rows=4)
+    settings = Settings(staged_extract_workers=1, staged_transform_workers=1)
+    with pytest.raises(RuntimeError, match="bigquery unavailable"):
+        run_staged_engine(
+            ["A", "B", "C"], settings, "1mo", "1d", "run-1", PipelineMetrics.create(NoOpMeter("test")), sink
+        )
+
+    # Both tickers of the failed chunk are still buffered for the next flush, not dead-lettered.
+    assert attempts == [["A", "B"]]
+    assert sorted(pd.concat(sink._buffer)["Ticker"].unique()) == ["A", "B"]
+    assert not export_path.exists()
+
+
+def test_bounded_queue_applies_backpressure():
+    release = threading.Event()
+    seen = []
+
+    def slow(symbol, payload):
+        release.wait()
+        seen.append(symbol)
+
+    stage = Stage("slow", slow, workers=1, queue_size=1)
+    stage.start(lambda symbol, error: None)
+    producer_done = threading.Event()
+
+    def produce():
+        for i in range(5):
+            stage.inbox.put((str(i), None))
+        producer_done.set()
+
+    threading.Thread(target=produce, daemon=True).start()
+    time.sleep(0.05)
+    # One item in flight plus one queued: the producer is blocked on the rest.
+    assert not producer_done.is_set()
+    release.set()
+    assert producer_done.wait(1)
+    stage.close()
+    stage.join()
+    assert seen == ["0", "1", "2", "3", "4"]
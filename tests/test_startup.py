@@ -0,0 +1,44 @@
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded only by the stages that need them; importing the entry point must not pull them in.
+DEFERRED_MODULES = (
+    "yfinance",
+    "google.generativeai",
+    "google.oauth2",
+    "google.cloud.bigquery",
+    "pandas_gbq",
+    "opentelemetry.exporter.otlp.proto.http.trace_exporter",
+    "opentelemetry.instrumentation.requests",
+)
+# Cumulative import time of run_pipeline; override on slow machines.
+BUDGET_MS = float(os.getenv("STARTUP_IMPORT_BUDGET_MS", "1500"))
+
+
+def _importtime(module):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # "import time: <self us> | <cumulative us> | <indented module name>"
+    timings = {}
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)", line)
+        if match:
+            timings[match.group(2)] = int(match.group(1))
+    return timings
+
+
+def test_run_pipeline_import_skips_heavy_dependencies_and_fits_budget():
+    timings = _importtime("run_pipeline")
+    assert "run_pipeline" in timings
+    loaded = [m for m in DEFERRED_MODULES if m in timings]
+    assert not loaded, f"imported eagerly: {loaded}"
+    assert timings["run_pipeline"] / 1000 < BUDGET_MS
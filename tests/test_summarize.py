@@ -0,0 +1,112 @@
+import threading
+import time
+
+from src import summarize
+from src.summarize import (
+    FALLBACK_SUMMARY,
+    StubModel,
+    SummaryService,
+    build_batch_prompt,
+    parse_batch_response,
+)
+from src.summary_cache import SummaryCache
+
+
+def _features(symbol, last_close=10.0):
+    return {
+        "ticker": symbol,
+        "bars": 30,
+        "start": "2024-01-01",
+        "end": "2024-02-09",
+        "last_close": last_close,
+        "returns": {"1d": 0.01, "5d": 0.02, "21d": None, "63d": None},
+        "volatility": 0.2,
+        "max_drawdown": -0.05,
+        "volume_zscore": 1.5,
+        "price_path": [9.0, 9.5, 10.0],
+    }
+
+
+def test_batch_prompt_round_trips_through_parser():
+    prompt = build_batch_prompt([_features("AAPL"), _features("BRK-B")])
+    assert prompt.count("Ticker:") == 2
+    text = StubModel().generate_content(prompt).text
+    assert parse_batch_response(text, ["AAPL", "BRK-B"]) == {
+        "AAPL": "AAPL: stub summary.",
+        "BRK-B": "BRK-B: stub summary.",
+    }
+    assert parse_batch_response("Intro\n## msft\nUp.\n### OTHER\nx", ["MSFT"]) == {"MSFT": "Up."}
+
+
+def test_batches_run_concurrently_so_wall_time_grows_sublinearly():
+    model = StubModel(latency=0.1)
+    service = SummaryService(model, batch_size=8, max_concurrency=4)
+    started = time.perf_counter()
+    summaries = service.summarize({f"T{i}": _features(f"T{i}") for i in range(32)})
+    elapsed = time.perf_counter() - started
+    service.close()
+
+    assert len(summaries) == 32 and summaries["T7"] == "T7: stub summary."
+    assert model.calls == 4
+    # 32 sequential calls would take 3.2s; 4 concurrent batches take about one call's latency.
+    assert elapsed < 1.0
+
+
+def test_missing_answers_are_retried_and_failures_fall_back():
+    class FlakyModel:
+        def __init__(self):
+            self.prompts = []
+            self.timeouts = []
+
+        def generate_content(self, prompt, request_options=None):
+            self.prompts.append(prompt)
+            self.timeouts.append(request_options["timeout"])
+            if "Ticker: DOWN" in prompt:
+                raise RuntimeError("503 backend error")
+            # The first answer skips B; the retry only asks for B.
+            if len(self.prompts) == 1:
+                return type("R", (), {"text": "### A\nA is up."})()
+            return type("R", (), {"text": "### B\nB is flat."})()
+
+    model = FlakyModel()
+    service = SummaryService(model, batch_size=2, max_concurrency=1, timeout=5, max_retries=2, backoff=0)
+    summarize.backoff_delay, original = (lambda base, attempt: 0.0), summarize.backoff_delay
+    try:
+        assert service.summarize({"A": _features("A"), "B": _features("B")}) == {"A": "A is up.", "B": "B is flat."}
+        assert "Ticker: A" not in model.prompts[1]
+        assert service.summarize({"DOWN": _features("DOWN")}) == {"DOWN": FALLBACK_SUMMARY}
+    finally:
+        summarize.backoff_delay = original
+        service.close()
+    assert set(model.timeouts) == {5}
+
+
+def test_cache_hits_skip_the_model(tmp_path):
+    model = StubModel()
+    cache = SummaryCache(str(tmp_path / "s.sqlite"))
+    first = SummaryService(model, batch_size=4, cache=cache)
+    first.summarize({"A": _features("A"), "B": _features("B")})
+    first.close()
+
+    second = SummaryService(model, batch_size=4, cache=cache)
+    result = second.summarize({"A": _features("A"), "B": _features("B", last_close=11.0)})
+    second.close()
+    assert result["A"] == "A: stub summary."
+    # Only B changed, so the second run made one request for it alone.
+    assert model.calls == 2
+
+
+def test_submit_dispatches_full_batches_without_waiting_for_flush():
+    sent = threading.Event()
+
+    class SignallingModel(StubModel):
+        def generate_content(self, prompt, request_options=None):
+            sent.set()
+            return super().generate_content(prompt, request_options)
+
+    service = SummaryService(SignallingModel(), batch_size=2)
+    service.submit("A", _features("A"))
+    assert not sent.wait(0.05)
+    future = service.submit("B", _features("B"))
+    assert future.result(timeout=1) == "B: stub summary."
+    service.close()
@@ -0,0 +1,78 @@
+import pandas as pd
+
+from src import summarize
+from src.summary_cache import SummaryCache, summary_key
+
+
+def test_key_depends_on_prompt_and_model():
+    assert summary_key("p", "m") == summary_key("p", "m")
+    assert summary_key("p", "m") != summary_key("p2", "m")
+    assert summary_key("p", "m") != summary_key("p", "m2")
+
+
+def test_ttl_expiry_and_lru_eviction(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("src.summary_cache.time.time", lambda: now[0])
+    cache = SummaryCache(str(tmp_path / "s.sqlite"), ttl_seconds=60, max_entries=2)
+
+    cache.put("a", "m", "A")
+    now[0] += 1
+    cache.put("b", "m", "B")
+    now[0] += 1
+    assert cache.get("a") == "A"  # a is now more recently used than b
+    now[0] += 1
+    cache.put("c", "m", "C")
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+
+    now[0] += 120
+    assert cache.get("c") is None
+
+
+def test_cache_persists_across_instances(tmp_path):
+    path = str(tmp_path / "s.sqlite")
+    SummaryCache(path).put("k", "m", "text")
+    assert SummaryCache(path).get("k") == "text"
+    assert SummaryCache(path, force_refresh=True).get("k") is None
+
+
+def test_generate_summary_skips_llm_for_unchanged_input(tmp_path, monkeypatch):
+    calls = []
+
+    class FakeModel:
+        def generate_content(self, prompt, request_options=None):
+            calls.append(prompt)
+            return type("Response", (), {"text": f"summary {len(calls)}"})()
+
+    monkeypatch.setattr(summarize, "model", FakeModel())
+    cache = SummaryCache(str(tmp_path / "s.sqlite"))
+    monkeypatch.setattr(summarize, "get_summary_cache", lambda: cache)
+
+    df = pd.DataFrame(
+        {"date": pd.date_range("2024-01-01", periods=3), "Close": [1.0, 2.0, 3.0], "Volume": [10, 20, 30]}
+    )
+    assert summarize.generate_summary(df) == "summary 1"
+    assert summarize.generate_summary(df.copy()) == "summary 1"
+    assert len(calls) == 1
+
+    assert summarize.generate_summary(df, force_refresh=True) == "summary 2"
+    assert summarize.generate_summary(df) == "summary 2"
+
+    changed = df.assign(Close=[1.0, 2.0, 4.0])
+    assert summarize.generate_summary(changed) == "summary 3"
+
+
+def test_configured_cache_is_returned_even_when_empty(tmp_path):
+    from src.config import Settings
+    from src.summary_cache import configure_summary_cache, get_summary_cache
+
+    settings = Settings(summary_cache_path=str(tmp_path / "s.sqlite"))
+    try:
+        cache = configure_summary_cache(settings)
+        assert isinstance(cache, SummaryCache) and len(cache) == 0
+        assert get_summary_cache() is cache
+        assert configure_summary_cache(Settings(summary_cache_enabled=False)) is None
+        assert get_summary_cache() is None
+    finally:
+        configure_summary_cache(Settings(summary_cache_enabled=False))
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from src.transform import CLEAN_STEPS, apply_steps, clean_data, drop_missing
+
+
+def _chained(df):
+    df_clean = df.dropna()
+    df_clean = df_clean.loc[:, ~df_clean.columns.duplicated()]
+    return df_clean.sort_values(by="date", kind="stable")
+
+
+def test_matches_dropna_dedupe_and_sort(make_bars):
+    df = make_bars().iloc[[3, 0, 4, 1, 2]]
+    df.loc[4, "Close"] = np.nan
+    df = pd.concat([df, df[["Volume"]]], axis=1)
+
+    pd.testing.assert_frame_equal(clean_data(df), _chained(df))
+
+
+def test_clean_frame_is_not_copied(make_bars):
+    df = make_bars()
+    cleaned = clean_data(df)
+
+    pd.testing.assert_frame_equal(cleaned, df)
+    assert np.shares_memory(cleaned["Close"].to_numpy(), df["Close"].to_numpy())
+    cleaned["Close"] = 0.0
+    assert df["Close"].iloc[0] == 100.0
+
+
+def test_combined_frame_sorted_within_each_ticker(make_bars):
+    msft = make_bars("MSFT").iloc[::-1]
+    aapl = make_bars("AAPL", start="2023-06-01")
+    combined = pd.concat([msft, aapl, make_bars("MSFT", start="2025-01-01")], ignore_index=True)
+    combined["Ticker"] = combined["Ticker"].astype("category")
+
+    cleaned = clean_data(combined)
+
+    assert cleaned["Ticker"].tolist() == ["MSFT"] * 10 + ["AAPL"] * 5
+    for _, group in cleaned.groupby("Ticker", observed=True):
+        assert group["date"].is_monotonic_increasing
+    # Already ordered: left as is.
+    assert clean_data(cleaned).index.tolist() == cleaned.index.tolist()
+
+
+def test_symbol_and_custom_steps(make_bars):
+    df = make_bars(None).iloc[::-1]
+    df.loc[2, "Close"] = np.nan
+
+    assert clean_data(df, "NVDA")["Ticker"].unique().tolist() == ["NVDA"]
+    # Steps compose: only drop missing rows, keeping the original order.
+    assert apply_steps(df, [drop_missing]).index.tolist() == [4, 3, 1, 0]
+    assert apply_steps(df, CLEAN_STEPS).index.tolist() == [0, 1, 3, 4]
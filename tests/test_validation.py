@@ -1,6 +1,9 @@
+import numpy as np
 import pandas as pd
+import pytest
 
-from src.validation import validate_schema
+from src.pipeline import prepare_ticker
+from src.validation import Quarantine, gap_threshold, validate_rows, validate_schema
 
 
 def test_validate_schema_missing_columns():
@@ -19,3 +22,64 @@ def test_validate_schema_passes():
     )
     errors = validate_schema(df)
     assert errors == []
+
+
+def test_validate_rows_passes_clean_frames_through(make_bars):
+    df = make_bars(periods=6, freq="B", ohlc=True)
+    result = validate_rows(df)
+    assert result.valid is df
+    assert result.quarantined.empty
+    assert result.violations == {}
+
+
+def test_validate_rows_quarantines_offending_rows_with_rule_ids(make_bars):
+    df = pd.concat([make_bars(t, periods=6, freq="B", ohlc=True) for t in ("AAPL", "MSFT")], ignore_index=True)
+    df.loc[1, "Close"] = -5.0  # also outside High/Low
+    df.loc[2, "High"] = 50.0
+    df.loc[3, "Volume"] = -1
+    df.loc[8, "date"] = df.loc[7, "date"]  # MSFT duplicate bar
+    df.loc[10, "date"] = pd.Timestamp("2023-12-01")  # MSFT out of order
+
+    result = validate_rows(df)
+
+    quarantined = result.quarantined["rule_ids"].to_dict()
+    assert quarantined == {
+        1: "range.price;ohlc.consistency",
+        2: "ohlc.consistency",
+        3: "range.volume",
+        8: "dates.duplicate",
+        10: "dates.monotonic",
+    }
+    assert len(result.valid) == len(df) - 5
+    assert result.violations["ohlc.consistency"] == 2
+
+
+def test_gaps_are_counted_but_not_quarantined(make_bars):
+    df = pd.concat(
+        [make_bars(periods=3, start=start, freq="B", ohlc=True) for start in ("2024-01-01", "2024-03-01")],
+        ignore_index=True,
+    )
+    result = validate_rows(df)
+    assert result.violations == {"dates.gap": 1}
+    assert result.quarantined.empty
+    assert gap_threshold("1d") == np.timedelta64(5, "D")
+    assert gap_threshold("1wk") == np.timedelta64(21, "D")
+
+
+def test_prepare_ticker_keeps_valid_rows_and_quarantines_the_rest(make_bars):
+    raw = make_bars(None, periods=5, freq="B", ohlc=True)
+    raw.loc[2, "Low"] = 999.0
+    quarantine = Quarantine()
+
+    clean = prepare_ticker("AAPL", raw, quarantine=quarantine)
+
+    assert len(clean) == 4
+    rows = quarantine.to_frame("run-1")
+    assert rows[["Ticker", "rule_ids", "run_id"]].values.tolist() == [["AAPL", "ohlc.consistency", "run-1"]]
+    assert rows.columns[:5].tolist() == ["Ticker", "date", "rule_ids", "error", "run_id"]
+
+
+def test_prepare_ticker_rejects_ticker_without_valid_rows(make_bars):
+    raw = make_bars(None, periods=3, freq="B", ohlc=True).assign(Close=-1.0)
+    with pytest.raises(ValueError, match="empty"):
+        prepare_ticker("AAPL", raw, quarantine=Quarantine())